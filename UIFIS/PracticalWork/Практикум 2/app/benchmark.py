@@ -0,0 +1,191 @@
+"""Замеры производительности игры.
+
+Примеры:
+    python benchmark.py index --words 1000000
+    python benchmark.py render --length 30 --rounds 50
+    python benchmark.py scores --games 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from scoreboard import Scoreboard, WON, LOST, ABANDONED
+from words import WordIndex, build_index, read_word_list, DIFFICULTIES
+
+ALPHABET = "АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+# Примерные частоты букв русского текста, чтобы слова были похожи на настоящие
+LETTER_WEIGHTS = [
+    80, 16, 45, 17, 30, 85, 9, 16, 74, 12, 35, 44, 32, 67, 110, 28, 47, 55, 63, 26,
+    3, 10, 5, 14, 7, 4, 1, 19, 17, 3, 6, 20,
+]
+
+
+def write_word_list(path, count, seed=2024):
+    """Список из count сгенерированных словоформ; у части слов есть анаграммы"""
+    generator = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        word = ''.join(generator.choices(ALPHABET, LETTER_WEIGHTS, k=generator.randint(3, 14)))
+        words.add(word)
+        if generator.random() < 0.1 and len(words) < count:
+            letters = list(word)
+            generator.shuffle(letters)
+            words.add(''.join(letters))
+    with open(path, 'w', encoding='utf-8') as f:
+        for word in words:
+            f.write(f"{word.lower()} {int(generator.paretovariate(1.2) * 10)}\n")
+    return sorted(words)
+
+
+def bench_index(args):
+    """Построение индекса, открытие через mmap и запросы на большом словаре"""
+    with tempfile.TemporaryDirectory() as directory:
+        list_path = os.path.join(directory, "words.txt")
+        index_path = os.path.join(directory, "words.idx")
+        words = write_word_list(list_path, args.words)
+        print(f"Словарь из {len(words)} словоформ ({os.path.getsize(list_path) / 2**20:.1f} МБ текста):")
+
+        started = time.perf_counter()
+        build_index(list_path, index_path)
+        print(f"  построение индекса: {time.perf_counter() - started:.1f} с, "
+              f"файл {os.path.getsize(index_path) / 2**20:.1f} МБ")
+
+        started = time.perf_counter()
+        read_word_list(list_path)
+        print(f"  для сравнения, разбор текстового списка при каждом запуске: {time.perf_counter() - started:.2f} с")
+
+        started = time.perf_counter()
+        index = WordIndex(index_path)
+        print(f"  открытие индекса: {(time.perf_counter() - started) * 1000:.2f} мс")
+
+        generator = random.Random(1)
+        probes = generator.sample(words, min(args.probes, len(words)))
+        started = time.perf_counter()
+        found = sum(word in index.anagrams(''.join(generator.sample(word, len(word)))) for word in probes)
+        elapsed = time.perf_counter() - started
+        print(f"  поиск анаграмм: {elapsed / len(probes) * 1e6:.1f} мкс на запрос (найдено {found} из {len(probes)})")
+
+        for difficulty in DIFFICULTIES:
+            started = time.perf_counter()
+            for _ in range(args.probes):
+                index.random_word(generator.randint(4, 10), difficulty, generator)
+            elapsed = time.perf_counter() - started
+            print(f"  случайное слово ({difficulty}): {elapsed / args.probes * 1e6:.1f} мкс")
+        index.close()
+
+
+def frame_time(root, action):
+    """Время действия вместе с перерисовкой окна, мс"""
+    started = time.perf_counter()
+    action()
+    root.update_idletasks()
+    root.update()
+    return (time.perf_counter() - started) * 1000
+
+
+def count_widgets(widget):
+    return 1 + sum(count_widgets(child) for child in widget.winfo_children())
+
+
+def bench_render(args):
+    """Кадры игры на длинных словах: начало раунда, ход, отмена и новая игра"""
+    import tkinter as tk
+    from main import WordPuzzleGame
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"Окно не открылось ({e}); замер отрисовки требует дисплея")
+        return 1
+    game = WordPuzzleGame(root)
+    root.update()
+    generator = random.Random(1)
+    times = {"начало раунда": [], "ход": [], "отмена": [], "новая игра": []}
+    widgets = []
+    for _ in range(args.rounds):
+        word = ''.join(generator.choices(ALPHABET, LETTER_WEIGHTS, k=args.length))
+        game.word_entry.delete(0, tk.END)
+        game.word_entry.insert(0, word)
+        times["начало раунда"].append(frame_time(root, game.start_game))
+        order = list(range(args.length))
+        generator.shuffle(order)
+        for index in order:
+            times["ход"].append(frame_time(root, lambda: game.add_letter(index)))
+        for _ in range(args.length // 2):
+            times["отмена"].append(frame_time(root, game.undo_action))
+        times["новая игра"].append(frame_time(root, game.new_game))
+        widgets.append(count_widgets(root))
+    root.destroy()
+
+    print(f"Кадры на словах из {args.length} букв ({args.rounds} раундов):")
+    for name, values in times.items():
+        values.sort()
+        print(f"  {name:<14} медиана {statistics.median(values):6.2f} мс, "
+              f"95% {values[int(len(values) * 0.95) - 1]:6.2f} мс, максимум {values[-1]:6.2f} мс")
+    print(f"  виджетов в окне: после первого раунда {widgets[0]}, после последнего {widgets[-1]}")
+
+
+def bench_scores(args):
+    """Запись истории игр через очередь и запросы рекордов на большой базе"""
+    generator = random.Random(1)
+    players = [f"Игрок {i}" for i in range(args.players)]
+    games = [
+        (generator.choice(players), ''.join(generator.choices(ALPHABET, LETTER_WEIGHTS, k=generator.randint(3, 12))),
+         generator.expovariate(1 / 60), generator.randint(3, 40), generator.randint(0, 10),
+         generator.choice((WON, WON, LOST, ABANDONED)))
+        for _ in range(args.games)
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        scoreboard = Scoreboard(os.path.join(directory, "scores.db"))
+        started = time.perf_counter()
+        for game in games:
+            scoreboard.record(*game)
+        queued = time.perf_counter() - started
+        scoreboard.flush()
+        written = time.perf_counter() - started
+        print(f"История из {args.games} игр ({args.players} игроков):")
+        print(f"  постановка в очередь: {queued / args.games * 1e6:.1f} мкс на игру (столько ждет окно)")
+        print(f"  запись пачками в фоне: {written:.1f} с ({args.games / written:.0f} игр/с)")
+
+        for name, query, keys in (
+            ("по длине слова", scoreboard.top_by_length, list(range(3, 13))),
+            ("по игроку", scoreboard.top_by_player, players),
+        ):
+            started = time.perf_counter()
+            for _ in range(args.probes):
+                query(generator.choice(keys), args.top)
+            elapsed = time.perf_counter() - started
+            print(f"  топ-{args.top} {name}: {elapsed / args.probes * 1000:.2f} мс на запрос")
+        scoreboard.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности игры")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = commands.add_parser("index", help="словарь анаграмм и генератор слов на большом списке")
+    index_parser.add_argument("--words", type=int, default=1000000)
+    index_parser.add_argument("--probes", type=int, default=10000, help="сколько запросов замерить")
+    index_parser.set_defaults(handler=bench_index)
+
+    render_parser = commands.add_parser("render", help="время кадров игры на длинных словах (нужен дисплей)")
+    render_parser.add_argument("--length", type=int, default=30, help="букв в слове")
+    render_parser.add_argument("--rounds", type=int, default=50)
+    render_parser.set_defaults(handler=bench_render)
+
+    scores_parser = commands.add_parser("scores", help="запись истории игр и запросы рекордов")
+    scores_parser.add_argument("--games", type=int, default=1000000)
+    scores_parser.add_argument("--players", type=int, default=1000)
+    scores_parser.add_argument("--top", type=int, default=10)
+    scores_parser.add_argument("--probes", type=int, default=1000, help="сколько запросов замерить")
+    scores_parser.set_defaults(handler=bench_scores)
+
+    args = parser.parse_args(argv)
+    return args.handler(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Состояние игры без интерфейса.
+
+Игра хранит перемешанные буквы, номера выбранных букв по порядку (массив picked)
+и маску использованных букв (бит i - буква i уже в слове). Ход добавляет номер в
+конец массива и ставит бит, отмена снимает последний номер и бит - обе операции
+O(1) независимо от длины слова и числа ходов. Этим же классом пользуются окно
+игры (main.py) и пакетная симуляция (simulate.py).
+"""
+import random
+from array import array
+
+
+def shuffle_letters(word, rng=random):
+    """Перемешивает буквы в слове"""
+    letters = list(word)
+    rng.shuffle(letters)
+    return ''.join(letters)
+
+
+class PuzzleState:
+    """Одна игра: загаданное слово, перемешанные буквы и собранное слово"""
+
+    def __init__(self, word, letters=None, rng=random):
+        self.word = word
+        self.letters = letters if letters is not None else shuffle_letters(word, rng)
+        # Номера букв в порядке выбора; 'H' - слова до 65535 букв
+        self.picked = array('H')
+        self.used = 0
+        self.moves = 0
+        self.undos = 0
+        self.checks = 0
+
+    def is_used(self, index):
+        return self.used >> index & 1 == 1
+
+    def add(self, index):
+        """Добавляет букву с номером index; False, если она уже в слове"""
+        bit = 1 << index
+        if self.used & bit:
+            return False
+        self.used |= bit
+        self.picked.append(index)
+        self.moves += 1
+        return True
+
+    def undo(self):
+        """Убирает последнюю букву; ее номер или None, если слово пустое"""
+        if not self.picked:
+            return None
+        index = self.picked.pop()
+        self.used ^= 1 << index
+        self.undos += 1
+        return index
+
+    def undo_all(self):
+        """Убирает все буквы (каждая считается отдельной отменой)"""
+        self.undos += len(self.picked)
+        del self.picked[:]
+        self.used = 0
+
+    @property
+    def user_word(self):
+        return ''.join(map(self.letters.__getitem__, self.picked))
+
+    def is_complete(self):
+        return len(self.picked) == len(self.letters)
+
+    def check(self, is_word=None):
+        """Засчитывается ли собранное слово: загаданное или, если передана проверка
+        is_word(слово), любое другое слово из всех тех же букв"""
+        self.checks += 1
+        user_word = self.user_word
+        if user_word == self.word:
+            return True
+        return is_word is not None and self.is_complete() and is_word(user_word)
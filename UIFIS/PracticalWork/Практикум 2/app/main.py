@@ -1,21 +1,52 @@
+import argparse
+import sqlite3
+import time
 import tkinter as tk
 from tkinter import messagebox
-import random
+from engine import PuzzleState
+from scoreboard import Scoreboard, format_games, DEFAULT_SCORES, WON, LOST, ABANDONED
+from words import open_index, DEFAULT_WORD_LIST
+
+class ButtonPool:
+    """Ряд кнопок букв, которые не пересоздаются, а переиспользуются между ходами и играми"""
+    def __init__(self, frame, **options):
+        self.frame = frame
+        self.options = options
+        self.buttons = []
+        self.visible = 0
+    
+    def __getitem__(self, index):
+        return self.buttons[index]
+    
+    def set_visible(self, count):
+        """Показывает первые count кнопок (недостающие создаются), остальные прячет"""
+        while len(self.buttons) < count:
+            self.buttons.append(tk.Button(self.frame, **self.options))
+        
+        # grid_remove запоминает место кнопки в сетке, grid() возвращает ее туда же
+        for button in self.buttons[count:self.visible]:
+            button.grid_remove()
+        for index in range(self.visible, count):
+            self.buttons[index].grid(row=0, column=index, padx=3, pady=3)
+        self.visible = count
+        return self.buttons[:count]
 
 class WordPuzzleGame:
-    def __init__(self, root):
+    DIFFICULTY_LABELS = {'easy': 'Легкое', 'medium': 'Среднее', 'hard': 'Сложное'}
+    
+    def __init__(self, root, word_list=DEFAULT_WORD_LIST, scores=DEFAULT_SCORES):
         self.root = root
         self.root.title("Поле чудес")
-        self.root.geometry("600x600")
+        self.root.geometry("600x700")
         self.root.configure(bg='#f0f8ff')
         
-        self.original_word = ""
-        self.shuffled_word = ""
-        self.user_word = ""
-        self.word_letters = []
+        # Текущая игра (engine.PuzzleState) или None до начала игры
+        self.game = None
+        # Начало игры (time.monotonic) и записан ли уже ее итог в таблицу рекордов
+        self.started_at = None
+        self.recorded = False
         self.buttons = []
         self.user_buttons = []
-        self.history = []
         
         self.COLORS = {
             'bg': '#f0f8ff',
@@ -28,8 +59,24 @@ class WordPuzzleGame:
             'text': 'black'
         }
         
+        # Словарь для случайных слов и проверки анаграмм; без него игра идет по введенному слову
+        try:
+            self.words = open_index(word_list)
+        except (OSError, ValueError) as e:
+            print(f"Словарь не загружен: {e}")
+            self.words = None
+        
+        # История игр и рекорды; без базы игра работает, но ничего не сохраняет
+        try:
+            self.scores = Scoreboard(scores)
+        except sqlite3.Error as e:
+            print(f"Таблица рекордов недоступна: {e}")
+            self.scores = None
+        
         self.create_widgets()
         self.reset_game()
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
     def create_widgets(self):
         # Заголовок
@@ -93,6 +140,77 @@ class WordPuzzleGame:
         )
         self.start_button.pack(side=tk.LEFT, padx=5)
         
+        self.generator_frame = tk.Frame(self.root, bg=self.COLORS['bg'])
+        self.generator_frame.pack(pady=5)
+        
+        tk.Label(
+            self.generator_frame,
+            text="Длина:",
+            font=('Arial', 11),
+            bg=self.COLORS['bg']
+        ).pack(side=tk.LEFT)
+        
+        self.length_var = tk.IntVar(value=5)
+        self.length_spinbox = tk.Spinbox(
+            self.generator_frame,
+            from_=2,
+            to=30,
+            textvariable=self.length_var,
+            font=('Arial', 11),
+            width=3
+        )
+        self.length_spinbox.pack(side=tk.LEFT, padx=5)
+        
+        self.difficulty_var = tk.StringVar(value=self.DIFFICULTY_LABELS['medium'])
+        self.difficulty_menu = tk.OptionMenu(
+            self.generator_frame,
+            self.difficulty_var,
+            *self.DIFFICULTY_LABELS.values()
+        )
+        self.difficulty_menu.config(font=('Arial', 11), width=8)
+        self.difficulty_menu.pack(side=tk.LEFT, padx=5)
+        
+        self.random_button = tk.Button(
+            self.generator_frame,
+            text="Случайное слово",
+            command=self.start_random_game,
+            bg=self.COLORS['button'],
+            fg=self.COLORS['button_text'],
+            font=('Arial', 11),
+            padx=10,
+            state=tk.NORMAL if self.words is not None else tk.DISABLED
+        )
+        self.random_button.pack(side=tk.LEFT, padx=5)
+        
+        self.player_frame = tk.Frame(self.root, bg=self.COLORS['bg'])
+        self.player_frame.pack(pady=5)
+        
+        tk.Label(
+            self.player_frame,
+            text="Игрок:",
+            font=('Arial', 11),
+            bg=self.COLORS['bg']
+        ).pack(side=tk.LEFT)
+        
+        self.player_entry = tk.Entry(
+            self.player_frame,
+            font=('Arial', 11),
+            width=15
+        )
+        self.player_entry.pack(side=tk.LEFT, padx=5)
+        
+        self.scores_button = tk.Button(
+            self.player_frame,
+            text="Рекорды",
+            command=self.show_scores,
+            bg=self.COLORS['button'],
+            fg=self.COLORS['button_text'],
+            font=('Arial', 11),
+            padx=10,
+            state=tk.NORMAL if self.scores is not None else tk.DISABLED
+        )
+        self.scores_button.pack(side=tk.LEFT, padx=5)
+        
         self.shuffled_frame = tk.Frame(self.root, bg=self.COLORS['bg'])
         self.shuffled_frame.pack(pady=20)
         
@@ -106,6 +224,14 @@ class WordPuzzleGame:
         
         self.letters_frame = tk.Frame(self.root, bg=self.COLORS['bg'])
         self.letters_frame.pack(pady=10)
+        self.letters_pool = ButtonPool(
+            self.letters_frame,
+            font=('Arial', 14, 'bold'),
+            width=4,
+            height=2,
+            activebackground='#f0f0f0',
+            activeforeground=self.COLORS['text']
+        )
         
         self.user_word_frame = tk.Frame(self.root, bg=self.COLORS['bg'])
         self.user_word_frame.pack(pady=20)
@@ -120,6 +246,12 @@ class WordPuzzleGame:
         
         self.user_letters_frame = tk.Frame(self.root, bg=self.COLORS['bg'])
         self.user_letters_frame.pack(pady=10)
+        self.user_pool = ButtonPool(
+            self.user_letters_frame,
+            font=('Arial', 14, 'bold'),
+            width=4,
+            height=2
+        )
         
         self.control_frame = tk.Frame(self.root, bg=self.COLORS['bg'])
         self.control_frame.pack(pady=20)
@@ -173,12 +305,6 @@ class WordPuzzleGame:
         
         self.hidden_word_label.pack_forget()
     
-    def shuffle_word(self, word):
-        """Перемешивает буквы в слове"""
-        letters = list(word)
-        random.shuffle(letters)
-        return ''.join(letters)
-    
     def start_game(self):
         """Начинает новую игру"""
         word = self.word_entry.get().strip().upper()
@@ -191,36 +317,22 @@ class WordPuzzleGame:
             messagebox.showwarning("Ошибка", "Слово должно содержать минимум 2 буквы!")
             return
         
-        self.original_word = word
-        self.shuffled_word = self.shuffle_word(word)
-        self.user_word = ""
-        self.word_letters = list(self.shuffled_word)
-        self.history = []
-        
-        for widget in self.letters_frame.winfo_children():
-            widget.destroy()
-        
-        for widget in self.user_letters_frame.winfo_children():
-            widget.destroy()
+        self.game = PuzzleState(word)
+        self.started_at = time.monotonic()
+        self.recorded = False
         
-        self.buttons = []
+        self.user_pool.set_visible(0)
         self.user_buttons = []
         
-        for i, letter in enumerate(self.word_letters):
-            button = tk.Button(
-                self.letters_frame,
+        self.buttons = self.letters_pool.set_visible(len(self.game.letters))
+        for i, (letter, button) in enumerate(zip(self.game.letters, self.buttons)):
+            button.config(
                 text=letter,
-                font=('Arial', 14, 'bold'),
-                width=4,
-                height=2,
+                state=tk.NORMAL,
                 bg=self.COLORS['neutral'],
                 fg=self.COLORS['text'],
-                activebackground='#f0f0f0',
-                activeforeground=self.COLORS['text']
+                command=lambda idx=i: self.add_letter(idx)
             )
-            button.grid(row=0, column=i, padx=3, pady=3)
-            button.config(command=lambda l=letter, idx=i, btn=button: self.add_letter(l, idx, btn))
-            self.buttons.append(button)
         
         self.word_entry.config(show="*")
         self.hidden_word_label.config(text="*" * len(word))
@@ -234,56 +346,65 @@ class WordPuzzleGame:
         self.status_label.config(text="Собирайте слово, нажимая на буквы!")
         self.word_entry.config(state=tk.DISABLED)
         self.start_button.config(state=tk.DISABLED)
+        self.random_button.config(state=tk.DISABLED)
     
-    def add_letter(self, letter, index, button):
-        """Добавляет букву к слову пользователя"""
-        if letter is None or button['state'] == tk.DISABLED:
+    def start_random_game(self):
+        """Начинает игру со случайным словом из словаря"""
+        try:
+            length = self.length_var.get()
+        except tk.TclError:
+            messagebox.showwarning("Ошибка", "Длина слова должна быть числом!")
             return
         
-        button.config(state=tk.DISABLED, bg=self.COLORS['disabled'], fg='#a0a0a0')
+        difficulty = next(key for key, label in self.DIFFICULTY_LABELS.items()
+                          if label == self.difficulty_var.get())
+        word = self.words.random_word(length, difficulty)
+        if word is None:
+            messagebox.showwarning("Ошибка", f"В словаре нет слов из {length} букв!")
+            return
+        
+        self.word_entry.config(show="*")
+        self.word_entry.delete(0, tk.END)
+        self.word_entry.insert(0, word)
+        self.start_game()
+    
+    def add_letter(self, index):
+        """Добавляет букву с номером index к слову пользователя"""
+        if self.game is None or not self.game.add(index):
+            return
         
-        self.user_word += letter
-        self.history.append(('add', letter, index, button))
+        self.buttons[index].config(state=tk.DISABLED, bg=self.COLORS['disabled'], fg='#a0a0a0')
         
-        user_button = tk.Button(
-            self.user_letters_frame,
-            text=letter,
-            font=('Arial', 14, 'bold'),
-            width=4,
-            height=2,
-            bg=self.COLORS['neutral'],
-            fg=self.COLORS['text']
-        )
-        user_button.grid(row=0, column=len(self.user_word)-1, padx=3, pady=3)
+        user_button = self.user_pool.set_visible(len(self.game.picked))[-1]
+        user_button.config(text=self.game.letters[index], bg=self.COLORS['neutral'], fg=self.COLORS['text'])
         self.user_buttons.append(user_button)
         
-        self.status_label.config(text=f"Слово: {self.user_word}")
+        self.status_label.config(text=f"Слово: {self.game.user_word}")
     
     def undo_action(self):
         """Отменяет последнее действие"""
-        if not self.history:
+        index = self.game.undo() if self.game is not None else None
+        if index is None:
             return
         
-        action_type, letter, index, button = self.history.pop()
+        self.user_buttons.pop()
+        self.user_pool.set_visible(len(self.user_buttons))
         
-        if action_type == 'add':
-            self.user_word = self.user_word[:-1]
-            
-            if self.user_buttons:
-                last_button = self.user_buttons.pop()
-                last_button.destroy()
-            
-            button.config(
-                state=tk.NORMAL, 
-                bg=self.COLORS['neutral'],
-                fg=self.COLORS['text']
-            )
+        self.buttons[index].config(
+            state=tk.NORMAL, 
+            bg=self.COLORS['neutral'],
+            fg=self.COLORS['text']
+        )
         
-        self.status_label.config(text=f"Слово: {self.user_word}")
+        self.status_label.config(text=f"Слово: {self.game.user_word}")
     
     def check_word(self):
         """Проверяет собранное слово"""
-        if self.user_word == self.original_word:
+        original_word = self.game.word
+        user_word = self.game.user_word
+        accepted = self.game.check(self.words.contains if self.words is not None else None)
+        if accepted:
+            self.record_game(WON)
             for button in self.user_buttons:
                 button.config(bg=self.COLORS['correct'])
             
@@ -293,9 +414,15 @@ class WordPuzzleGame:
             )
             
             self.word_entry.config(show="")
-            self.hidden_word_label.config(text="✓" * len(self.original_word), fg='green')
+            self.hidden_word_label.config(text="✓" * len(original_word), fg='green')
             
-            messagebox.showinfo("Поздравляем!", f"Вы правильно угадали слово!\n\nСлово: {self.original_word}")
+            if user_word == original_word:
+                messagebox.showinfo("Поздравляем!", f"Вы правильно угадали слово!\n\nСлово: {original_word}")
+            else:
+                messagebox.showinfo("Поздравляем!",
+                                    f"Это тоже слово из тех же букв!\n\n"
+                                    f"Ваш вариант: {user_word}\n"
+                                    f"Загаданное слово: {original_word}")
         else:
             for button in self.user_buttons:
                 button.config(bg=self.COLORS['incorrect'])
@@ -306,18 +433,61 @@ class WordPuzzleGame:
             )
             
             self.word_entry.config(show="")
-            self.hidden_word_label.config(text=self.original_word, fg='red')
+            self.hidden_word_label.config(text=original_word, fg='red')
             
             messagebox.showwarning("Неверно", 
                                  f"Слово собрано неправильно!\n\n"
-                                 f"Ваш вариант: {self.user_word}\n"
-                                 f"Правильный ответ: {self.original_word}")
+                                 f"Ваш вариант: {user_word}\n"
+                                 f"Правильный ответ: {original_word}")
+    
+    def record_game(self, result):
+        """Записывает итог текущей игры (один раз за игру) в таблицу рекордов"""
+        if self.scores is None or self.game is None or self.recorded:
+            return
+        
+        self.recorded = True
+        self.scores.record(
+            self.player_entry.get(),
+            self.game.word,
+            time.monotonic() - self.started_at,
+            self.game.moves,
+            self.game.undos,
+            result
+        )
+    
+    def finish_game(self):
+        """Записывает незаконченную игру: проигранной, если слово уже проверялось
+        неудачно, иначе брошенной"""
+        if self.game is not None:
+            self.record_game(LOST if self.game.checks else ABANDONED)
+    
+    def show_scores(self):
+        """Показывает самые быстрые победы на словах текущей длины и у игрока"""
+        if self.game is not None:
+            length = len(self.game.word)
+        else:
+            try:
+                length = self.length_var.get()
+            except tk.TclError:
+                length = 5
+        player = self.player_entry.get().strip()
+        
+        sections = [(f"Слова из {length} букв", self.scores.top_by_length(length))]
+        if player:
+            sections.append((f"Игрок {player}", self.scores.top_by_player(player)))
+        text = '\n\n'.join(
+            f"{title}:\n" + ('\n'.join(format_games(rows)) or "пока нет побед")
+            for title, rows in sections
+        )
+        messagebox.showinfo("Рекорды", text)
     
     def new_game(self):
         """Начинает новую игру"""
+        self.finish_game()
         self.reset_game()
         self.word_entry.config(state=tk.NORMAL, show="")
         self.start_button.config(state=tk.NORMAL)
+        self.random_button.config(state=tk.NORMAL if self.words is not None else tk.DISABLED)
         self.check_button.config(state=tk.DISABLED)
         self.undo_button.config(state=tk.DISABLED)
         
@@ -331,26 +501,34 @@ class WordPuzzleGame:
             fg='#696969'
         )
         
-        for widget in self.letters_frame.winfo_children():
-            widget.destroy()
-        
-        for widget in self.user_letters_frame.winfo_children():
-            widget.destroy()
+        self.letters_pool.set_visible(0)
+        self.user_pool.set_visible(0)
         
         self.buttons = []
         self.user_buttons = []
     
     def reset_game(self):
         """Сбрасывает состояние игры"""
-        self.original_word = ""
-        self.shuffled_word = ""
-        self.user_word = ""
-        self.word_letters = []
-        self.history = []
+        self.game = None
+        self.started_at = None
+        self.recorded = False
+    
+    def on_closing(self):
+        """Закрытие окна: незаконченная игра записывается, очередь записи дописывается"""
+        self.finish_game()
+        if self.scores is not None:
+            self.scores.close()
+        self.root.destroy()
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Поле чудес")
+    parser.add_argument("--words", default=DEFAULT_WORD_LIST,
+                        help="список слов (строки \"слово частота\"); индекс строится рядом при первом запуске")
+    parser.add_argument("--scores", default=DEFAULT_SCORES, help="файл базы рекордов и истории игр")
+    args = parser.parse_args(argv)
+    
     root = tk.Tk()
-    game = WordPuzzleGame(root)
+    game = WordPuzzleGame(root, args.words, args.scores)
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+"""Таблица рекордов и история игр.
+
+Каждая игра записывается в SQLite-базу (таблица games): игрок, слово и его длина,
+время игры в миллисекундах, число ходов и отмен, результат и время окончания.
+Окно игры не ждет записи: итог кладется в очередь, а отдельный поток забирает
+все накопившиеся игры и вставляет их одной транзакцией.
+
+Рекорды читаются по частичным индексам только выигранных игр, упорядоченным как
+сама таблица рекордов: idx_games_length_time (длина, время) и idx_games_player_time
+(игрок, время). Первые N рекордов - чтение первых N записей индекса, без
+сортировки и без просмотра проигранных игр.
+
+Примеры:
+    python scoreboard.py top --length 5
+    python scoreboard.py top --player Аня --limit 20
+    python scoreboard.py history --player Аня
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCORES = os.path.join(APP_DIR, "scores.db")
+
+BUSY_TIMEOUT = 5.0
+# Сколько игр писатель вставляет за одну транзакцию (остальные - следующей)
+MAX_BATCH = 10000
+
+# Результат игры
+LOST = 0
+WON = 1
+ABANDONED = 2
+
+RESULT_TITLES = {LOST: 'Проигрыш', WON: 'Победа', ABANDONED: 'Брошена'}
+
+SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS games (
+        id INTEGER PRIMARY KEY,
+        player TEXT NOT NULL DEFAULT '',
+        word TEXT NOT NULL,
+        length INTEGER NOT NULL,
+        duration_ms INTEGER NOT NULL,
+        moves INTEGER NOT NULL,
+        undos INTEGER NOT NULL,
+        result INTEGER NOT NULL,
+        finished_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_games_length_time ON games(length, duration_ms) WHERE result = {WON};
+    CREATE INDEX IF NOT EXISTS idx_games_player_time ON games(player, duration_ms) WHERE result = {WON};
+    CREATE INDEX IF NOT EXISTS idx_games_player_history ON games(player, id);
+'''
+
+GAME_COLUMNS = 'player, word, length, duration_ms, moves, undos, result, finished_at'
+GAME_INSERT = f'INSERT INTO games ({GAME_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+# Порядок строк совпадает с индексами: при равном времени раньше - более ранняя игра
+TOP_BY_LENGTH = f'''
+    SELECT {GAME_COLUMNS} FROM games
+    WHERE result = {WON} AND length = ?
+    ORDER BY duration_ms, id LIMIT ?
+'''
+TOP_BY_PLAYER = f'''
+    SELECT {GAME_COLUMNS} FROM games
+    WHERE result = {WON} AND player = ?
+    ORDER BY duration_ms, id LIMIT ?
+'''
+PLAYER_HISTORY = f'''
+    SELECT {GAME_COLUMNS} FROM games
+    WHERE player = ?
+    ORDER BY id DESC LIMIT ?
+'''
+
+
+def game_row(player, word, duration, moves, undos, result, finished_at=None):
+    """Строка таблицы games; duration - секунды"""
+    finished_at = finished_at or datetime.now()
+    return (
+        player.strip(), word, len(word), round(duration * 1000), moves, undos, result,
+        finished_at.strftime('%Y-%m-%d %H:%M:%S')
+    )
+
+
+class Scoreboard:
+    """История игр и рекорды; запись - в фоновом потоке пачками"""
+
+    def __init__(self, db_name=DEFAULT_SCORES):
+        self.db_name = db_name
+        conn = self._connect()
+        try:
+            # WAL: чтение рекордов в окне не ждет транзакции писателя
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, name="scoreboard-writer", daemon=True)
+        self.writer.start()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT)
+
+    def record(self, player, word, duration, moves, undos, result):
+        """Ставит игру в очередь на запись и сразу возвращается"""
+        self.pending.put(game_row(player, word, duration, moves, undos, result))
+
+    def _write_loop(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            rows = [self.pending.get()]
+            # Все, что успело накопиться, уходит той же транзакцией
+            while len(rows) < MAX_BATCH:
+                try:
+                    rows.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in rows
+            games = [row for row in rows if row is not None]
+            try:
+                with conn:
+                    conn.executemany(GAME_INSERT, games)
+            except sqlite3.Error as e:
+                print(f"Не удалось сохранить {len(games)} игр: {e}")
+            for _ in rows:
+                self.pending.task_done()
+        conn.close()
+
+    def flush(self):
+        """Ждет записи всех поставленных в очередь игр"""
+        self.pending.join()
+
+    def close(self):
+        """Дописывает очередь и останавливает поток записи"""
+        if self.writer.is_alive():
+            self.pending.put(None)
+            self.writer.join()
+
+    def _query(self, sql, params):
+        # Игры, поставленные в очередь до запроса, должны в него попасть
+        self.flush()
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def top_by_length(self, length, limit=10):
+        """Самые быстрые победы на словах заданной длины"""
+        return self._query(TOP_BY_LENGTH, (length, limit))
+
+    def top_by_player(self, player, limit=10):
+        """Самые быстрые победы игрока"""
+        return self._query(TOP_BY_PLAYER, (player.strip(), limit))
+
+    def history(self, player, limit=20):
+        """Последние игры игрока, новые первыми"""
+        return self._query(PLAYER_HISTORY, (player.strip(), limit))
+
+
+def format_games(rows):
+    """Строки игр для вывода: место, игрок, слово, время, отмены, результат"""
+    lines = []
+    for place, (player, word, length, duration_ms, moves, undos, result, finished_at) in enumerate(rows, 1):
+        lines.append(f"{place:>2}. {player or '-':<12} {word:<14} {duration_ms / 1000:7.1f} с  "
+                     f"отмен: {undos:<3} {RESULT_TITLES[result]}  {finished_at}")
+    return lines
+
+
+def top_command(args):
+    scoreboard = Scoreboard(args.scores)
+    if args.player is not None:
+        rows = scoreboard.top_by_player(args.player, args.limit)
+    else:
+        rows = scoreboard.top_by_length(args.length, args.limit)
+    print('\n'.join(format_games(rows)) or "Рекордов пока нет")
+    scoreboard.close()
+
+
+def history_command(args):
+    scoreboard = Scoreboard(args.scores)
+    print('\n'.join(format_games(scoreboard.history(args.player, args.limit))) or "Игр пока нет")
+    scoreboard.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Рекорды и история игр")
+    parser.add_argument("--scores", default=DEFAULT_SCORES, help="файл базы рекордов")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    top_parser = commands.add_parser("top", help="самые быстрые победы по длине слова или игроку")
+    choice = top_parser.add_mutually_exclusive_group(required=True)
+    choice.add_argument("--length", type=int)
+    choice.add_argument("--player")
+    top_parser.add_argument("--limit", type=int, default=10)
+    top_parser.set_defaults(handler=top_command)
+
+    history_parser = commands.add_parser("history", help="последние игры игрока")
+    history_parser.add_argument("--player", default='')
+    history_parser.add_argument("--limit", type=int, default=20)
+    history_parser.set_defaults(handler=history_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Пакетная симуляция игр для калибровки сложности слов.
+
+Для каждого слова разыгрывается заданное число игр (каждая - со своим
+перемешиванием букв) одной из стратегий:
+    random   - собирает слово в случайном порядке, после неудачной проверки
+               отменяет все буквы и пробует заново;
+    scripted - перебирает варианты по порядку букв (одинаковые буквы на одном
+               месте не повторяются), после неудачной проверки отменяет буквы
+               только до ближайшего места, где есть следующий вариант.
+Игра заканчивается победой или после --max-checks неудачных проверок.
+Засчитываются загаданное слово и другие слова словаря из тех же букв, как в игре.
+
+Игры делятся на части по --chunk и разыгрываются в нескольких процессах;
+по каждому слову выводятся доля побед и средние числа проверок, ходов и отмен.
+
+Примеры:
+    python simulate.py --words КОТ ВОЛОС КУЛОН --games 100000
+    python simulate.py --random-words 100 --length 5 --difficulty hard --strategy scripted --output stats.csv
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+from engine import PuzzleState
+from words import open_index, normalize, DEFAULT_WORD_LIST, DIFFICULTIES
+
+
+def play_random(state, is_word, max_checks, rng):
+    order = list(range(len(state.letters)))
+    while state.checks < max_checks:
+        rng.shuffle(order)
+        for index in order:
+            state.add(index)
+        if state.check(is_word):
+            return True
+        state.undo_all()
+    return False
+
+
+def play_scripted(state, is_word, max_checks, rng):
+    def search():
+        if state.is_complete():
+            return state.check(is_word)
+        tried = set()
+        for index, letter in enumerate(state.letters):
+            if state.is_used(index) or letter in tried:
+                continue
+            tried.add(letter)
+            state.add(index)
+            if search():
+                return True
+            if state.checks >= max_checks:
+                return False
+            state.undo()
+        return False
+
+    return search()
+
+
+STRATEGIES = {'random': play_random, 'scripted': play_scripted}
+
+
+def play_chunk(task):
+    """Разыгрывает часть игр одного слова; итоги (слово, игр, побед, проверок, ходов, отмен)"""
+    word, accepted, games, strategy, max_checks, seed = task
+    rng = random.Random(seed)
+    play = STRATEGIES[strategy]
+    is_word = accepted.__contains__
+    wins = checks = moves = undos = 0
+    for _ in range(games):
+        state = PuzzleState(word, rng=rng)
+        wins += play(state, is_word, max_checks, rng)
+        checks += state.checks
+        moves += state.moves
+        undos += state.undos
+    return word, games, wins, checks, moves, undos
+
+
+def make_tasks(words, index, args):
+    tasks = []
+    for word in words:
+        accepted = frozenset(index.anagrams(word)) | {word}
+        for start in range(0, args.games, args.chunk):
+            tasks.append((word, accepted, min(args.chunk, args.games - start), args.strategy,
+                          args.max_checks, args.seed + len(tasks)))
+    return tasks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная симуляция игр для калибровки сложности слов")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--words", nargs="+", help="слова для симуляции")
+    source.add_argument("--random-words", type=int, help="взять столько случайных слов из словаря")
+    parser.add_argument("--length", type=int, help="длина случайных слов")
+    parser.add_argument("--difficulty", choices=DIFFICULTIES, default='medium', help="сложность случайных слов")
+    parser.add_argument("--list", default=DEFAULT_WORD_LIST, help="список слов словаря")
+    parser.add_argument("--strategy", choices=STRATEGIES, default='random')
+    parser.add_argument("--games", type=int, default=10000, help="игр на слово")
+    parser.add_argument("--max-checks", type=int, default=100, help="неудачных проверок до поражения")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=5000, help="игр в одном задании процесса")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="сохранить итоги в CSV")
+    args = parser.parse_args(argv)
+
+    with open_index(args.list) as index:
+        if args.words:
+            words = [normalize(word) for word in args.words]
+        else:
+            rng = random.Random(args.seed)
+            words = sorted({index.random_word(args.length, args.difficulty, rng) or '' for _ in range(args.random_words)} - {''})
+        words = [word for word in words if len(word) >= 2]
+        if not words:
+            print("Нет слов для симуляции")
+            return 1
+        tasks = make_tasks(words, index, args)
+
+    totals = {word: [0, 0, 0, 0, 0] for word in words}
+    started = time.perf_counter()
+    with Pool(args.processes) as pool:
+        for word, *counts in pool.imap_unordered(play_chunk, tasks):
+            totals[word] = [total + count for total, count in zip(totals[word], counts)]
+    elapsed = time.perf_counter() - started
+    games = sum(total[0] for total in totals.values())
+    print(f"Сыграно {games} игр за {elapsed:.1f} с ({games / elapsed:.0f} игр/с, процессов: {args.processes})")
+
+    rows = []
+    for word, (played, wins, checks, moves, undos) in totals.items():
+        rows.append((word, len(word), played, wins / played, checks / played, moves / played, undos / played))
+    # Сначала самые трудные: меньше побед, больше проверок
+    rows.sort(key=lambda row: (row[3], -row[4], row[0]))
+    print(f"{'Слово':<16}{'Букв':>5}{'Побед':>9}{'Проверок':>10}{'Ходов':>9}{'Отмен':>9}")
+    for word, length, played, wins, checks, moves, undos in rows:
+        print(f"{word:<16}{length:>5}{wins:>9.1%}{checks:>10.1f}{moves:>9.1f}{undos:>9.1f}")
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['word', 'length', 'games', 'win_rate', 'checks', 'moves', 'undos'])
+            writer.writerows(rows)
+        print(f"Итоги сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
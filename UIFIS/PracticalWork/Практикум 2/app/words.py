@@ -0,0 +1,325 @@
+"""Словарь игры: поиск анаграмм и выбор случайного слова.
+
+Слова (в верхнем регистре, Ё заменена на Е) хранятся в индексном файле, который
+строится один раз из текстового списка (строки "слово частота") и затем
+открывается через mmap: при запуске ничего не разбирается и не загружается,
+с диска читаются только страницы, к которым обращается поиск. Индекс
+перестраивается, только если список новее индекса.
+
+Анаграммы ищутся по подписи - буквам слова в алфавитном порядке. Слова с одной
+подписью лежат в индексе подряд (группа), а хэш-таблица с открытой адресацией
+переводит подпись в номер группы: поиск - несколько чтений, независимо от
+размера словаря.
+
+Для случайного слова слова одной длины упорядочены по убыванию частоты и
+поделены на три уровня сложности (частые - легкие, редкие - трудные). Внутри
+уровня слово выбирается с вероятностью, пропорциональной частоте, - двоичным
+поиском по накопленным частотам.
+
+Примеры:
+    python words.py build words.txt
+    python words.py anagrams ТОК
+    python words.py random --length 5 --difficulty hard --count 10
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_right
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WORD_LIST = os.path.join(APP_DIR, "words.txt")
+
+MIN_LENGTH = 2
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+MAGIC = b'WPIX'
+VERSION = 1
+# Заголовок: метка, версия, порядок байт, число слов, групп и ячеек хэш-таблицы,
+# наибольшая длина слова и смещения восьми разделов файла
+HEADER = struct.Struct('<4sIIIIII8Q')
+BYTE_ORDERS = {'little': 1, 'big': 2}
+# Разделы идут в этом порядке; массивы записаны в порядке байт машины (array.tobytes)
+SECTIONS = (
+    ('word_offsets', 'I'),  # конец каждого слова в words (начало - конец предыдущего)
+    ('words', 'B'),         # слова в UTF-8 подряд, упорядоченные по (подпись, слово)
+    ('frequencies', 'I'),   # частота каждого слова
+    ('group_starts', 'I'),  # первое слово каждой группы анаграмм и общее число слов
+    ('slots', 'I'),         # хэш-таблица: номер группы + 1, 0 - пустая ячейка
+    ('length_starts', 'I'), # начало слов длины L в by_length
+    ('by_length', 'I'),     # номера слов по (длина, убывание частоты)
+    ('cumulative', 'Q'),    # накопленная частота в порядке by_length
+)
+
+
+def normalize(word):
+    return word.strip().upper().replace('Ё', 'Е')
+
+
+def signature(word):
+    """Буквы слова по алфавиту: одинаковы у всех анаграмм"""
+    return ''.join(sorted(normalize(word)))
+
+
+def _slot(key, mask):
+    return zlib.crc32(key.encode('utf-8')) & mask
+
+
+def read_word_list(path):
+    """Частоты слов из текстового списка: строки "слово [частота]", # - комментарий"""
+    frequencies = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith('#'):
+                continue
+            word = normalize(parts[0])
+            if len(word) < MIN_LENGTH or not word.isalpha():
+                continue
+            try:
+                frequency = int(float(parts[1])) if len(parts) > 1 else 1
+            except ValueError:
+                frequency = 1
+            frequencies[word] = min(frequencies.get(word, 0) + max(frequency, 1), 2**32 - 1)
+    return frequencies
+
+
+def build_index(list_path, index_path):
+    """Построение индексного файла по списку слов; возвращает число слов"""
+    frequencies = read_word_list(list_path)
+    entries = sorted((signature(word), word) for word in frequencies)
+    words = [word for _, word in entries]
+
+    word_offsets = array('I')
+    blob = bytearray()
+    group_starts = array('I')
+    previous = None
+    for position, (key, word) in enumerate(entries):
+        if key != previous:
+            group_starts.append(position)
+            previous = key
+        blob += word.encode('utf-8')
+        word_offsets.append(len(blob))
+    group_count = len(group_starts)
+    group_starts.append(len(words))
+
+    # Заполнение не больше половины: в среднем меньше двух проб на поиск
+    slot_count = 8
+    while slot_count < group_count * 2:
+        slot_count *= 2
+    slots = array('I', bytes(4 * slot_count))
+    for group in range(group_count):
+        slot = _slot(entries[group_starts[group]][0], slot_count - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = group + 1
+
+    word_frequencies = array('I', (frequencies[word] for word in words))
+    by_length = array('I', sorted(range(len(words)), key=lambda i: (len(words[i]), -word_frequencies[i], words[i])))
+    max_length = len(words[by_length[-1]]) if words else 0
+    length_starts = array('I', bytes(4 * (max_length + 2)))
+    for word in words:
+        length_starts[len(word) + 1] += 1
+    for length in range(1, max_length + 2):
+        length_starts[length] += length_starts[length - 1]
+    cumulative = array('Q')
+    total = 0
+    for i in by_length:
+        total += word_frequencies[i]
+        cumulative.append(total)
+
+    sections = [word_offsets, bytes(blob), word_frequencies, group_starts, slots, length_starts, by_length, cumulative]
+    offsets = []
+    position = HEADER.size
+    for data in sections:
+        position += -position % 8
+        offsets.append(position)
+        position += len(data) * (data.itemsize if isinstance(data, array) else 1)
+
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDERS[sys.byteorder], len(words), group_count,
+                            slot_count, max_length, *offsets))
+        for offset, data in zip(offsets, sections):
+            f.write(bytes(offset - f.tell()))
+            f.write(data if isinstance(data, bytes) else data.tobytes())
+    os.replace(tmp_path, index_path)
+    return len(words)
+
+
+class WordIndex:
+    """Открытый через mmap индекс слов"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, byte_order, self.word_count, self.group_count, self.slot_count, \
+                self.max_length, *offsets = HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = None
+        if magic != MAGIC or version != VERSION or byte_order != BYTE_ORDERS[sys.byteorder]:
+            self._map.close()
+            raise ValueError(f"{path}: индекс другой версии или поврежден")
+
+        sizes = {
+            'word_offsets': self.word_count, 'words': None, 'frequencies': self.word_count,
+            'group_starts': self.group_count + 1, 'slots': self.slot_count,
+            'length_starts': self.max_length + 2, 'by_length': self.word_count, 'cumulative': self.word_count,
+        }
+        view = memoryview(self._map)
+        self._views = [view]
+        for (name, code), offset in zip(SECTIONS, offsets):
+            if sizes[name] is None:
+                continue
+            section = view[offset:offset + sizes[name] * struct.calcsize(code)].cast(code)
+            self._views.append(section)
+            setattr(self, f"_{name}", section)
+        self._words_start = offsets[1]
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.word_count
+
+    def word(self, i):
+        start = self._word_offsets[i - 1] if i else 0
+        return self._map[self._words_start + start:self._words_start + self._word_offsets[i]].decode('utf-8')
+
+    def frequency(self, i):
+        return self._frequencies[i]
+
+    def _find_group(self, key):
+        mask = self.slot_count - 1
+        slot = _slot(key, mask)
+        while True:
+            group = self._slots[slot]
+            if not group:
+                return None
+            if signature(self.word(self._group_starts[group - 1])) == key:
+                return group - 1
+            slot = (slot + 1) & mask
+
+    def anagrams(self, letters):
+        """Все слова словаря из тех же букв (в том же количестве)"""
+        group = self._find_group(signature(letters))
+        if group is None:
+            return []
+        return [self.word(i) for i in range(self._group_starts[group], self._group_starts[group + 1])]
+
+    def contains(self, word):
+        return normalize(word) in self.anagrams(word)
+
+    def lengths(self):
+        """Длины, для которых в словаре есть слова"""
+        return [length for length in range(MIN_LENGTH, self.max_length + 1)
+                if self._length_starts[length + 1] > self._length_starts[length]]
+
+    def random_word(self, length=None, difficulty='medium', rng=random):
+        """Случайное слово заданной длины (None - любой) и сложности; None, если таких слов нет"""
+        if length is None:
+            lengths = self.lengths()
+            if not lengths:
+                return None
+            length = rng.choice(lengths)
+        if not MIN_LENGTH <= length <= self.max_length:
+            return None
+        start, end = self._length_starts[length], self._length_starts[length + 1]
+        if start == end:
+            return None
+        # Уровень - треть слов этой длины по частоте; в слишком короткой группе - все слова
+        level = DIFFICULTIES.index(difficulty)
+        count = end - start
+        low, high = start + count * level // 3, start + count * (level + 1) // 3
+        if low == high:
+            low, high = start, end
+
+        before = self._cumulative[low - 1] if low else 0
+        position = bisect_right(self._cumulative, before + rng.randrange(self._cumulative[high - 1] - before), low, high)
+        return self.word(self._by_length[position])
+
+
+def index_path_for(list_path):
+    return os.path.splitext(list_path)[0] + '.idx'
+
+
+def open_index(list_path=DEFAULT_WORD_LIST, index_path=None):
+    """Индекс списка слов; строится заново, если его нет, он устарел или другой версии.
+
+    Если рядом со списком писать нельзя, индекс строится во временном каталоге.
+    """
+    if index_path is None:
+        index_path = index_path_for(list_path)
+    try:
+        if os.path.getmtime(index_path) >= os.path.getmtime(list_path):
+            return WordIndex(index_path)
+    except (OSError, ValueError):
+        pass
+    try:
+        build_index(list_path, index_path)
+    except PermissionError:
+        index_path = os.path.join(tempfile.gettempdir(), os.path.basename(index_path))
+        build_index(list_path, index_path)
+    return WordIndex(index_path)
+
+
+def build_command(args):
+    count = build_index(args.list, args.output or index_path_for(args.list))
+    print(f"Индекс построен: {count} слов")
+
+
+def anagrams_command(args):
+    with open_index(args.list) as index:
+        words = index.anagrams(args.letters)
+        print(', '.join(words) if words else "Слов из этих букв нет")
+
+
+def random_command(args):
+    with open_index(args.list) as index:
+        for _ in range(args.count):
+            print(index.random_word(args.length, args.difficulty) or "Слов такой длины нет")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Словарь игры")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="построить индекс по списку слов")
+    build_parser.add_argument("list", nargs="?", default=DEFAULT_WORD_LIST, help="строки \"слово частота\" в UTF-8")
+    build_parser.add_argument("--output", help="файл индекса (по умолчанию рядом со списком, .idx)")
+    build_parser.set_defaults(handler=build_command)
+
+    anagrams_parser = commands.add_parser("anagrams", help="слова из заданных букв")
+    anagrams_parser.add_argument("letters")
+    anagrams_parser.add_argument("--list", default=DEFAULT_WORD_LIST)
+    anagrams_parser.set_defaults(handler=anagrams_command)
+
+    random_parser = commands.add_parser("random", help="случайные слова по длине и сложности")
+    random_parser.add_argument("--length", type=int)
+    random_parser.add_argument("--difficulty", choices=DIFFICULTIES, default='medium')
+    random_parser.add_argument("--count", type=int, default=1)
+    random_parser.add_argument("--list", default=DEFAULT_WORD_LIST)
+    random_parser.set_defaults(handler=random_command)
+
+    args = parser.parse_args(argv)
+    return args.handler(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
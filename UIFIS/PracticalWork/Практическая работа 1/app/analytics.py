@@ -0,0 +1,87 @@
+"""Аналитика по предложениям: динамика подачи, перцентили стоимости и сроки переходов.
+
+Агрегаты по времени и статусам считает SQLite. Перцентили стоимости по
+категориям и отделам при наличии NumPy считаются векторно за одно чтение
+таблицы (оба среза сразу), без NumPy - оконными функциями SQL.
+"""
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (50, 90, 99)
+
+PERIOD_TITLES = {
+    'week': 'по неделям',
+    'month': 'по месяцам',
+}
+
+
+class AnalyticsResult:
+    """Результаты аналитики для отчета"""
+
+    def __init__(self, period):
+        self.period = period
+        self.trend = []
+        # {'category': [(значение, количество, p50, p90, p99), ...], 'department': [...]}
+        self.percentiles = {}
+        # Сроки переходов по журналу изменений: [(статус, количество, средний, максимальный), ...]
+        self.lead_times = []
+        self.seconds = 0.0
+
+
+def compute_analytics(db, period='month'):
+    """Расчет всех показателей аналитического отчета"""
+    started = time.perf_counter()
+    result = AnalyticsResult(period)
+    result.trend = db.get_creation_trend(period)
+    if np is not None:
+        result.percentiles = cost_percentiles_numpy(db)
+    else:
+        result.percentiles = {
+            dimension: db.get_cost_percentiles(dimension, PERCENTILES)
+            for dimension in ('category', 'department')
+        }
+    result.lead_times = db.get_status_lead_times()
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def cost_percentiles_numpy(db):
+    """Перцентили стоимости по категориям и отделам за одно чтение таблицы.
+
+    Значения срезов кодируются числами по мере чтения, затем для каждого среза
+    стоимость сортируется внутри групп одним lexsort, а перцентили (по ближайшему
+    рангу) берутся индексами от начала каждой группы.
+    """
+    names = ({}, {})
+    codes = ([], [])
+    costs = []
+    for batch in db.iter_cost_rows():
+        for i, index in enumerate(names):
+            codes[i].append(np.fromiter(
+                (index.setdefault(row[i], len(index)) for row in batch), np.int64, len(batch)
+            ))
+        costs.append(np.fromiter((row[2] for row in batch), np.float64, len(batch)))
+
+    if not costs:
+        return {'category': [], 'department': []}
+    costs = np.concatenate(costs)
+
+    result = {}
+    for dimension, index, group_codes in zip(('category', 'department'), names, codes):
+        group_codes = np.concatenate(group_codes)
+        sorted_costs = costs[np.lexsort((costs, group_codes))]
+        sizes = np.bincount(group_codes, minlength=len(index))
+        starts = np.cumsum(sizes) - sizes
+        # Ранг перцентиля p в группе размера n: ceil(p * n / 100), в целых числах
+        values = [sorted_costs[starts + (sizes * p + 99) // 100 - 1] for p in PERCENTILES]
+        rows = [
+            (name, int(sizes[code]), *(float(column[code]) for column in values))
+            for name, code in index.items()
+        ]
+        rows.sort(key=lambda row: (-row[1], row[0]))
+        result[dimension] = rows
+    return result
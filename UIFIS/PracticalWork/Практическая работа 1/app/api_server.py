@@ -0,0 +1,451 @@
+"""HTTP/JSON-сервис поверх базы предложений (без Tk-интерфейса).
+
+Сервер на asyncio из стандартной библиотеки: соединения keep-alive обслуживает
+цикл событий, запросы к базе выполняются в пуле потоков (каждый поток держит
+свое соединение с SQLite), отчеты строятся в пуле процессов очереди report_jobs.
+
+Запуск:
+    python api_server.py --db proposals.db --port 8080
+
+Методы:
+    GET    /proposals?status=&category=&limit=&cursor=   список (курсор - поле next ответа)
+    GET    /proposals?q=текст&offset=                     поиск по тексту
+    POST   /proposals                                     создание (JSON предложения)
+    GET    /proposals/{id}
+    PUT    /proposals/{id}                                изменение (JSON предложения)
+    DELETE /proposals/{id}?version=
+
+Изменение и удаление с полем (параметром) version выполняются, только если
+предложение не меняли после чтения этой версии; иначе - 409 с текущим состоянием.
+    GET    /proposals/{id}/history                        журнал изменений
+    GET    /statistics?as_of=ГГГГ-ММ-ДД[ ЧЧ:ММ:СС]
+    POST   /reports                                       {"type": "full", "format": "pdf"}
+    GET    /reports, GET /reports/{id}, DELETE /reports/{id} (отмена)
+    GET    /reports/{id}/file                             готовый файл отчета
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl
+from bulk_io import validate_record
+from database import Database, ConflictError, HISTORY_COLUMNS
+from models import Proposal, DATE_FORMAT, CATEGORY_BY_VALUE, STATUS_BY_VALUE
+
+# Ограничения запроса: размер заголовков и тела, число записей на странице
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+MAX_PAGE_SIZE = 500
+DEFAULT_PAGE_SIZE = 50
+FILE_CHUNK_BYTES = 256 * 1024
+
+HISTORY_FIELDS = HISTORY_COLUMNS.split(', ')
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'html': 'text/html; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+ROUTES = [
+    ('GET', r'/proposals', 'list_proposals'),
+    ('POST', r'/proposals', 'create_proposal'),
+    ('GET', r'/proposals/(\d+)', 'get_proposal'),
+    ('PUT', r'/proposals/(\d+)', 'update_proposal'),
+    ('DELETE', r'/proposals/(\d+)', 'delete_proposal'),
+    ('GET', r'/proposals/(\d+)/history', 'proposal_history'),
+    ('GET', r'/statistics', 'statistics'),
+    ('GET', r'/reports', 'list_reports'),
+    ('POST', r'/reports', 'create_report'),
+    ('GET', r'/reports/(\d+)', 'get_report'),
+    ('DELETE', r'/reports/(\d+)', 'cancel_report'),
+    ('GET', r'/reports/(\d+)/file', 'report_file'),
+]
+
+
+class HttpError(Exception):
+    """Ошибка запроса, которая возвращается клиенту с кодом status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Request:
+    """Разобранный HTTP-запрос"""
+
+    def __init__(self, method, path, query, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.body = body
+
+    def json(self):
+        try:
+            data = json.loads(self.body or b'null')
+        except ValueError as e:
+            raise HttpError(400, f"Некорректный JSON: {e}")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Ожидается JSON-объект")
+        return data
+
+    def int_param(self, name, default, minimum=0, maximum=None):
+        value = self.query.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise HttpError(400, f"Параметр {name} должен быть целым числом")
+        if value < minimum or (maximum is not None and value > maximum):
+            raise HttpError(400, f"Параметр {name} вне допустимого диапазона")
+        return value
+
+
+class FileResponse:
+    """Ответ с содержимым файла (передается частями)"""
+
+    def __init__(self, path, content_type):
+        self.path = path
+        self.content_type = content_type
+
+
+def encode_cursor(proposal):
+    """Курсор следующей страницы: ключ сортировки последнего предложения"""
+    return f"{proposal.priority},{proposal.created_date_text},{proposal.id}"
+
+
+def decode_cursor(text):
+    try:
+        priority, created_date, proposal_id = text.split(',')
+        datetime.strptime(created_date, DATE_FORMAT)
+        return int(priority), created_date, int(proposal_id)
+    except ValueError:
+        raise HttpError(400, "Некорректный курсор страницы")
+
+
+class ApiServer:
+    """Обработчики HTTP-методов и обслуживание соединений"""
+
+    def __init__(self, db_name, threads=8):
+        self.db = Database(db_name, reuse_connections=True)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='db')
+        self.routes = [(method, re.compile(pattern + '$'), getattr(self, name)) for method, pattern, name in ROUTES]
+        # Очередь отчетов (пул процессов) создается при первом обращении
+        self.report_queue = None
+
+    async def run(self, function, *args):
+        """Выполнение вызова базы данных в пуле потоков"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    # ----- Соединения -----
+
+    async def handle_connection(self, reader, writer):
+        """Обслуживание одного соединения: запросы читаются по очереди, пока клиент
+        не закроет соединение или не попросит Connection: close"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 431, {'error': "Слишком большие заголовки"}, keep_alive=False)
+                    break
+
+                # Клиенты обычно кодируют путь, но curl и браузеры могут прислать UTF-8 как есть
+                lines = head.decode('utf-8', 'replace').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ')
+                except ValueError:
+                    await self._send(writer, 400, {'error': "Некорректная строка запроса"}, keep_alive=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                # Только десятичное число: int() принял бы и "-1", "+5" или "1_000"
+                content_length = headers.get('content-length') or '0'
+                if not (content_length.isascii() and content_length.isdigit()):
+                    await self._send(writer, 400, {'error': "Некорректный заголовок Content-Length"}, keep_alive=False)
+                    break
+                length = int(content_length)
+                if length > MAX_BODY_BYTES:
+                    await self._send(writer, 413, {'error': "Слишком большое тело запроса"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                url = urlsplit(target)
+                request = Request(method, url.path.rstrip('/') or '/', dict(parse_qsl(url.query)), body)
+                status, payload = await self.dispatch(request)
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+        """Поиск обработчика по методу и пути; возвращает (код, данные ответа)"""
+        allowed = False
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if match is None:
+                continue
+            if method != request.method:
+                allowed = True
+                continue
+            try:
+                return await handler(request, *match.groups())
+            except HttpError as e:
+                return e.status, {'error': str(e)}
+            except Exception:
+                traceback.print_exc()
+                return 500, {'error': "Внутренняя ошибка сервера"}
+        if allowed:
+            return 405, {'error': "Метод не поддерживается"}
+        return 404, {'error': "Не найдено"}
+
+    async def _send(self, writer, status, payload, keep_alive):
+        if isinstance(payload, FileResponse):
+            await self._send_file(writer, status, payload, keep_alive)
+            return
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(self._head(status, 'application/json; charset=utf-8', len(body), keep_alive) + body)
+        await writer.drain()
+
+    async def _send_file(self, writer, status, response, keep_alive):
+        loop = asyncio.get_running_loop()
+        with open(response.path, 'rb') as f:
+            writer.write(self._head(status, response.content_type, os.fstat(f.fileno()).st_size, keep_alive))
+            while True:
+                chunk = await loop.run_in_executor(self.executor, f.read, FILE_CHUNK_BYTES)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+
+    @staticmethod
+    def _head(status, content_type, length, keep_alive):
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {length}\r\n")
+        if not keep_alive:
+            head += "Connection: close\r\n"
+        return (head + "\r\n").encode('latin-1')
+
+    # ----- Предложения -----
+
+    async def list_proposals(self, request):
+        status = request.query.get('status')
+        category = request.query.get('category')
+        if status and status not in STATUS_BY_VALUE:
+            raise HttpError(400, f"Неизвестный статус: {status}")
+        if category and category not in CATEGORY_BY_VALUE:
+            raise HttpError(400, f"Неизвестная категория: {category}")
+        limit = request.int_param('limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+
+        text = request.query.get('q')
+        if text:
+            # Результаты поиска упорядочены по релевантности, поэтому страницы - по смещению
+            offset = request.int_param('offset', 0)
+            found = await self.run(self.db.search_proposals, text, status, category, limit, offset)
+            return 200, {
+                'items': [dict(proposal.to_dict(), snippet=snippet) for proposal, snippet in found],
+                'next_offset': offset + limit if len(found) == limit else None,
+            }
+
+        after = decode_cursor(request.query['cursor']) if request.query.get('cursor') else None
+        page = await self.run(self.db.get_proposals_page, status, category, after, limit)
+        return 200, {
+            'items': [proposal.to_dict() for proposal in page],
+            'next': encode_cursor(page[-1]) if len(page) == limit else None,
+        }
+
+    async def get_proposal(self, request, proposal_id):
+        return 200, (await self._existing(proposal_id)).to_dict()
+
+    async def create_proposal(self, request):
+        proposal = Proposal(None, *self._validate(request.json()))
+        await self.run(self.db.add_proposal, proposal)
+        return 201, proposal.to_dict()
+
+    async def update_proposal(self, request, proposal_id):
+        existing = await self._existing(proposal_id)
+        data = request.json()
+        # Дата создания не меняется; если ее не передали, проверяется сохраненная
+        data.setdefault('created_date', existing.created_date_text)
+        proposal = Proposal(existing.id, *self._validate(data))
+        proposal.created_date = existing.created_date_text
+        proposal.version = data.get('version')
+        if proposal.version is not None and type(proposal.version) is not int:
+            raise HttpError(400, "Поле version должно быть целым числом")
+        try:
+            await self.run(self.db.update_proposal, proposal)
+        except ConflictError as e:
+            return self._conflict(e)
+        return 200, proposal.to_dict()
+
+    async def delete_proposal(self, request, proposal_id):
+        await self._existing(proposal_id)
+        version = request.int_param('version', None, 1)
+        try:
+            await self.run(self.db.delete_proposal, int(proposal_id), version)
+        except ConflictError as e:
+            return self._conflict(e)
+        return 200, {'deleted': int(proposal_id)}
+
+    @staticmethod
+    def _conflict(error):
+        if error.current is None:
+            raise HttpError(404, str(error))
+        return 409, {'error': str(error), 'current': error.current.to_dict()}
+
+    async def proposal_history(self, request, proposal_id):
+        await self._existing(proposal_id)
+        rows = await self.run(self.db.get_proposal_history, int(proposal_id))
+        return 200, [dict(zip(HISTORY_FIELDS, row)) for row in rows]
+
+    async def _existing(self, proposal_id):
+        proposal = await self.run(self.db.get_proposal_by_id, int(proposal_id))
+        if proposal is None:
+            raise HttpError(404, f"Предложение {proposal_id} не найдено")
+        return proposal
+
+    @staticmethod
+    def _validate(data):
+        """Проверка полей предложения теми же правилами, что и при импорте"""
+        try:
+            return validate_record(data, datetime.now().strftime(DATE_FORMAT))
+        except (ValueError, TypeError, KeyError) as e:
+            raise HttpError(400, f"Некорректное предложение: {e}")
+
+    # ----- Статистика -----
+
+    async def statistics(self, request):
+        moment = request.query.get('as_of')
+        if not moment:
+            return 200, await self.run(self.db.get_statistics)
+        if len(moment) == 10:
+            moment += " 23:59:59"
+        try:
+            datetime.fromisoformat(moment)
+        except ValueError:
+            raise HttpError(400, "Параметр as_of: ожидается ГГГГ-ММ-ДД или 'ГГГГ-ММ-ДД ЧЧ:ММ:СС'")
+        return 200, dict(await self.run(self.db.get_statistics_as_of, moment), as_of=moment)
+
+    # ----- Отчеты -----
+
+    def _reports(self):
+        if self.report_queue is None:
+            from report_jobs import ReportJobQueue
+            self.report_queue = ReportJobQueue(self.db.db_name)
+        # Перенос событий рабочих процессов в состояние заданий
+        self.report_queue.poll()
+        return self.report_queue
+
+    def _job(self, job_id):
+        for job in self._reports().jobs():
+            if job.id == int(job_id):
+                return job
+        raise HttpError(404, f"Отчет {job_id} не найден")
+
+    @staticmethod
+    def _job_dict(job):
+        return {
+            'id': job.id,
+            'type': job.report_type,
+            'format': job.format_type,
+            'state': job.state,
+            'rows': job.rows,
+            'pages': job.pages,
+            'error': job.error,
+            'file': os.path.basename(job.result) if job.result else None,
+            'submitted_at': job.submitted_at.strftime(DATE_FORMAT),
+            'finished_at': job.finished_at.strftime(DATE_FORMAT) if job.finished_at else None,
+        }
+
+    async def list_reports(self, request):
+        return 200, [self._job_dict(job) for job in self._reports().jobs()]
+
+    async def create_report(self, request):
+        data = request.json()
+        format_type = data.get('format', 'pdf')
+        if format_type not in CONTENT_TYPES:
+            raise HttpError(400, f"Неподдерживаемый формат отчета: {format_type}")
+        try:
+            job = self._reports().submit(data.get('type', 'full'), format_type)
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        return 202, self._job_dict(job)
+
+    async def get_report(self, request, job_id):
+        return 200, self._job_dict(self._job(job_id))
+
+    async def cancel_report(self, request, job_id):
+        job = self._job(job_id)
+        self._reports().cancel(job.id)
+        return 200, self._job_dict(job)
+
+    async def report_file(self, request, job_id):
+        job = self._job(job_id)
+        if job.result is None:
+            raise HttpError(409, f"Отчет {job_id} еще не готов (состояние: {job.state})")
+        if not os.path.exists(job.result):
+            raise HttpError(410, f"Файл отчета {job_id} уже удален из кэша отчетов")
+        return 200, FileResponse(job.result, CONTENT_TYPES[job.format_type])
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.report_queue is not None:
+            self.report_queue.shutdown()
+
+
+async def serve(server, host, port):
+    listener = await asyncio.start_server(server.handle_connection, host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+    print(f"Сервис предложений: http://{host}:{port} (база {server.db.db_name})")
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, stopped.set)
+        except NotImplementedError:
+            # Windows: остановка по Ctrl+C через KeyboardInterrupt
+            pass
+    async with listener:
+        await stopped.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON-сервис базы предложений")
+    parser.add_argument("--db", default="proposals.db", help="путь к файлу базы данных")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--threads", type=int, default=8, help="потоков для запросов к базе")
+    args = parser.parse_args(argv)
+
+    server = ApiServer(args.db, args.threads)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Пакетный экспорт карточек предложений в PDF.
+
+Каждое предложение верстается в отдельный файл в пуле процессов (по числу
+ядер). Файлы записываются атомарно, а предложения, содержимое которых не
+изменилось с прошлого экспорта, пропускаются. По желанию все карточки
+объединяются в один документ с закладками.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from models import Proposal
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class BatchExportResult:
+    """Итог пакетного экспорта"""
+
+    def __init__(self):
+        self.rendered = 0
+        self.skipped = 0
+        self.removed = 0
+        self.seconds = 0.0
+        self.bundle = None
+
+    def __str__(self):
+        text = (f"Сформировано {self.rendered}, без изменений {self.skipped}, "
+                f"удалено {self.removed} за {self.seconds:.2f} с")
+        if self.bundle:
+            text += f"; общий файл: {self.bundle}"
+        return text
+
+
+def content_hash(proposal, template_version):
+    """Хэш содержимого карточки: данные предложения и версия шаблона"""
+    fields = proposal.to_dict()
+    # Номер версии строки в карточку не выводится: без изменения данных карточка не перестраивается
+    del fields['version']
+    data = json.dumps([template_version, fields], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def proposal_filename(proposal_id):
+    return f"proposal_{proposal_id}.pdf"
+
+
+def atomic_write_json(path, data):
+    """Запись JSON через временный файл и os.replace"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def render_proposal(item):
+    """Верстка одной карточки в рабочем процессе; файл появляется только целиком"""
+    from report_generator import ReportGenerator
+
+    data, digest, path = item
+    tmp_path = f"{path}.tmp"
+    # Для карточки база не нужна: предложение передается целиком
+    ReportGenerator(None).generate_proposal_pdf(Proposal.from_dict(data), tmp_path)
+    os.replace(tmp_path, path)
+    return data['id'], digest
+
+
+def load_manifest(export_dir):
+    path = os.path.join(export_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return {int(proposal_id): digest for proposal_id, digest in json.load(f).items()}
+
+
+def export_proposal_pdfs(db, export_dir, workers=None, force=False, bundle=None, progress=None):
+    """Экспорт карточек всех предложений в каталог export_dir.
+
+    workers - число процессов (по умолчанию по числу ядер), force - перегенерировать
+    все файлы, bundle - путь общего PDF с закладками, progress(rendered) -
+    уведомление после каждой сверстанной карточки.
+    """
+    from report_generator import PROPOSAL_TEMPLATE_VERSION
+
+    started = time.perf_counter()
+    result = BatchExportResult()
+    os.makedirs(export_dir, exist_ok=True)
+    previous = load_manifest(export_dir)
+    # В манифест попадают только действительно записанные карточки, поэтому
+    # после прерванного экспорта следующий запуск продолжит с того же места
+    manifest = {}
+    bookmarks = []
+
+    def pending():
+        for proposal in db.iter_proposals():
+            digest = content_hash(proposal, PROPOSAL_TEMPLATE_VERSION)
+            path = os.path.join(export_dir, proposal_filename(proposal.id))
+            bookmarks.append((proposal.id, proposal.title, path))
+            if not force and previous.get(proposal.id) == digest and os.path.exists(path):
+                manifest[proposal.id] = digest
+                result.skipped += 1
+                continue
+            yield proposal.to_dict(), digest, path
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for proposal_id, digest in executor.map(render_proposal, pending(), chunksize=8):
+                manifest[proposal_id] = digest
+                result.rendered += 1
+                if progress is not None:
+                    progress(result.rendered)
+    finally:
+        atomic_write_json(os.path.join(export_dir, MANIFEST_NAME), {str(k): v for k, v in manifest.items()})
+
+    # Карточки удаленных предложений больше не нужны
+    existing = {proposal_id for proposal_id, title, path in bookmarks}
+    for proposal_id in set(previous) - existing:
+        path = os.path.join(export_dir, proposal_filename(proposal_id))
+        if os.path.exists(path):
+            os.remove(path)
+            result.removed += 1
+
+    if bundle:
+        merge_pdfs(bookmarks, bundle)
+        result.bundle = bundle
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def merge_pdfs(bookmarks, bundle):
+    """Объединение карточек в один PDF; для каждой карточки создается закладка.
+
+    bookmarks - список (id, название, путь к файлу) в нужном порядке.
+    """
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        raise RuntimeError("Для объединения PDF необходим пакет pypdf (pip install pypdf)")
+
+    writer = PdfWriter()
+    for proposal_id, title, path in bookmarks:
+        writer.append(path, outline_item=f"№{proposal_id} {title}")
+
+    tmp_path = f"{bundle}.tmp"
+    with open(tmp_path, 'wb') as f:
+        writer.write(f)
+    writer.close()
+    os.replace(tmp_path, bundle)
@@ -0,0 +1,588 @@
+"""Замеры производительности системы предложений.
+
+Примеры:
+    python benchmark.py proposals --rows 200000
+    python benchmark.py report-setup
+    python benchmark.py full-report --rows 10000 100000 1000000
+    python benchmark.py writers --rows 100000
+    python benchmark.py concurrency --writers 8 --updates 200
+    python benchmark.py scoring --rows 1000000
+    python benchmark.py duplicates --rows 1000000
+    python benchmark.py startup --rows 1000000 --runs 5
+    python benchmark.py search --rows 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from multiprocessing import Pool
+from database import Database, ConflictError, PROPOSAL_COLUMNS, BUSY_TIMEOUT, SEARCH_COUNT_LIMIT
+from models import Category, Status
+
+
+def create_database(path, rows):
+    """Временная база с заданным количеством сгенерированных предложений"""
+    db = Database(path)
+    categories = [category.value for category in Category]
+    statuses = [status.value for status in Status]
+    db.add_proposals_bulk((
+        (
+            f"Предложение {i}", f"Описание предложения номер {i}", categories[i % len(categories)],
+            statuses[i % len(statuses)], f"Автор {i % 50}", f"Отдел {i % 12}", i % 3 + 1,
+            f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:00:00", "Польза", float(i % 1000) * 100,
+            f"{i % 12 + 1} месяца", "Риски"
+        )
+        for i in range(rows)
+    ), defer_indexes=True)
+    return db
+
+
+def measure(label, load):
+    """Время загрузки и память, занимаемая результатом, в пересчете на одну запись.
+    
+    Время и память меряются в разных прогонах: tracemalloc сильно замедляет выделение памяти.
+    """
+    started = time.perf_counter()
+    items = load()
+    seconds = time.perf_counter() - started
+    del items
+
+    tracemalloc.start()
+    items = load()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"  {label:<40} {seconds * 1000:>9.1f} мс  {memory / max(len(items), 1):>7.0f} байт/запись")
+    return items
+
+
+@dataclass
+class LegacyProposal:
+    """Прежнее представление: обычный dataclass с __dict__"""
+    id: int = None
+    title: str = ""
+    description: str = ""
+    category: Category = Category.OTHER
+    status: Status = Status.NEW
+    author: str = ""
+    department: str = ""
+    priority: int = 3
+    created_date: datetime = None
+    expected_benefit: str = ""
+    estimated_cost: float = 0.0
+    implementation_time: str = ""
+    risks: str = ""
+
+
+def load_legacy(db):
+    """Прежний путь загрузки: промежуточный словарь и разбор enum и даты в каждой строке"""
+    conn = sqlite3.connect(db.db_name)
+    rows = conn.execute(f'SELECT {PROPOSAL_COLUMNS} FROM proposals ORDER BY priority, created_date DESC').fetchall()
+    proposals = []
+    for row in rows:
+        data = dict(zip(('id', 'title', 'description', 'category', 'status', 'author', 'department',
+                         'priority', 'created_date', 'expected_benefit', 'estimated_cost',
+                         'implementation_time', 'risks'), row))
+        proposals.append(LegacyProposal(
+            id=data['id'], title=data['title'], description=data['description'],
+            category=Category(data['category']), status=Status(data['status']),
+            author=data['author'], department=data['department'], priority=data['priority'],
+            created_date=datetime.strptime(data['created_date'], '%Y-%m-%d %H:%M:%S'),
+            expected_benefit=data['expected_benefit'], estimated_cost=data['estimated_cost'],
+            implementation_time=data['implementation_time'], risks=data['risks']
+        ))
+    conn.close()
+    return proposals
+
+
+def bench_proposals(args):
+    """Загрузка больших выборок: прежний dataclass против Proposal со __slots__"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = create_database(os.path.join(directory, "bench.db"), args.rows)
+        print(f"Загрузка {args.rows} предложений:")
+        measure("dict + from_dict + dataclass (прежний)", lambda: load_legacy(db))
+        proposals = measure("row_factory + __slots__ (ленивая дата)", db.get_all_proposals)
+
+        started = time.perf_counter()
+        for proposal in proposals:
+            proposal.created_date
+        print(f"  {'первое обращение к дате':<40} {(time.perf_counter() - started) * 1000:>9.1f} мс")
+
+
+def bench_report_setup(args):
+    """Стоимость подготовки отчета: шрифты, таблица стилей и стили абзацев"""
+    # ReportLab импортируется здесь, чтобы остальные замеры работали и без него
+    import report_generator
+    from report_generator import ReportGenerator, sample_styles
+
+    def setup(db):
+        generator = ReportGenerator(db)
+        styles = sample_styles()
+        for name, parent, size in (('TitleStyle', 'Heading1', 16), ('Heading2', 'Heading2', 12),
+                                   ('Heading3', 'Heading3', 11), ('Normal', 'Normal', 10)):
+            generator._get_paragraph_style(name, styles[parent], fontSize=size)
+        return generator
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = create_database(os.path.join(directory, "bench.db"), 10)
+        proposal = db.get_proposal_by_id(1)
+
+        started = time.perf_counter()
+        generator = setup(db)
+        first = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            setup(db)
+        cached = (time.perf_counter() - started) / args.repeat
+        print(f"Подготовка ReportGenerator: первый {first * 1000:.2f} мс, "
+              f"последующие {cached * 1000:.3f} мс")
+
+        timings = []
+        for _ in range(args.reports):
+            started = time.perf_counter()
+            generator = ReportGenerator(db)
+            generator.reports_dir = directory
+            generator.generate_proposal_pdf(proposal)
+            timings.append(time.perf_counter() - started)
+        print(f"PDF предложения: первый {timings[0] * 1000:.1f} мс, "
+              f"последующие в среднем {sum(timings[1:]) / max(len(timings) - 1, 1) * 1000:.1f} мс")
+        print(f"Шрифт по умолчанию: {generator.default_font}, "
+              f"стилей в кэше: {len(report_generator._style_cache)}")
+
+
+def peak_rss():
+    """Пиковый размер памяти процесса в байтах; None, если его не узнать (нет модуля
+    resource, например в Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS отдает байты, остальные Unix - килобайты
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def bench_full_report(args):
+    """Время верстки и пиковая память полного PDF-отчета для разного числа строк.
+    
+    Каждый размер замеряется в отдельном процессе, чтобы пиковая память не накапливалась.
+    """
+    if len(args.rows) > 1:
+        for rows in args.rows:
+            subprocess.run([sys.executable, os.path.abspath(__file__), "full-report", "--rows", str(rows)], check=True)
+        return
+
+    from report_generator import ReportGenerator
+
+    rows = args.rows[0]
+    with tempfile.TemporaryDirectory() as directory:
+        db = create_database(os.path.join(directory, "bench.db"), rows)
+        generator = ReportGenerator(db)
+        generator.reports_dir = directory
+        baseline = peak_rss()
+
+        pages = []
+        generator.progress = lambda kind, value: pages.append(value) if kind == 'pages' else None
+        started = time.perf_counter()
+        filename = generator.generate_full_report('pdf')
+        seconds = time.perf_counter() - started
+
+        peak = peak_rss()
+        memory = f"пик памяти +{(peak - baseline) / 2**20:.0f} МБ" if peak is not None else "пик памяти не измерен"
+        print(f"{rows:>9} строк: {seconds:8.2f} с, {seconds / rows * 1e6:7.1f} мкс/строку, "
+              f"{max(pages, default=0)} стр., {memory} "
+              f"(PDF {os.path.getsize(filename) / 2**20:.1f} МБ)")
+
+
+def bench_writers(args):
+    """Пропускная способность потоковых форматов полного отчета и пиковая память Python"""
+    from report_generator import ReportGenerator
+    from report_writers import WRITERS
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = create_database(os.path.join(directory, "bench.db"), args.rows)
+        generator = ReportGenerator(db)
+        generator.reports_dir = directory
+        generator.use_cache = False
+        print(f"Полный отчет, {args.rows} строк:")
+        for format_type in WRITERS:
+            started = time.perf_counter()
+            filename = generator.generate_full_report(format_type)
+            seconds = time.perf_counter() - started
+            size = os.path.getsize(filename)
+
+            # Память меряется отдельным прогоном: tracemalloc замедляет выделение
+            tracemalloc.start()
+            generator.generate_full_report(format_type)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {format_type:<5} {seconds:7.2f} с  {args.rows / seconds:>9,.0f} строк/с  "
+                  f"{size / 2**20 / seconds:6.1f} МБ/с  файл {size / 2**20:6.1f} МБ  пик памяти {peak / 2**20:5.1f} МБ")
+
+
+def concurrent_writer(task):
+    """Процесс-писатель: увеличивает стоимость случайных предложений на 1 (чтение, изменение,
+    запись); при конфликте версий перечитывает предложение и повторяет"""
+    db_name, ids, updates, check, seed, start_at = task
+    db = Database(db_name)
+    generator = random.Random(seed)
+    applied = Counter()
+    latencies = []
+    conflicts = 0
+    time.sleep(max(0.0, start_at - time.time()))
+    for _ in range(updates):
+        proposal_id = generator.choice(ids)
+        started = time.perf_counter()
+        while True:
+            proposal = db.get_proposal_by_id(proposal_id)
+            proposal.estimated_cost += 1
+            if not check:
+                proposal.version = None
+            try:
+                db.update_proposal(proposal)
+                break
+            except ConflictError:
+                conflicts += 1
+        latencies.append(time.perf_counter() - started)
+        applied[proposal_id] += 1
+    return applied, latencies, conflicts
+
+
+def bench_concurrency(args):
+    """Одновременные писатели в разных процессах: потерянные обновления и задержка записи.
+    
+    Каждый режим (с проверкой версии и без нее) запускается на свежей базе; потерянным
+    считается увеличение стоимости, которого нет в итоговых данных.
+    """
+    failed = False
+    for check in (False, True):
+        with tempfile.TemporaryDirectory() as directory:
+            db_name = os.path.join(directory, "bench.db")
+            db = create_database(db_name, args.rows)
+            ids = list(range(1, min(args.hot, args.rows) + 1))
+            before = {proposal_id: db.get_proposal_by_id(proposal_id) for proposal_id in ids}
+
+            start_at = time.time() + 1.0
+            tasks = [(db_name, ids, args.updates, check, seed, start_at) for seed in range(args.writers)]
+            with Pool(args.writers) as pool:
+                results = pool.map(concurrent_writer, tasks)
+            seconds = time.time() - start_at
+
+            applied = sum((result[0] for result in results), Counter())
+            latencies = sorted(latency for result in results for latency in result[1])
+            conflicts = sum(result[2] for result in results)
+            lost = 0
+            for proposal_id, proposal in before.items():
+                after = db.get_proposal_by_id(proposal_id)
+                lost += proposal.estimated_cost + applied[proposal_id] - after.estimated_cost
+                if check and after.version != proposal.version + applied[proposal_id]:
+                    print(f"  предложение {proposal_id}: версия {after.version}, "
+                          f"ожидалась {proposal.version + applied[proposal_id]}")
+                    failed = True
+
+            total = len(latencies)
+            print(f"{'С проверкой версии' if check else 'Без проверки версии'}: {args.writers} процессов, "
+                  f"{total} обновлений {len(ids)} предложений за {seconds:.2f} с ({total / seconds:,.0f} в секунду)")
+            print(f"  конфликтов версий (повторено): {conflicts}, потеряно обновлений: {lost:.0f}")
+            print(f"  задержка: p50 {latencies[total // 2] * 1000:.1f} мс, "
+                  f"p99 {latencies[min(total - 1, total * 99 // 100)] * 1000:.1f} мс, "
+                  f"max {latencies[-1] * 1000:.1f} мс")
+            if check and (lost or latencies[-1] > BUSY_TIMEOUT):
+                failed = True
+    if failed:
+        print("ОШИБКА: с проверкой версии обновления потеряны или запись ждала дольше BUSY_TIMEOUT")
+        return 1
+    return 0
+
+
+def bench_scoring(args):
+    """Оценка и отбор лучших предложений на большой базе: первое чтение, пересчет
+    с новыми весами, отбор без полной сортировки и досинхронизация после записей"""
+    import scoring
+    from scoring import ScoringEngine
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = create_database(os.path.join(directory, "bench.db"), args.rows)
+        engine = ScoringEngine(db)
+        print(f"Оценка {args.rows} предложений ({'NumPy' if scoring.np is not None else 'без NumPy'}):")
+
+        def timed(label, action):
+            started = time.perf_counter()
+            result = action()
+            print(f"  {label:<44} {(time.perf_counter() - started) * 1000:>9.1f} мс")
+            return result
+
+        timed("чтение столбцов", engine.refresh)
+        timed("оценка и отбор 20 лучших", lambda: engine.top(20))
+        timed("отбор 20 лучших (оценки из кэша)", lambda: engine.top(20))
+        engine.configure({'cost': 0.5})
+        top = timed("новые веса: оценка и отбор 20 лучших", lambda: engine.top(20))
+        if scoring.np is not None:
+            scores = engine.scores()
+            timed("для сравнения: полная сортировка оценок", lambda: scoring.np.argsort(-scores, kind='stable'))
+
+        for proposal_id, _ in top[:args.updates]:
+            proposal = db.get_proposal_by_id(proposal_id)
+            proposal.priority = 3
+            db.update_proposal(proposal)
+        timed(f"после {min(args.updates, len(top))} изменений: досинхронизация и отбор", lambda: engine.top(20))
+
+
+def generated_texts(rows, duplicate_share, seed=1):
+    """Названия и описания из случайных слов; доля duplicate_share - копии более ранних
+    предложений с двумя замененными словами. Возвращает (тексты, [(номер копии, номер оригинала)])"""
+    generator = random.Random(seed)
+    syllables = ["ра", "зо", "ви", "ка", "ло", "те", "ми", "ну", "пре", "дос", "гра", "ция", "ник", "вер", "сти"]
+    vocabulary = sorted({''.join(generator.choices(syllables, k=generator.randint(2, 4))) for _ in range(20000)})
+    texts = []
+    copies = []
+    for i in range(rows):
+        if i > 10 and generator.random() < duplicate_share:
+            original = generator.randrange(i)
+            words = texts[original][1].split()
+            for _ in range(2):
+                words[generator.randrange(len(words))] = generator.choice(vocabulary)
+            texts.append((texts[original][0], ' '.join(words)))
+            copies.append((i, original))
+        else:
+            texts.append((
+                ' '.join(generator.choices(vocabulary, k=generator.randint(3, 6))),
+                ' '.join(generator.choices(vocabulary, k=generator.randint(15, 40)))
+            ))
+    return texts, copies
+
+
+def bench_duplicates(args):
+    """Поиск повторов: построение индекса LSH, проверка одного предложения по индексу
+    и перебором всех строк, поиск всех групп повторов"""
+    import duplicates
+    from duplicates import shingles, similarity, find_similar, find_clusters
+
+    texts, copies = generated_texts(args.rows, args.duplicates)
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, "bench.db"))
+        # id сгенерированных строк идут после тестовых предложений новой базы
+        first_id = db.count_proposals() + 1
+        db.add_proposals_bulk((
+            (
+                title, description, Category.OTHER.value, Status.NEW.value, "Автор", "Отдел", 2,
+                "2025-01-01 10:00:00", None, None, None, None
+            )
+            for title, description in texts
+        ), defer_indexes=True)
+        print(f"Повторы среди {args.rows} предложений (из них {len(copies)} копий с правками, "
+              f"{'NumPy' if duplicates.np is not None else 'без NumPy'}):")
+
+        started = time.perf_counter()
+        db.sync_duplicate_index()
+        print(f"  построение индекса LSH: {time.perf_counter() - started:.1f} с")
+
+        # Проверяемые тексты: копии существующих предложений с двумя замененными словами
+        generator = random.Random(2)
+        probes = []
+        for _ in range(args.probes):
+            original = generator.randrange(args.rows)
+            words = texts[original][1].split()
+            for _ in range(2):
+                words[generator.randrange(len(words))] = generator.choice(words)
+            probes.append((first_id + original, texts[original][0], ' '.join(words)))
+        found = 0
+        started = time.perf_counter()
+        for original_id, title, description in probes:
+            found += any(proposal.id == original_id for proposal, _ in find_similar(db, title, description))
+        seconds = (time.perf_counter() - started) / len(probes)
+        print(f"  проверка нового предложения по индексу: {seconds * 1000:.2f} мс, "
+              f"найден оригинал в {found} из {len(probes)}")
+
+        _, title, description = probes[0]
+        started = time.perf_counter()
+        probe = shingles(title, description)
+        matches = sum(
+            similarity(probe, shingles(row[1], row[2])) >= duplicates.SIMILARITY_THRESHOLD
+            for row in db.iter_proposal_rows()
+        )
+        print(f"  для сравнения: проверка перебором всех строк: {time.perf_counter() - started:.1f} с "
+              f"(совпадений: {matches})")
+
+        started = time.perf_counter()
+        clusters = find_clusters(db)
+        grouped = {proposal_id: index for index, cluster in enumerate(clusters) for proposal_id in cluster}
+        matched = sum(
+            first_id + copy in grouped and grouped.get(first_id + copy) == grouped.get(first_id + original)
+            for copy, original in copies
+        )
+        print(f"  поиск всех групп: {time.perf_counter() - started:.1f} с, групп: {len(clusters)}, "
+              f"копий в одной группе с оригиналом: {matched} из {len(copies)}")
+
+
+def parse_importtime(stderr):
+    """Импорты верхнего уровня из вывода python -X importtime: список (модуль, мкс)"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+            imports.append((name.strip(), int(cumulative)))
+    return imports
+
+
+def bench_startup(args):
+    """Запуск окна программы: импорт модулей (по -X importtime), время до первого кадра
+    и до загрузки данных; первый запуск - без кэша первой страницы, следующие - с ним"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "bench.db")
+        create_database(db_name, args.rows)
+        print(f"Запуск программы на базе из {args.rows} предложений (запусков: {args.runs}):")
+
+        frames, loads, imports = [], [], []
+        for run in range(args.runs):
+            started = time.time()
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", script, "--db", db_name, "--startup-probe"],
+                capture_output=True, text=True, cwd=directory
+            )
+            top_level = parse_importtime(result.stderr)
+            imports.append(sum(cumulative for _, cumulative in top_level) / 1e6)
+            moments = dict(
+                line.split() for line in result.stdout.splitlines()
+                if line.startswith(("first_frame", "data_loaded"))
+            )
+            if result.returncode != 0 or len(moments) < 2:
+                error = result.stderr.strip().splitlines()[-1:] or ["нет вывода"]
+                print(f"  окно не открылось ({error[0]}); замерен только импорт")
+                break
+            frames.append(float(moments["first_frame"]) - started)
+            loads.append(float(moments["data_loaded"]) - started)
+            print(f"  запуск {run + 1}{' (без кэша первой страницы)' if run == 0 else ''}: "
+                  f"первый кадр {frames[-1] * 1000:.0f} мс, данные {loads[-1] * 1000:.0f} мс")
+
+        print(f"  импорт модулей (медиана): {sorted(imports)[len(imports) // 2] * 1000:.0f} мс, из них:")
+        for name, cumulative in sorted(top_level, key=lambda item: -item[1])[:args.top]:
+            print(f"    {name:<24} {cumulative / 1000:7.1f} мс")
+        if frames:
+            print(f"  первый кадр (медиана): {sorted(frames)[len(frames) // 2] * 1000:.0f} мс, "
+                  f"данные загружены: {sorted(loads)[len(loads) // 2] * 1000:.0f} мс")
+
+
+# Частые слова поиска (формы и доля предложений, в тексте которых они есть)
+SEARCH_WORDS = [
+    (("система", "системы", "систему", "системой"), 0.4),
+    (("склад", "склада", "складу", "складом"), 0.2),
+    (("учет", "учета", "учету", "учетом"), 0.1),
+    (("интеграция", "интеграции", "интеграцию", "интеграцией"), 0.03),
+    (("телеметрия", "телеметрии", "телеметрию", "телеметрией"), 0.001),
+]
+SEARCH_QUERIES = ["система", "склад", "система склада", "учет склада", "интеграция", "телеметрия"]
+# Бюджет одного поиска при наборе текста: первая страница и количество найденных
+SEARCH_BUDGET = 0.05
+
+
+def bench_search(args):
+    """Поиск по мере ввода: первая страница результатов и количество найденных
+    на каждое нажатие клавиши, для частых и редких слов"""
+    generator = random.Random(3)
+
+    def with_common_words(text):
+        words = text.split()
+        for forms, share in SEARCH_WORDS:
+            if generator.random() < share:
+                words.insert(generator.randrange(len(words) + 1), generator.choice(forms))
+        return ' '.join(words)
+
+    texts, _ = generated_texts(args.rows, 0)
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, "bench.db"))
+        db.add_proposals_bulk((
+            (
+                with_common_words(title), with_common_words(description), Category.OTHER.value,
+                Status.NEW.value, "Автор", "Отдел", 2, "2025-01-01 10:00:00", None, None, None, None
+            )
+            for title, description in texts
+        ), defer_indexes=True)
+        print(f"Поиск по мере ввода среди {args.rows} предложений (бюджет {SEARCH_BUDGET * 1000:.0f} мс на нажатие):")
+
+        slowest = 0
+        for query in SEARCH_QUERIES:
+            times = []
+            for end in range(2, len(query) + 1):
+                started = time.perf_counter()
+                db.search_proposals(query[:end], limit=args.page)
+                total = db.count_search_results(query[:end])
+                times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            db.search_proposals(query, limit=args.page, offset=args.deep_offset)
+            deep = time.perf_counter() - started
+            slowest = max(slowest, max(times))
+            found = f"{total}+" if total >= SEARCH_COUNT_LIMIT else str(total)
+            print(f"  {query:<16} найдено {found:>7}: медиана {sorted(times)[len(times) // 2] * 1000:6.1f} мс, "
+                  f"максимум {max(times) * 1000:6.1f} мс, страница со смещением {args.deep_offset}: {deep * 1000:6.1f} мс")
+        print(f"  самое долгое нажатие: {slowest * 1000:.1f} мс - "
+              f"{'в бюджете' if slowest <= SEARCH_BUDGET else 'бюджет превышен'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    proposals_parser = commands.add_parser("proposals", help="память и время загрузки предложений")
+    proposals_parser.add_argument("--rows", type=int, default=200000)
+    proposals_parser.set_defaults(handler=bench_proposals)
+
+    setup_parser = commands.add_parser("report-setup", help="время подготовки шрифтов и стилей отчета")
+    setup_parser.add_argument("--repeat", type=int, default=100)
+    setup_parser.add_argument("--reports", type=int, default=5)
+    setup_parser.set_defaults(handler=bench_report_setup)
+
+    full_parser = commands.add_parser("full-report", help="верстка полного PDF-отчета на больших таблицах")
+    full_parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    full_parser.set_defaults(handler=bench_full_report)
+
+    writers_parser = commands.add_parser("writers", help="скорость форматов CSV, XLSX и HTML")
+    writers_parser.add_argument("--rows", type=int, default=100000)
+    writers_parser.set_defaults(handler=bench_writers)
+
+    concurrency_parser = commands.add_parser("concurrency", help="одновременная запись из нескольких процессов")
+    concurrency_parser.add_argument("--writers", type=int, default=8, help="процессов-писателей")
+    concurrency_parser.add_argument("--updates", type=int, default=200, help="обновлений на процесс")
+    concurrency_parser.add_argument("--hot", type=int, default=10, help="сколько предложений обновляется")
+    concurrency_parser.add_argument("--rows", type=int, default=1000)
+    concurrency_parser.set_defaults(handler=bench_concurrency)
+
+    scoring_parser = commands.add_parser("scoring", help="оценка и рейтинг предложений на большой базе")
+    scoring_parser.add_argument("--rows", type=int, default=1000000)
+    scoring_parser.add_argument("--updates", type=int, default=10, help="сколько предложений изменить перед досинхронизацией")
+    scoring_parser.set_defaults(handler=bench_scoring)
+
+    duplicates_parser = commands.add_parser("duplicates", help="поиск повторяющихся предложений на большой базе")
+    duplicates_parser.add_argument("--rows", type=int, default=1000000)
+    duplicates_parser.add_argument("--duplicates", type=float, default=0.02, help="доля копий с правками")
+    duplicates_parser.add_argument("--probes", type=int, default=200, help="сколько проверок нового предложения замерить")
+    duplicates_parser.set_defaults(handler=bench_duplicates)
+
+    startup_parser = commands.add_parser("startup", help="время запуска окна программы до первого кадра")
+    startup_parser.add_argument("--rows", type=int, default=100000)
+    startup_parser.add_argument("--runs", type=int, default=5)
+    startup_parser.add_argument("--top", type=int, default=8, help="сколько самых долгих импортов показать")
+    startup_parser.set_defaults(handler=bench_startup)
+
+    search_parser = commands.add_parser("search", help="поиск по мере ввода на большой базе")
+    search_parser.add_argument("--rows", type=int, default=1000000)
+    search_parser.add_argument("--page", type=int, default=200, help="строк на странице результатов")
+    search_parser.add_argument("--deep-offset", type=int, default=5000, help="смещение страницы при прокрутке")
+    search_parser.set_defaults(handler=bench_search)
+    
+    args = parser.parse_args(argv)
+    return args.handler(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
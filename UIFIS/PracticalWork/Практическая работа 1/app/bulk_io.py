@@ -0,0 +1,166 @@
+"""Потоковый импорт и экспорт предложений (CSV и JSON Lines)"""
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from models import Category, Status
+
+# Порядок полей в файлах обмена совпадает с Proposal.to_dict()
+FIELDS = [
+    'id', 'title', 'description', 'category', 'status', 'author', 'department',
+    'priority', 'created_date', 'expected_benefit', 'estimated_cost',
+    'implementation_time', 'risks'
+]
+REQUIRED_FIELDS = ('title', 'description', 'author', 'department')
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# В файле допускается как отображаемое значение перечисления, так и его имя
+CATEGORY_LOOKUP = {**{c.value: c.value for c in Category}, **{c.name: c.value for c in Category}}
+STATUS_LOOKUP = {**{s.value: s.value for s in Status}, **{s.name: s.value for s in Status}}
+
+FORMATS = ('csv', 'jsonl')
+
+
+class ImportResult:
+    """Итог импорта: количество строк, ошибки и производительность"""
+    MAX_ERRORS = 100
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.seconds if self.seconds else 0.0
+
+    def add_error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append((line, message))
+
+    def __str__(self):
+        return (f"Импортировано {self.imported} строк, пропущено {self.skipped} "
+                f"за {self.seconds:.2f} с ({self.rows_per_second:,.0f} строк/с)")
+
+
+def detect_format(path, format_type=None):
+    """Формат файла: явно указанный или по расширению"""
+    if format_type:
+        format_type = format_type.lower()
+    else:
+        extension = os.path.splitext(path)[1].lower().lstrip('.')
+        format_type = 'jsonl' if extension in ('jsonl', 'ndjson') else extension
+    if format_type not in FORMATS:
+        raise ValueError(f"Неподдерживаемый формат: {format_type} (доступны: {', '.join(FORMATS)})")
+    return format_type
+
+
+def read_records(path, format_type):
+    """Построчное чтение записей из файла: (номер строки, словарь для CSV или
+    текст строки для JSON Lines - он разбирается вместе с проверкой строки)"""
+    with open(path, encoding='utf-8', newline='') as f:
+        if format_type == 'csv':
+            # Первая строка - заголовок, номера строк данных начинаются со второй
+            for line, record in enumerate(csv.DictReader(f), 2):
+                yield line, record
+        else:
+            for line, text in enumerate(f, 1):
+                if text.strip():
+                    yield line, text
+
+
+def validate_record(record, now):
+    """Проверка записи и преобразование в кортеж для INSERT.
+
+    Бросает ValueError с описанием первой найденной ошибки.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("строка должна быть JSON-объектом")
+    for field in REQUIRED_FIELDS:
+        if not str(record.get(field) or '').strip():
+            raise ValueError(f"не заполнено поле {field}")
+
+    category = CATEGORY_LOOKUP.get(record.get('category') or Category.OTHER.value)
+    if category is None:
+        raise ValueError(f"неизвестная категория: {record.get('category')}")
+
+    status = STATUS_LOOKUP.get(record.get('status') or Status.NEW.value)
+    if status is None:
+        raise ValueError(f"неизвестный статус: {record.get('status')}")
+
+    priority = int(record.get('priority') or 3)
+    if priority not in (1, 2, 3):
+        raise ValueError(f"приоритет должен быть 1, 2 или 3: {priority}")
+
+    created_date = record.get('created_date') or now
+    # fromisoformat работает на порядок быстрее strptime; длина отсекает даты без времени
+    if len(created_date) != 19:
+        raise ValueError(f"дата должна быть в формате ГГГГ-ММ-ДД ЧЧ:ММ:СС: {created_date}")
+    datetime.fromisoformat(created_date)
+
+    cost = float(record.get('estimated_cost') or 0)
+    if cost < 0:
+        raise ValueError(f"отрицательная стоимость: {cost}")
+
+    return (
+        str(record['title']).strip(), str(record['description']).strip(), category, status,
+        str(record['author']).strip(), str(record['department']).strip(), priority, created_date,
+        record.get('expected_benefit') or '', cost,
+        record.get('implementation_time') or '', record.get('risks') or ''
+    )
+
+
+def import_proposals(db, path, format_type=None, batch_size=10000, strict=False, defer_indexes=False):
+    """Потоковый импорт предложений из файла.
+
+    Строки проверяются по перечислениям Category и Status и вставляются пачками
+    через executemany в одной транзакции. Некорректные строки пропускаются
+    (или прерывают импорт при strict=True). defer_indexes=True перестраивает
+    поисковый индекс и статистику один раз в конце вместо триггеров на каждую
+    строку - так быстрее при загрузке больших объемов.
+    """
+    format_type = detect_format(path, format_type)
+    result = ImportResult()
+    now = datetime.now().strftime(DATE_FORMAT)
+
+    def valid_rows():
+        for line, record in read_records(path, format_type):
+            try:
+                if format_type == 'jsonl':
+                    # json.JSONDecodeError - подкласс ValueError
+                    record = json.loads(record)
+                yield validate_record(record, now)
+            except (ValueError, TypeError, KeyError) as e:
+                if strict:
+                    raise ValueError(f"Строка {line}: {e}") from e
+                result.add_error(line, str(e))
+
+    started = time.perf_counter()
+    result.imported = db.add_proposals_bulk(valid_rows(), batch_size, defer_indexes)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def export_proposals(db, path, format_type=None, batch_size=10000):
+    """Потоковый экспорт всех предложений; таблица читается страницами по id.
+
+    Возвращает количество выгруженных строк.
+    """
+    format_type = detect_format(path, format_type)
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if format_type == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for row in db.iter_proposal_rows(batch_size):
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in db.iter_proposal_rows(batch_size):
+                f.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False))
+                f.write('\n')
+                count += 1
+    return count
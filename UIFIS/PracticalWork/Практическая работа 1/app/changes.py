@@ -0,0 +1,33 @@
+"""Уведомления открытых окон об изменениях предложений.
+
+Каждое изменение proposals триггеры записывают в таблицу proposal_changes (см. database.py),
+поэтому уведомления видны всем процессам: окнам этой программы, другим ее экземплярам
+и HTTP-сервису. ChangeFeed периодически читает новые записи и передает подписчикам
+одну пачку изменений - окна обновляют только затронутые строки и статистику.
+"""
+
+
+class ChangeFeed:
+    """Подписка окон на изменения предложений в базе db"""
+
+    def __init__(self, db):
+        self.db = db
+        self.last_id = db.get_last_change_id()
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        """callback(changes): changes - {id предложения: reorder} или None (перечитать все)"""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def poll(self):
+        """Чтение новых уведомлений и рассылка подписчикам; True, если изменения были"""
+        self.last_id, changes = self.db.get_changes(self.last_id)
+        if changes == {}:
+            return False
+        for callback in list(self.subscribers):
+            callback(changes)
+        return True
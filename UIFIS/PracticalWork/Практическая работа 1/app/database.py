@@ -1,43 +1,600 @@
+import random
 import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from models import Proposal, Category, Status
+from migrations import migrate, encode_sql, epoch_sql
+from models import Proposal, Category, Status, PROPOSAL_FIELDS, CATEGORY_BY_VALUE, STATUS_BY_VALUE, CATEGORY_CODES, STATUS_CODES
+from search import build_match_query, match_terms, term_query, bm25_scores, snippet
+
+# Столбцы, из которых собирается Proposal (порядок совпадает с аргументами конструктора).
+# Версия строки идет последней; в файлы обмена выгружаются только FIELD_COLUMNS.
+FIELD_COLUMNS = ', '.join(PROPOSAL_FIELDS)
+PROPOSAL_COLUMNS = FIELD_COLUMNS + ', version'
+QUALIFIED_COLUMNS = ', '.join(f'proposals.{field}' for field in PROPOSAL_FIELDS + ('version',))
+
+# Ожидание блокировки записи другим подключением (секунды), после которого SQLite
+# возвращает "database is locked", и повторы записи после такой ошибки: задержка
+# удваивается от WRITE_RETRY_DELAY до WRITE_RETRY_MAX_DELAY со случайным разбросом,
+# чтобы одновременно отказавшие писатели не повторяли попытку хором
+BUSY_TIMEOUT = 5.0
+WRITE_RETRIES = 5
+WRITE_RETRY_DELAY = 0.05
+WRITE_RETRY_MAX_DELAY = 1.0
+
+# Порядок сортировки списка предложений (совпадает с индексом idx_proposals_order) и условие
+# keyset-пагинации для него. Ключ содержит дату текстом, как ее читает программа; условие
+# priority >= ? позволяет начать просмотр индекса сразу с нужного приоритета.
+PROPOSAL_ORDER = 'priority, created_at DESC, id'
+PROPOSAL_AFTER = (
+    f"(priority >= ? AND (priority > ? OR created_at < {epoch_sql('?')} "
+    f"OR (created_at = {epoch_sql('?')} AND id > ?)))"
+)
+
+# Добавление предложения: категория и статус передаются значениями перечислений, дата - текстом,
+# в коды и секунды их переводит сам запрос
+PROPOSAL_INSERT = f'''
+    INSERT INTO proposals (
+        title, description, category_code, status_code, author, department,
+        priority, created_at, expected_benefit, estimated_cost,
+        implementation_time, risks
+    ) VALUES (
+        ?, ?, {encode_sql('?', CATEGORY_CODES)}, {encode_sql('?', STATUS_CODES)}, ?, ?,
+        ?, {epoch_sql('?')}, ?, ?, ?, ?
+    )
+'''
+
+# Полнотекстовый индекс по текстовым полям предложения (внешнее содержимое - таблица proposals).
+# prefix='2 3 4' ускоряет префиксные запросы, которыми ищутся основы русских слов.
+FTS_SCHEMA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS proposals_fts USING fts5(
+        title, description, expected_benefit, risks,
+        content='proposals', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS proposals_fts_insert AFTER INSERT ON proposals BEGIN
+        INSERT INTO proposals_fts(rowid, title, description, expected_benefit, risks)
+        VALUES (new.id, new.title, new.description, new.expected_benefit, new.risks);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS proposals_fts_delete AFTER DELETE ON proposals BEGIN
+        INSERT INTO proposals_fts(proposals_fts, rowid, title, description, expected_benefit, risks)
+        VALUES ('delete', old.id, old.title, old.description, old.expected_benefit, old.risks);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS proposals_fts_update
+    AFTER UPDATE OF title, description, expected_benefit, risks ON proposals BEGIN
+        INSERT INTO proposals_fts(proposals_fts, rowid, title, description, expected_benefit, risks)
+        VALUES ('delete', old.id, old.title, old.description, old.expected_benefit, old.risks);
+        INSERT INTO proposals_fts(rowid, title, description, expected_benefit, risks)
+        VALUES (new.id, new.title, new.description, new.expected_benefit, new.risks);
+    END
+    ''',
+]
+
+# Сводная таблица статистики, которую поддерживают триггеры: для каждого среза
+# (статус, категория, приоритет) хранится количество предложений и сумма стоимости.
+# У столбца key нет типа, поэтому приоритеты хранятся как числа, а статусы - как строки.
+# Статус и категория в proposals - вычисляемые столбцы, поэтому триггеры изменения
+# отслеживают столбцы с кодами.
+STATS_DIMENSIONS = ('status', 'category', 'priority')
+
+STATS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS proposal_stats (
+        kind TEXT NOT NULL,
+        key NOT NULL,
+        count INTEGER NOT NULL,
+        cost REAL NOT NULL,
+        PRIMARY KEY (kind, key)
+    )
+    ''',
+]
+
+
+def _stats_add_sql(row):
+    return ''.join(
+        f"""
+        INSERT INTO proposal_stats (kind, key, count, cost)
+        VALUES ('{kind}', {row}.{kind}, 1, COALESCE({row}.estimated_cost, 0))
+        ON CONFLICT (kind, key) DO UPDATE SET count = count + 1, cost = cost + excluded.cost;"""
+        for kind in STATS_DIMENSIONS
+    )
+
+
+def _stats_remove_sql(row):
+    return ''.join(
+        f"""
+        UPDATE proposal_stats SET count = count - 1, cost = cost - COALESCE({row}.estimated_cost, 0)
+        WHERE kind = '{kind}' AND key = {row}.{kind};
+        DELETE FROM proposal_stats WHERE kind = '{kind}' AND key = {row}.{kind} AND count <= 0;"""
+        for kind in STATS_DIMENSIONS
+    )
+
+
+STATS_SCHEMA += [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposal_stats_insert AFTER INSERT ON proposals BEGIN
+        {_stats_add_sql('new')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposal_stats_delete AFTER DELETE ON proposals BEGIN
+        {_stats_remove_sql('old')}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposal_stats_update
+    AFTER UPDATE OF status_code, category_code, priority, estimated_cost ON proposals BEGIN
+        {_stats_remove_sql('old')}
+        {_stats_add_sql('new')}
+    END
+    ''',
+]
+
+# Версия данных: счетчик в служебной таблице, который триггеры увеличивают при любом
+# изменении proposals. По паре (db_id, data_version) кэши понимают, что данные не менялись;
+# db_id отличает пересозданную базу, у которой счетчик снова начинается с нуля.
+META_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS db_meta (
+        key TEXT PRIMARY KEY,
+        value NOT NULL
+    )
+    ''',
+    "INSERT OR IGNORE INTO db_meta (key, value) VALUES ('data_version', 0)",
+    "INSERT OR IGNORE INTO db_meta (key, value) VALUES ('db_id', lower(hex(randomblob(8))))",
+]
+
+VERSION_BUMP = "UPDATE db_meta SET value = value + 1 WHERE key = 'data_version';"
+
+META_SCHEMA += [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposals_version_{event.lower()} AFTER {event} ON proposals BEGIN
+        {VERSION_BUMP}
+    END
+    '''
+    for event in ('INSERT', 'UPDATE', 'DELETE')
+]
+
+# Уведомления об изменениях для открытых окон этого и других процессов (см. changes.py):
+# триггеры записывают id измененного предложения, окна периодически читают новые записи.
+# reorder = 1, если изменение может сдвинуть строку в списке или в результатах поиска
+# (вставка, удаление, смена полей сортировки, фильтров или текста), иначе строку можно
+# заменить на месте. proposal_id = NULL - массовое изменение: списки перечитываются целиком.
+# Хранятся только последние CHANGES_KEPT записей.
+CHANGES_KEPT = 10000
+REORDER_COLUMNS = (
+    'status_code', 'category_code', 'priority', 'created_at',
+    'title', 'description', 'expected_benefit', 'risks'
+)
+CHANGES_RELOAD = "INSERT INTO proposal_changes (proposal_id, event, reorder) VALUES (NULL, 'reload', 1)"
+
+CHANGES_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS proposal_changes (
+        id INTEGER PRIMARY KEY,
+        proposal_id INTEGER,
+        event TEXT NOT NULL,
+        reorder INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS proposal_changes_insert AFTER INSERT ON proposals BEGIN
+        INSERT INTO proposal_changes (proposal_id, event, reorder) VALUES (new.id, 'insert', 1);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposal_changes_update AFTER UPDATE ON proposals BEGIN
+        INSERT INTO proposal_changes (proposal_id, event, reorder)
+        VALUES (new.id, 'update', {' OR '.join(f'new.{column} IS NOT old.{column}' for column in REORDER_COLUMNS)});
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS proposal_changes_delete AFTER DELETE ON proposals BEGIN
+        INSERT INTO proposal_changes (proposal_id, event, reorder) VALUES (old.id, 'delete', 1);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposal_changes_prune AFTER INSERT ON proposal_changes
+    WHEN new.id > {CHANGES_KEPT} BEGIN
+        DELETE FROM proposal_changes WHERE id <= new.id - {CHANGES_KEPT};
+    END
+    ''',
+]
+
+# Индекс поиска повторов (см. duplicates.py): ключи корзин LSH каждого предложения.
+# Подпись текста в SQL не посчитать, поэтому триггеры только ставят в очередь
+# proposal_lsh_pending новые предложения и предложения с измененным текстом,
+# а ключи досчитывает Database.sync_duplicate_index. Ключи удаленных удаляет триггер.
+# Кэш страниц соединения, которое досчитывает индекс повторов, КБ
+SYNC_CACHE_KB = 65536
+
+DUPLICATES_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS proposal_lsh (
+        bucket INTEGER NOT NULL,
+        proposal_id INTEGER NOT NULL,
+        PRIMARY KEY (bucket, proposal_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_proposal_lsh_proposal ON proposal_lsh (proposal_id)',
+    'CREATE TABLE IF NOT EXISTS proposal_lsh_pending (proposal_id INTEGER PRIMARY KEY)',
+    '''
+    CREATE TRIGGER IF NOT EXISTS proposal_lsh_insert AFTER INSERT ON proposals BEGIN
+        INSERT OR IGNORE INTO proposal_lsh_pending (proposal_id) VALUES (new.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS proposal_lsh_update AFTER UPDATE OF title, description ON proposals
+    WHEN new.title IS NOT old.title OR new.description IS NOT old.description BEGIN
+        INSERT OR IGNORE INTO proposal_lsh_pending (proposal_id) VALUES (new.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS proposal_lsh_delete AFTER DELETE ON proposals BEGIN
+        DELETE FROM proposal_lsh WHERE proposal_id = old.id;
+        DELETE FROM proposal_lsh_pending WHERE proposal_id = old.id;
+    END
+    ''',
+]
+
+# Журнал изменений: при каждом создании, удалении и изменении статуса, категории,
+# приоритета или стоимости в proposal_history дописывается состояние предложения
+# до и после изменения. Запись делает триггер, то есть в той же транзакции, что и само изменение.
+# Каждая запись - это приращение статистики (+1 новому состоянию, -1 прежнему), поэтому
+# статистика на любой момент - сумма записей до этого момента. Чтобы не суммировать
+# миллионы записей, приращения дополнительно копятся по дням в history_daily:
+# на момент X суммируются дни до даты X и записи журнала за сам день X.
+# lead_days заполняется при смене статуса: сколько дней прошло с подачи предложения.
+HISTORY_COLUMNS = (
+    'proposal_id, changed_at, event, status, category, priority, estimated_cost, '
+    'old_status, old_category, old_priority, old_cost, lead_days'
+)
+HISTORY_NOW = "strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime')"
+
+HISTORY_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS proposal_history (
+        id INTEGER PRIMARY KEY,
+        proposal_id INTEGER NOT NULL,
+        changed_at TEXT NOT NULL,
+        event TEXT NOT NULL,
+        status TEXT,
+        category TEXT,
+        priority INTEGER,
+        estimated_cost REAL,
+        old_status TEXT,
+        old_category TEXT,
+        old_priority INTEGER,
+        old_cost REAL,
+        lead_days REAL,
+        archived INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_history_proposal ON proposal_history (proposal_id, changed_at)',
+    'CREATE INDEX IF NOT EXISTS idx_history_time ON proposal_history (changed_at)',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposal_history_insert AFTER INSERT ON proposals BEGIN
+        INSERT INTO proposal_history ({HISTORY_COLUMNS})
+        VALUES (new.id, new.created_date, 'insert', new.status, new.category, new.priority, new.estimated_cost,
+                NULL, NULL, NULL, NULL, NULL);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposal_history_update
+    AFTER UPDATE OF status_code, category_code, priority, estimated_cost ON proposals
+    WHEN new.status IS NOT old.status OR new.category IS NOT old.category
+      OR new.priority IS NOT old.priority OR new.estimated_cost IS NOT old.estimated_cost
+    BEGIN
+        INSERT INTO proposal_history ({HISTORY_COLUMNS})
+        VALUES (new.id, {HISTORY_NOW}, 'update', new.status, new.category, new.priority, new.estimated_cost,
+                old.status, old.category, old.priority, old.estimated_cost,
+                CASE WHEN new.status IS NOT old.status
+                     THEN julianday({HISTORY_NOW}) - julianday(new.created_date) END);
+    END
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS history_daily (
+        day TEXT NOT NULL,
+        status TEXT NOT NULL,
+        category TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        cost REAL NOT NULL,
+        PRIMARY KEY (day, status, category, priority)
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS proposal_history_daily AFTER INSERT ON proposal_history
+    WHEN NOT new.archived BEGIN
+        INSERT INTO history_daily (day, status, category, priority, count, cost)
+        SELECT substr(new.changed_at, 1, 10), new.status, new.category, new.priority,
+               1, COALESCE(new.estimated_cost, 0)
+        WHERE new.status IS NOT NULL
+        ON CONFLICT (day, status, category, priority) DO UPDATE
+        SET count = count + excluded.count, cost = cost + excluded.cost;
+        INSERT INTO history_daily (day, status, category, priority, count, cost)
+        SELECT substr(new.changed_at, 1, 10), new.old_status, new.old_category, new.old_priority,
+               -1, -COALESCE(new.old_cost, 0)
+        WHERE new.old_status IS NOT NULL
+        ON CONFLICT (day, status, category, priority) DO UPDATE
+        SET count = count + excluded.count, cost = cost + excluded.cost;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposal_history_delete AFTER DELETE ON proposals BEGIN
+        INSERT INTO proposal_history ({HISTORY_COLUMNS})
+        VALUES (old.id, {HISTORY_NOW}, 'delete', NULL, NULL, NULL, NULL,
+                old.status, old.category, old.priority, old.estimated_cost, NULL);
+    END
+    ''',
+]
+
+# Группировка по времени для аналитики: формат strftime ключа периода
+TREND_PERIODS = {
+    'week': '%Y-%W',
+    'month': '%Y-%m',
+}
+
+# Срезы, по которым считаются перцентили стоимости
+PERCENTILE_DIMENSIONS = ('category', 'department')
+
+# Поля, по которым считается оценка предложения (scoring.py): категория и статус - кодами
+SCORING_COLUMNS = 'id, priority, COALESCE(estimated_cost, 0), category_code, status_code, created_at, implementation_time'
+
+# Веса столбцов для ранжирования bm25: совпадение в названии важнее, чем в рисках
+FTS_WEIGHTS = (10.0, 4.0, 2.0, 2.0)
+
+# Поиск выполняется на каждое изменение строки поиска, поэтому его работа ограничена:
+# по релевантности упорядочиваются только SEARCH_RANK_CANDIDATES самых новых совпадений,
+# остальные совпадения идут после них от новых к старым. Количество найденных считается
+# точно только до SEARCH_COUNT_LIMIT.
+SEARCH_RANK_CANDIDATES = 500
+SEARCH_COUNT_LIMIT = 10000
+
+
+def _search_texts(proposal):
+    """Тексты предложения в порядке столбцов proposals_fts"""
+    return (proposal.title, proposal.description, proposal.expected_benefit, proposal.risks)
+
+
+class ConflictError(Exception):
+    """Предложение изменено или удалено другим пользователем после того, как его прочитали.
+    
+    current - текущее состояние предложения в базе (None, если оно удалено).
+    """
+    
+    def __init__(self, proposal_id, current):
+        self.proposal_id = proposal_id
+        self.current = current
+        if current is None:
+            message = f"Предложение {proposal_id} удалено другим пользователем"
+        else:
+            message = f"Предложение {proposal_id} изменено другим пользователем (версия {current.version})"
+        super().__init__(message)
+
+
+def _is_busy(error):
+    """Ошибка занятой базы (SQLITE_BUSY, SQLITE_LOCKED), после которой запись можно повторить"""
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+
+class _ReusableConnection:
+    """Соединение потока для Database(reuse_connections=True).
+    
+    close() не закрывает соединение, а возвращает его в исходное состояние:
+    закрывает курсоры (незавершенный запрос держал бы блокировку чтения и мешал
+    записи), откатывает незавершенную транзакцию и сбрасывает row_factory
+    и isolation_level, которые методы Database настраивают под себя.
+    """
+    
+    def __init__(self, conn):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_cursors', [])
+        object.__setattr__(self, 'in_use', False)
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+    
+    def acquire(self):
+        object.__setattr__(self, 'in_use', True)
+        return self
+    
+    def cursor(self):
+        cursor = self._conn.cursor()
+        self._cursors.append(cursor)
+        return cursor
+    
+    def close(self):
+        conn = self._conn
+        for cursor in self._cursors:
+            cursor.close()
+        self._cursors.clear()
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+        conn.isolation_level = ''
+        object.__setattr__(self, 'in_use', False)
+
 
 class Database:
-    def __init__(self, db_name='proposals.db'):
+    def __init__(self, db_name='proposals.db', migration_progress=None, reuse_connections=False):
+        """reuse_connections=True - каждый поток держит одно открытое соединение вместо
+        нового на каждый вызов (открытие соединения с разбором схемы обходится дороже
+        самих коротких запросов; нужно серверу с большим потоком запросов)"""
         self.db_name = db_name
-        self.init_database()
+        self.fts_enabled = False
+        self.reuse_connections = reuse_connections
+        self._local = threading.local()
+        self.init_database(migration_progress)
+    
+    def _connect(self):
+        """Соединение для одного вызова; по окончании вызывающий закрывает его"""
+        if not self.reuse_connections:
+            return sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _ReusableConnection(sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT))
+        elif conn.in_use:
+            # Соединение потока еще занято (например, незавершенным iter_proposals)
+            return sqlite3.connect(self.db_name, timeout=BUSY_TIMEOUT)
+        return conn.acquire()
     
-    def init_database(self):
+    def _write(self, work):
+        """Выполнение work(cursor) в одной транзакции записи; возвращает результат work.
+        
+        Транзакция сразу берет блокировку записи (BEGIN IMMEDIATE): отложенная транзакция,
+        успевшая прочитать данные, при чужой записи получает отказ без ожидания.
+        Если база занята дольше BUSY_TIMEOUT, транзакция повторяется с нарастающей задержкой.
+        """
+        delay = WRITE_RETRY_DELAY
+        for attempt in range(WRITE_RETRIES + 1):
+            conn = self._connect()
+            conn.isolation_level = None
+            cursor = conn.cursor()
+            try:
+                cursor.execute('BEGIN IMMEDIATE')
+                result = work(cursor)
+                cursor.execute('COMMIT')
+                return result
+            except sqlite3.OperationalError as e:
+                if attempt == WRITE_RETRIES or not _is_busy(e):
+                    raise
+            finally:
+                if conn.in_transaction:
+                    cursor.execute('ROLLBACK')
+                conn.close()
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, WRITE_RETRY_MAX_DELAY)
+    
+    def init_database(self, migration_progress=None):
         """Инициализация базы данных"""
-        conn = sqlite3.connect(self.db_name)
+        # Журнал WAL: читатели не блокируют запись, а запись - чтение; режим сохраняется в файле базы
+        conn = self._connect()
         cursor = conn.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.fetchone()
         
-        # Создание таблицы предложений
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS proposals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL,
-                category TEXT NOT NULL,
-                status TEXT NOT NULL,
-                author TEXT NOT NULL,
-                department TEXT NOT NULL,
-                priority INTEGER NOT NULL,
-                created_date TEXT NOT NULL,
-                expected_benefit TEXT,
-                estimated_cost REAL,
-                implementation_time TEXT,
-                risks TEXT
-            )
-        ''')
-        
-        # Добавление тестовых данных, если таблица пуста
-        cursor.execute("SELECT COUNT(*) FROM proposals")
-        if cursor.fetchone()[0] == 0:
-            self.add_sample_data()
+        # Таблица предложений создается и обновляется миграциями (см. migrations.py)
+        migrate(self, progress=migration_progress)
         
+        self.init_schema(cursor)
         conn.commit()
+        
+        # Добавление тестовых данных, если таблица пуста (EXISTS не считает все строки, как COUNT)
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM proposals)")
+        empty = not cursor.fetchone()[0]
         conn.close()
+        if empty:
+            self.add_sample_data()
+    
+    def init_schema(self, cursor):
+        """Поисковый индекс, сводная статистика, журнал изменений, версия данных,
+        уведомления об изменениях и индекс повторов вместе с поддерживающими их триггерами"""
+        self.init_search(cursor)
+        self.init_statistics(cursor)
+        self.init_history(cursor)
+        for statement in META_SCHEMA + CHANGES_SCHEMA:
+            cursor.execute(statement)
+        self.init_duplicates(cursor)
+    
+    def init_search(self, cursor):
+        """Создание полнотекстового индекса (если SQLite собран с FTS5)"""
+        try:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'proposals_fts'")
+            exists = cursor.fetchone() is not None
+            for statement in FTS_SCHEMA:
+                cursor.execute(statement)
+            if not exists:
+                # Индекс появился у уже заполненной базы - строим его по существующим строкам
+                cursor.execute("INSERT INTO proposals_fts(proposals_fts) VALUES ('rebuild')")
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            print(f"Полнотекстовый поиск недоступен: {e}")
+            self.fts_enabled = False
+    
+    def init_statistics(self, cursor):
+        """Создание сводной таблицы статистики и триггеров, которые ее поддерживают"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'proposal_stats'")
+        exists = cursor.fetchone() is not None
+        for statement in STATS_SCHEMA:
+            cursor.execute(statement)
+        if not exists:
+            self._rebuild_statistics(cursor)
+    
+    def init_duplicates(self, cursor):
+        """Создание индекса повторов; предложения существующей базы ставятся в очередь
+        на расчет ключей (он выполнится при первом поиске повторов)"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'proposal_lsh'")
+        exists = cursor.fetchone() is not None
+        for statement in DUPLICATES_SCHEMA:
+            cursor.execute(statement)
+        if not exists:
+            cursor.execute('INSERT OR IGNORE INTO proposal_lsh_pending (proposal_id) SELECT id FROM proposals')
+    
+    def init_history(self, cursor):
+        """Создание журнала изменений; у существующей базы в него заносится создание
+        каждого предложения (с датой created_date)"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'proposal_history'")
+        exists = cursor.fetchone() is not None
+        for statement in HISTORY_SCHEMA:
+            cursor.execute(statement)
+        if not exists:
+            self._backfill_history(cursor)
+    
+    def _backfill_history(self, cursor, after_id=0):
+        """Записи о создании для предложений с id больше after_id (при снятых триггерах
+        журнала - вместе с дневными итогами)"""
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM proposal_history')
+        last_event = cursor.fetchone()[0]
+        cursor.execute(f'''
+            INSERT INTO proposal_history ({HISTORY_COLUMNS})
+            SELECT id, created_date, 'insert', status, category, priority, estimated_cost,
+                   NULL, NULL, NULL, NULL, NULL
+            FROM proposals WHERE id > ?
+        ''', (after_id,))
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'proposal_history_daily'")
+        if cursor.fetchone() is None:
+            self._add_history_daily(cursor, last_event)
+    
+    def _add_history_daily(self, cursor, after_event=0):
+        """Добавление в дневные итоги приращений из записей журнала с id больше after_event"""
+        cursor.execute('''
+            INSERT INTO history_daily (day, status, category, priority, count, cost)
+            SELECT day, status, category, priority, SUM(count), SUM(cost) FROM (
+                SELECT substr(changed_at, 1, 10) AS day, status, category, priority,
+                       1 AS count, COALESCE(estimated_cost, 0) AS cost
+                FROM proposal_history WHERE id > ? AND NOT archived AND status IS NOT NULL
+                UNION ALL
+                SELECT substr(changed_at, 1, 10), old_status, old_category, old_priority,
+                       -1, -COALESCE(old_cost, 0)
+                FROM proposal_history WHERE id > ? AND NOT archived AND old_status IS NOT NULL
+            ) WHERE true
+            GROUP BY day, status, category, priority
+            ON CONFLICT (day, status, category, priority) DO UPDATE
+            SET count = count + excluded.count, cost = cost + excluded.cost
+        ''', (after_event, after_event))
+    
+    def _rebuild_statistics(self, cursor):
+        """Пересчет сводной таблицы статистики по таблице proposals"""
+        cursor.execute('DELETE FROM proposal_stats')
+        for kind in STATS_DIMENSIONS:
+            cursor.execute(f'''
+                INSERT INTO proposal_stats (kind, key, count, cost)
+                SELECT '{kind}', {kind}, COUNT(*), COALESCE(SUM(estimated_cost), 0)
+                FROM proposals GROUP BY {kind}
+            ''')
     
     def add_sample_data(self):
         """Добавление тестовых данных"""
@@ -83,128 +640,694 @@ class Database:
             )
         ]
         
-        for proposal in sample_proposals:
-            self.add_proposal(proposal)
+        # Одной транзакцией, а не отдельной записью на каждое предложение
+        self._write(lambda cursor: cursor.executemany(
+            PROPOSAL_INSERT, [self._insert_values(proposal) for proposal in sample_proposals]
+        ))
     
-    def add_proposal(self, proposal):
-        """Добавление нового предложения"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO proposals (
-                title, description, category, status, author, department,
-                priority, created_date, expected_benefit, estimated_cost,
-                implementation_time, risks
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    def _insert_values(self, proposal):
+        """Параметры PROPOSAL_INSERT для предложения"""
+        return (
             proposal.title, proposal.description, proposal.category.value,
             proposal.status.value, proposal.author, proposal.department,
-            proposal.priority, proposal.created_date.strftime('%Y-%m-%d %H:%M:%S'),
+            proposal.priority, proposal.created_date_text,
             proposal.expected_benefit, proposal.estimated_cost,
             proposal.implementation_time, proposal.risks
-        ))
+        )
+    
+    def add_proposal(self, proposal):
+        """Добавление нового предложения"""
+        def insert(cursor):
+            cursor.execute(PROPOSAL_INSERT, self._insert_values(proposal))
+            return cursor.lastrowid
         
-        proposal.id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        proposal.id = self._write(insert)
+        proposal.version = 1
         return proposal
     
-    def update_proposal(self, proposal):
-        """Обновление предложения"""
-        conn = sqlite3.connect(self.db_name)
+    def add_proposals_bulk(self, rows, batch_size=10000, defer_indexes=False):
+        """Массовая вставка предложений из итератора кортежей (поля как в INSERT add_proposal).
+        
+        Все строки вставляются в одной транзакции пачками по batch_size через executemany.
+        При defer_indexes=True триггеры поиска, статистики и журнала изменений и индексы
+        таблицы на время загрузки снимаются, а поисковый индекс, сводная таблица, журнал
+        и индексы строятся один раз в конце.
+        Версия данных в любом случае увеличивается один раз на всю загрузку, а вместо
+        уведомления о каждой строке открытые окна получают одно - перечитать списки.
+        Возвращает количество вставленных строк.
+        """
+        conn = self._connect()
+        conn.isolation_level = None
         cursor = conn.cursor()
+        inserted = 0
         
-        cursor.execute('''
-            UPDATE proposals SET
-                title = ?, description = ?, category = ?, status = ?,
-                author = ?, department = ?, priority = ?,
-                expected_benefit = ?, estimated_cost = ?,
-                implementation_time = ?, risks = ?
-            WHERE id = ?
-        ''', (
-            proposal.title, proposal.description, proposal.category.value,
-            proposal.status.value, proposal.author, proposal.department,
-            proposal.priority, proposal.expected_benefit, proposal.estimated_cost,
-            proposal.implementation_time, proposal.risks, proposal.id
-        ))
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM proposals')
+            last_id = cursor.fetchone()[0]
+            for trigger in self._index_triggers(cursor, defer_indexes):
+                cursor.execute(f'DROP TRIGGER {trigger}')
+            indexes = self._table_indexes(cursor) if defer_indexes else []
+            for name, sql in indexes:
+                cursor.execute(f'DROP INDEX {name}')
+            
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    inserted += self._insert_batch(cursor, batch)
+                    batch = []
+            if batch:
+                inserted += self._insert_batch(cursor, batch)
+            
+            if defer_indexes:
+                for name, sql in indexes:
+                    cursor.execute(sql)
+                if self.fts_enabled:
+                    for statement in FTS_SCHEMA:
+                        cursor.execute(statement)
+                    cursor.execute("INSERT INTO proposals_fts(proposals_fts) VALUES ('rebuild')")
+                for statement in STATS_SCHEMA:
+                    cursor.execute(statement)
+                self._rebuild_statistics(cursor)
+                self._backfill_history(cursor, last_id)
+                for statement in HISTORY_SCHEMA:
+                    cursor.execute(statement)
+                cursor.execute(
+                    'INSERT OR IGNORE INTO proposal_lsh_pending (proposal_id) SELECT id FROM proposals WHERE id > ?',
+                    (last_id,)
+                )
+                for statement in DUPLICATES_SCHEMA:
+                    cursor.execute(statement)
+            for statement in META_SCHEMA + CHANGES_SCHEMA:
+                cursor.execute(statement)
+            cursor.execute(VERSION_BUMP)
+            cursor.execute(CHANGES_RELOAD)
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
         
-        conn.commit()
-        conn.close()
+        return inserted
     
-    def delete_proposal(self, proposal_id):
-        """Удаление предложения"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+    def _index_triggers(self, cursor, indexes=True):
+        """Триггеры версии данных и уведомлений и (при indexes=True) поискового индекса,
+        сводной статистики, журнала изменений и очереди индекса повторов"""
+        patterns = ['proposals_version_%', 'proposal_changes_%']
+        if indexes:
+            patterns += ['proposals_fts_%', 'proposal_stats_%', 'proposal_history_%', 'proposal_lsh_%']
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND ("
+            + ' OR '.join('name LIKE ?' for _ in patterns) + ")",
+            patterns
+        )
+        return [row[0] for row in cursor.fetchall()]
+    
+    def _table_indexes(self, cursor):
+        """Индексы таблицы proposals: список (имя, CREATE INDEX)"""
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'proposals' AND sql IS NOT NULL")
+        return cursor.fetchall()
+    
+    def _insert_batch(self, cursor, batch):
+        cursor.executemany(PROPOSAL_INSERT, batch)
+        return len(batch)
+    
+    def update_proposal(self, proposal):
+        """Обновление предложения с проверкой версии.
         
-        cursor.execute('DELETE FROM proposals WHERE id = ?', (proposal_id,))
+        Строка меняется, только если ее версия в базе равна proposal.version (версии,
+        с которой начиналось редактирование), иначе - ConflictError с текущим состоянием
+        предложения. После сохранения proposal.version - новая версия строки.
+        При proposal.version = None предложение перезаписывается без проверки.
+        """
+        def update(cursor):
+            cursor.execute(f'''
+                UPDATE proposals SET
+                    title = ?, description = ?,
+                    category_code = {encode_sql('?', CATEGORY_CODES)}, status_code = {encode_sql('?', STATUS_CODES)},
+                    author = ?, department = ?, priority = ?,
+                    expected_benefit = ?, estimated_cost = ?,
+                    implementation_time = ?, risks = ?,
+                    version = version + 1
+                WHERE id = ? AND (? IS NULL OR version = ?)
+            ''', (
+                proposal.title, proposal.description, proposal.category.value,
+                proposal.status.value, proposal.author, proposal.department,
+                proposal.priority, proposal.expected_benefit, proposal.estimated_cost,
+                proposal.implementation_time, proposal.risks,
+                proposal.id, proposal.version, proposal.version
+            ))
+            if cursor.rowcount == 0:
+                raise ConflictError(proposal.id, self._current(cursor, proposal.id))
+            cursor.execute('SELECT version FROM proposals WHERE id = ?', (proposal.id,))
+            return cursor.fetchone()[0]
         
-        conn.commit()
-        conn.close()
+        proposal.version = self._write(update)
+    
+    def delete_proposal(self, proposal_id, version=None):
+        """Удаление предложения (с version - только если его не изменили после чтения)"""
+        def delete(cursor):
+            cursor.execute(
+                'DELETE FROM proposals WHERE id = ? AND (? IS NULL OR version = ?)',
+                (proposal_id, version, version)
+            )
+            if cursor.rowcount == 0 and version is not None:
+                current = self._current(cursor, proposal_id)
+                if current is not None:
+                    raise ConflictError(proposal_id, current)
+        
+        self._write(delete)
+    
+    def _current(self, cursor, proposal_id):
+        """Текущее состояние предложения внутри транзакции (None, если его нет)"""
+        cursor.execute(f'SELECT {PROPOSAL_COLUMNS} FROM proposals WHERE id = ?', (proposal_id,))
+        row = cursor.fetchone()
+        return row and Proposal.from_row(cursor, row)
     
     def get_all_proposals(self):
         """Получение всех предложений"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
+        conn.row_factory = Proposal.from_row
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM proposals ORDER BY priority, created_date DESC')
-        rows = cursor.fetchall()
-        
-        proposals = []
-        for row in rows:
-            proposal = Proposal.from_dict({
-                'id': row[0],
-                'title': row[1],
-                'description': row[2],
-                'category': row[3],
-                'status': row[4],
-                'author': row[5],
-                'department': row[6],
-                'priority': row[7],
-                'created_date': row[8],
-                'expected_benefit': row[9],
-                'estimated_cost': row[10],
-                'implementation_time': row[11],
-                'risks': row[12]
-            })
-            proposals.append(proposal)
+        cursor.execute(f'SELECT {PROPOSAL_COLUMNS} FROM proposals ORDER BY {PROPOSAL_ORDER}')
+        proposals = cursor.fetchall()
         
         conn.close()
         return proposals
     
+    def iter_proposals(self, status=None, category=None, batch_size=1000):
+        """Потоковое чтение предложений в порядке списка.
+        
+        Один запрос, результаты которого забираются порциями через fetchmany:
+        в памяти Python одновременно находится не больше batch_size объектов.
+        """
+        conditions, params = self._filter_conditions(status, category)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        conn = self._connect()
+        conn.row_factory = Proposal.from_row
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'SELECT {PROPOSAL_COLUMNS} FROM proposals {where} ORDER BY {PROPOSAL_ORDER}', params)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield from batch
+        finally:
+            conn.close()
+    
+    def iter_proposal_rows(self, batch_size=10000):
+        """Потоковое чтение всех строк таблицы proposals страницами по id"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        last_id = 0
+        try:
+            while True:
+                cursor.execute(
+                    f'SELECT {FIELD_COLUMNS} FROM proposals WHERE id > ? ORDER BY id LIMIT ?',
+                    (last_id, batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                yield from rows
+                last_id = rows[-1][0]
+        finally:
+            conn.close()
+    
     def get_proposal_by_id(self, proposal_id):
         """Получение предложения по ID"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connect()
+        conn.row_factory = Proposal.from_row
         cursor = conn.cursor()
         
-        cursor.execute('SELECT * FROM proposals WHERE id = ?', (proposal_id,))
-        row = cursor.fetchone()
+        cursor.execute(f'SELECT {PROPOSAL_COLUMNS} FROM proposals WHERE id = ?', (proposal_id,))
+        proposal = cursor.fetchone()
         
-        if row:
-            proposal = Proposal.from_dict({
-                'id': row[0],
-                'title': row[1],
-                'description': row[2],
-                'category': row[3],
-                'status': row[4],
-                'author': row[5],
-                'department': row[6],
-                'priority': row[7],
-                'created_date': row[8],
-                'expected_benefit': row[9],
-                'estimated_cost': row[10],
-                'implementation_time': row[11],
-                'risks': row[12]
-            })
+        conn.close()
+        return proposal
+    
+    def get_data_version(self):
+        """Версия данных: (идентификатор базы, счетчик изменений proposals).
+        
+        Чтение одной строки служебной таблицы - дешевле любого запроса к proposals.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT key, value FROM db_meta WHERE key IN ('db_id', 'data_version')")
+        meta = dict(cursor.fetchall())
+        conn.close()
+        return meta['db_id'], meta['data_version']
+    
+    def get_last_change_id(self):
+        """Номер последнего уведомления об изменении (начальная точка для get_changes)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM proposal_changes')
+        last_id = cursor.fetchone()[0]
+        conn.close()
+        return last_id
+    
+    def get_changes(self, after_id):
+        """Изменения предложений после уведомления after_id.
+    
+        Возвращает (номер последнего уведомления, {id предложения: reorder}); вместо
+        словаря - None, если по уведомлениям изменения не восстановить (массовая загрузка,
+        пропущенные и уже удаленные записи, подмена файла базы) и списки нужно перечитать.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        # Подзапросы вместо MIN(id), MAX(id) в одном SELECT: так оба берутся по первичному ключу
+        cursor.execute('SELECT (SELECT MIN(id) FROM proposal_changes), (SELECT MAX(id) FROM proposal_changes)')
+        first_id, last_id = cursor.fetchone()
+        if last_id is None or last_id == after_id:
+            conn.close()
+            return after_id if last_id is None else last_id, {}
+        if last_id < after_id or first_id > after_id + 1:
             conn.close()
-            return proposal
+            return last_id, None
+    
+        cursor.execute(
+            'SELECT proposal_id, reorder FROM proposal_changes WHERE id > ? AND id <= ? ORDER BY id',
+            (after_id, last_id)
+        )
+        changes = {}
+        for proposal_id, reorder in cursor.fetchall():
+            if proposal_id is None:
+                changes = None
+                break
+            changes[proposal_id] = bool(reorder) or changes.get(proposal_id, False)
+        conn.close()
+        return last_id, changes
+    
+    def get_proposals_by_ids(self, ids):
+        """Текущие предложения по списку id: словарь id -> предложение (удаленных в нем нет)"""
+        ids = list(ids)
+        conn = self._connect()
+        conn.row_factory = Proposal.from_row
+        cursor = conn.cursor()
+        proposals = {}
+        # Не больше 500 параметров в запросе (старые сборки SQLite ограничены 999)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.execute(
+                f"SELECT {PROPOSAL_COLUMNS} FROM proposals WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for proposal in cursor.fetchall():
+                proposals[proposal.id] = proposal
+        conn.close()
+        return proposals
+    
+    def get_proposal_texts(self, ids):
+        """Название и описание предложений по списку id: словарь id -> (название, описание)"""
+        ids = list(ids)
+        conn = self._connect()
+        cursor = conn.cursor()
+        texts = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.execute(
+                f"SELECT id, title, description FROM proposals WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for proposal_id, title, description in cursor.fetchall():
+                texts[proposal_id] = (title, description)
+        conn.close()
+        return texts
+    
+    def sync_duplicate_index(self, batch_size=20000, progress=None):
+        """Расчет ключей LSH для предложений из очереди proposal_lsh_pending.
         
+        Каждая пачка - отдельная транзакция записи: ключи считаются внутри нее, чтобы
+        изменение текста другим подключением не потерялось между чтением и записью.
+        Все пачки идут через одно соединение с увеличенным кэшем страниц: индекс
+        proposal_lsh большой, и с холодным кэшем каждая вставка читала бы страницы заново.
+        progress(посчитано, всего) вызывается после каждой пачки. Возвращает число
+        обработанных предложений.
+        """
+        conn = self._connect()
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        done = 0
+        try:
+            cursor.execute('SELECT COUNT(*) FROM proposal_lsh_pending')
+            total = cursor.fetchone()[0]
+            if not total:
+                return 0
+            # Здесь, а не в начале модуля: поиск повторов тянет NumPy, не нужный при запуске
+            from duplicates import bucket_rows
+            
+            cursor.execute(f'PRAGMA cache_size = -{SYNC_CACHE_KB}')
+            while True:
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute(
+                    'SELECT MIN(proposal_id), MAX(proposal_id), COUNT(*) FROM '
+                    '(SELECT proposal_id FROM proposal_lsh_pending ORDER BY proposal_id LIMIT ?)',
+                    (batch_size,)
+                )
+                first_id, last_id, count = cursor.fetchone()
+                if not count:
+                    cursor.execute('COMMIT')
+                    break
+                # Обе границы: с одной верхней SQLite перебирал бы proposals с самого начала
+                cursor.execute('''
+                    SELECT p.id, p.title, p.description
+                    FROM proposal_lsh_pending q JOIN proposals p ON p.id = q.proposal_id
+                    WHERE q.proposal_id BETWEEN ? AND ?
+                ''', (first_id, last_id))
+                # В порядке ключа: вставка в индекс идет подряд, а не в случайные страницы
+                rows = sorted(bucket_rows(cursor.fetchall()))
+                cursor.execute('''
+                    DELETE FROM proposal_lsh WHERE proposal_id IN
+                        (SELECT proposal_id FROM proposal_lsh_pending WHERE proposal_id <= ?)
+                ''', (last_id,))
+                cursor.executemany('INSERT OR IGNORE INTO proposal_lsh (bucket, proposal_id) VALUES (?, ?)', rows)
+                cursor.execute('DELETE FROM proposal_lsh_pending WHERE proposal_id <= ?', (last_id,))
+                cursor.execute('COMMIT')
+                done += count
+                if progress is not None:
+                    progress(done, max(total, done))
+        finally:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            conn.close()
+        return done
+    
+    def find_duplicate_candidates(self, buckets, exclude_id=None, limit=50):
+        """Кандидаты в повторы: id предложений с общими корзинами LSH, сначала те,
+        у кого общих корзин больше"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT proposal_id FROM proposal_lsh
+            WHERE bucket IN ({', '.join('?' * len(buckets))}) AND proposal_id IS NOT ?
+            GROUP BY proposal_id ORDER BY COUNT(*) DESC, proposal_id LIMIT ?
+        ''', (*buckets, exclude_id, limit))
+        candidates = [row[0] for row in cursor.fetchall()]
         conn.close()
-        return None
+        return candidates
+    
+    def iter_duplicate_buckets(self):
+        """Корзины LSH, в которые попало больше одного предложения: отсортированные списки id"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                SELECT group_concat(proposal_id) FROM proposal_lsh
+                GROUP BY bucket HAVING COUNT(*) > 1
+            ''')
+            for (ids,) in cursor:
+                yield sorted(int(proposal_id) for proposal_id in ids.split(','))
+        finally:
+            conn.close()
     
     def get_statistics(self):
-        """Получение статистики по предложениям"""
-        conn = sqlite3.connect(self.db_name)
+        """Получение статистики по предложениям из сводной таблицы"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('SELECT kind, key, count, cost FROM proposal_stats ORDER BY kind, key')
+        rows = cursor.fetchall()
+        conn.close()
+        
+        status_stats = {}
+        category_stats = {}
+        priority_stats = {}
+        cost_by_status = {}
+        for kind, key, count, cost in rows:
+            if kind == 'status':
+                status_stats[key] = count
+                cost_by_status[key] = cost
+            elif kind == 'category':
+                category_stats[key] = count
+            elif kind == 'priority':
+                priority_stats[key] = count
+        
+        return {
+            'total': sum(status_stats.values()),
+            'status_stats': status_stats,
+            'category_stats': category_stats,
+            'priority_stats': priority_stats,
+            'total_cost': sum(cost for status, cost in cost_by_status.items() if status != Status.REJECTED.value),
+            'cost_by_status': cost_by_status
+        }
+    
+    def get_cost_summary(self):
+        """Финансовая сводка одним проходом по таблице: количество, сумма, средняя,
+        максимальная и минимальная ненулевая стоимость"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*), COALESCE(SUM(estimated_cost), 0), COALESCE(MAX(estimated_cost), 0),
+                   COALESCE(MIN(CASE WHEN estimated_cost > 0 THEN estimated_cost END), 0)
+            FROM proposals
+        ''')
+        count, total_cost, max_cost, min_cost = cursor.fetchone()
+        conn.close()
+        
+        return {
+            'count': count,
+            'total_cost': total_cost,
+            # Средняя по всем предложениям, включая предложения без оценки стоимости
+            'avg_cost': total_cost / count if count else 0,
+            'max_cost': max_cost,
+            'min_cost': min_cost
+        }
+    
+    def get_creation_trend(self, period='month'):
+        """Количество и стоимость предложений, созданных за каждую неделю или месяц.
+        
+        Возвращает список (период, количество, сумма стоимости) в хронологическом порядке.
+        """
+        if period not in TREND_PERIODS:
+            raise ValueError(f"Неизвестный период: {period}")
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT strftime(?, created_at, 'unixepoch') AS bucket, COUNT(*), COALESCE(SUM(estimated_cost), 0)
+            FROM proposals GROUP BY bucket ORDER BY bucket
+        ''', (TREND_PERIODS[period],))
+        trend = cursor.fetchall()
+        conn.close()
+        return trend
+    
+    def get_cost_percentiles(self, dimension, percentiles=(50, 90, 99)):
+        """Перцентили стоимости (по ближайшему рангу) в разрезе категории или отдела.
+        
+        Считаются оконной функцией CUME_DIST за один проход с сортировкой внутри групп.
+        Возвращает список (значение среза, количество, перцентиль1, перцентиль2, ...)
+        в порядке убывания количества.
+        """
+        if dimension not in PERCENTILE_DIMENSIONS:
+            raise ValueError(f"Неизвестный срез: {dimension}")
+        
+        # Перцентиль p - наименьшая стоимость, не дороже которой p% предложений группы
+        # (допуск компенсирует погрешность деления в CUME_DIST)
+        columns = ', '.join(f'MIN(CASE WHEN share * 100 >= {int(p)} - 1e-9 THEN cost END)' for p in percentiles)
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT grp, COUNT(*), {columns}
+            FROM (
+                SELECT {dimension} AS grp, COALESCE(estimated_cost, 0) AS cost,
+                       CUME_DIST() OVER (PARTITION BY {dimension} ORDER BY COALESCE(estimated_cost, 0)) AS share
+                FROM proposals
+            )
+            GROUP BY grp ORDER BY COUNT(*) DESC, grp
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    
+    def iter_cost_rows(self, batch_size=100000):
+        """Потоковое чтение (категория, отдел, стоимость) всех предложений пачками-списками"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT category, department, COALESCE(estimated_cost, 0) FROM proposals')
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            conn.close()
+    
+    def iter_scoring_rows(self, batch_size=100000):
+        """Потоковое чтение полей оценки предложений (SCORING_COLUMNS) пачками-списками в порядке id"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'SELECT {SCORING_COLUMNS} FROM proposals ORDER BY id')
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            conn.close()
+    
+    def get_scoring_rows(self, ids):
+        """Поля оценки (SCORING_COLUMNS) предложений из списка id (удаленных в результате нет)"""
+        ids = list(ids)
+        conn = self._connect()
+        cursor = conn.cursor()
+        rows = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cursor.execute(
+                f"SELECT {SCORING_COLUMNS} FROM proposals WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            rows.extend(cursor.fetchall())
+        conn.close()
+        return rows
+    
+    def get_status_lead_times(self):
+        """Сроки переходов по журналу изменений: сколько дней проходит от подачи
+        предложения до перехода в каждый статус.
+        
+        Возвращает список (статус, число переходов, средний срок, максимальный срок).
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT status, COUNT(*), AVG(lead_days), MAX(lead_days)
+            FROM proposal_history WHERE lead_days IS NOT NULL
+            GROUP BY status
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    
+    def get_proposal_history(self, proposal_id):
+        """Журнал изменений предложения в хронологическом порядке"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            f'SELECT {HISTORY_COLUMNS} FROM proposal_history WHERE proposal_id = ? ORDER BY changed_at, id',
+            (proposal_id,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    
+    def _history_deltas(self, cursor, condition, params):
+        """Суммарные приращения статистики по записям журнала, отобранным условием:
+        список (статус, категория, приоритет, количество, стоимость)"""
+        cursor.execute(f'''
+            SELECT status, category, priority, COUNT(*), COALESCE(SUM(estimated_cost), 0)
+            FROM proposal_history
+            WHERE {condition} AND NOT archived AND status IS NOT NULL
+            GROUP BY status, category, priority
+            UNION ALL
+            SELECT old_status, old_category, old_priority, -COUNT(*), -COALESCE(SUM(old_cost), 0)
+            FROM proposal_history
+            WHERE {condition} AND NOT archived AND old_status IS NOT NULL
+            GROUP BY old_status, old_category, old_priority
+        ''', params + params)
+        return cursor.fetchall()
+    
+    def get_statistics_as_of(self, moment):
+        """Статистика (в формате get_statistics) на момент moment - строку 'ГГГГ-ММ-ДД ЧЧ:ММ:СС'.
+        
+        Складываются дневные итоги за дни до даты moment (небольшая таблица history_daily)
+        и записи журнала за сам этот день до moment (диапазон по индексу idx_history_time).
+        """
+        day = moment[:10]
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT status, category, priority, SUM(count), SUM(cost) FROM history_daily
+            WHERE day < ? GROUP BY status, category, priority
+        ''', (day,))
+        deltas = cursor.fetchall()
+        deltas += self._history_deltas(cursor, 'changed_at >= ? AND changed_at <= ?', [day, moment])
+        conn.close()
+        
+        stats = {'status_stats': {}, 'category_stats': {}, 'priority_stats': {}, 'cost_by_status': {}}
+        status_stats = stats['status_stats']
+        category_stats = stats['category_stats']
+        priority_stats = stats['priority_stats']
+        cost_by_status = stats['cost_by_status']
+        for status, category, priority, count, cost in deltas:
+            status_stats[status] = status_stats.get(status, 0) + count
+            category_stats[category] = category_stats.get(category, 0) + count
+            priority_stats[priority] = priority_stats.get(priority, 0) + count
+            cost_by_status[status] = cost_by_status.get(status, 0) + cost
+        
+        # Значения, которых на тот момент не было, из результата убираются
+        for counts in (status_stats, category_stats, priority_stats):
+            for key in [key for key, count in counts.items() if count == 0]:
+                del counts[key]
+        cost_by_status = {status: round(cost, 2) for status, cost in cost_by_status.items() if status in status_stats}
+        
+        return {
+            'total': sum(status_stats.values()),
+            'status_stats': status_stats,
+            'category_stats': category_stats,
+            'priority_stats': priority_stats,
+            'total_cost': sum(cost for status, cost in cost_by_status.items() if status != Status.REJECTED.value),
+            'cost_by_status': cost_by_status
+        }
+    
+    def compact_history(self, before, keep_transitions=True):
+        """Сжатие журнала: записи старше before заменяются снимком состояния на before.
+        
+        Для каждого предложения, существовавшего на момент before, добавляется запись
+        'snapshot' с его последним состоянием; статистика на before и позже по-прежнему
+        восстанавливается точно, на более ранние даты - нет. Записи о смене статуса
+        при keep_transitions=True остаются в архиве (для сроков переходов), остальные
+        старые записи удаляются. Возвращает количество удаленных записей.
+        """
+        def compact(cursor):
+            # Последнее состояние каждого предложения до before. Временная таблица живет
+            # в подключении, которое может использоваться повторно, поэтому удаляется и до, и после
+            cursor.execute('DROP TABLE IF EXISTS temp.history_last')
+            cursor.execute('''
+                CREATE TEMP TABLE history_last AS
+                SELECT * FROM (
+                    SELECT proposal_id, changed_at, status, category, priority, estimated_cost,
+                           ROW_NUMBER() OVER (PARTITION BY proposal_id ORDER BY changed_at DESC, id DESC) AS position
+                    FROM proposal_history WHERE changed_at < ? AND NOT archived
+                ) WHERE position = 1 AND status IS NOT NULL
+            ''', (before,))
+            try:
+                if keep_transitions:
+                    cursor.execute('''
+                        DELETE FROM proposal_history
+                        WHERE changed_at < ? AND NOT archived AND lead_days IS NULL
+                    ''', (before,))
+                    removed = cursor.rowcount
+                    cursor.execute('UPDATE proposal_history SET archived = 1 WHERE changed_at < ? AND NOT archived', (before,))
+                else:
+                    cursor.execute('DELETE FROM proposal_history WHERE changed_at < ?', (before,))
+                    removed = cursor.rowcount
+                
+                cursor.execute(f'''
+                    INSERT INTO proposal_history ({HISTORY_COLUMNS})
+                    SELECT proposal_id, changed_at, 'snapshot', status, category, priority, estimated_cost,
+                           NULL, NULL, NULL, NULL, NULL
+                    FROM history_last
+                ''')
+            finally:
+                cursor.execute('DROP TABLE IF EXISTS temp.history_last')
+            
+            # Дневные итоги до before изменились - пересчитываем их по оставшимся записям
+            cursor.execute('DELETE FROM history_daily')
+            self._add_history_daily(cursor)
+            return removed
+        
+        return self._write(compact)
+    
+    def compute_statistics(self):
+        """Расчет статистики полным проходом по таблице (для проверки сводной таблицы)"""
+        conn = self._connect()
         cursor = conn.cursor()
         
         # Общее количество
@@ -239,5 +1362,356 @@ class Database:
             'category_stats': category_stats,
             'priority_stats': priority_stats,
             'total_cost': total_cost,
-            'cost_by_status': cost_by_status
-        }
\ No newline at end of file
+            'cost_by_status': {status: cost or 0 for status, cost in cost_by_status.items()}
+        }
+    
+    def check_statistics(self, repair=False):
+        """Сверка сводной таблицы с пересчетом с нуля.
+        
+        Возвращает список расхождений вида (показатель, в сводной таблице, фактически).
+        При repair=True сводная таблица пересобирается.
+        """
+        cached = self.get_statistics()
+        actual = self.compute_statistics()
+        
+        differences = []
+        for name, expected in actual.items():
+            value = cached[name]
+            if isinstance(expected, dict):
+                for key in sorted(set(expected) | set(value), key=str):
+                    if abs(value.get(key, 0) - expected.get(key, 0)) > 0.005:
+                        differences.append((f"{name}[{key}]", value.get(key, 0), expected.get(key, 0)))
+            elif abs(value - expected) > 0.005:
+                differences.append((name, value, expected))
+        
+        if differences and repair:
+            conn = self._connect()
+            self._rebuild_statistics(conn.cursor())
+            conn.commit()
+            conn.close()
+        return differences
+    
+    def _filter_conditions(self, status=None, category=None):
+        """Условия WHERE для фильтров по статусу и категории"""
+        conditions = []
+        params = []
+        # Фильтры приходят значениями перечислений, а индексы построены по кодам
+        if status:
+            conditions.append('status_code = ?')
+            params.append(STATUS_CODES.get(STATUS_BY_VALUE.get(status)))
+        if category:
+            conditions.append('category_code = ?')
+            params.append(CATEGORY_CODES.get(CATEGORY_BY_VALUE.get(category)))
+        return conditions, params
+    
+    def count_proposals(self, status=None, category=None):
+        """Количество предложений с учетом фильтров"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        if not (status and category):
+            # Без фильтров и с одним фильтром количество берется из сводной таблицы:
+            # COUNT(*) обходит весь индекс, а на холодном диске это заметно при запуске
+            kind, key = ('category', category) if category else ('status', status)
+            cursor.execute(
+                'SELECT COALESCE(SUM(count), 0) FROM proposal_stats WHERE kind = ? AND (? IS NULL OR key = ?)',
+                (kind, key, key)
+            )
+        else:
+            conditions, params = self._filter_conditions(status, category)
+            cursor.execute(f"SELECT COUNT(*) FROM proposals WHERE {' AND '.join(conditions)}", params)
+        total = cursor.fetchone()[0]
+        conn.close()
+        return total
+    
+    def get_proposals_page(self, status=None, category=None, after=None, limit=200):
+        """Страница предложений, следующих за ключом сортировки after"""
+        conditions, params = self._filter_conditions(status, category)
+        if after is not None:
+            priority, created_date, proposal_id = after
+            conditions.append(PROPOSAL_AFTER)
+            params.extend([priority, priority, created_date, created_date, proposal_id])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        conn = self._connect()
+        conn.row_factory = Proposal.from_row
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {PROPOSAL_COLUMNS} FROM proposals {where} ORDER BY {PROPOSAL_ORDER} LIMIT ?', params + [limit])
+        proposals = cursor.fetchall()
+        conn.close()
+        return proposals
+    
+    def get_page_key(self, offset, status=None, category=None):
+        """Ключ сортировки предложения с заданным смещением (для перехода к произвольной странице)"""
+        conditions, params = self._filter_conditions(status, category)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            f'SELECT priority, created_date, id FROM proposals {where} ORDER BY {PROPOSAL_ORDER} LIMIT 1 OFFSET ?',
+            params + [offset]
+        )
+        row = cursor.fetchone()
+        conn.close()
+        return tuple(row) if row else None
+    
+    def _search_conditions(self, query, status=None, category=None):
+        """FROM/WHERE для поиска: FTS5 MATCH или LIKE, если FTS5 недоступен"""
+        conditions, params = self._filter_conditions(status, category)
+        if self.fts_enabled:
+            # Без фильтров по статусу и категории таблица предложений для отбора не нужна
+            source = 'proposals_fts JOIN proposals ON proposals.id = proposals_fts.rowid' if conditions else 'proposals_fts'
+            conditions.insert(0, 'proposals_fts MATCH ?')
+            params.insert(0, build_match_query(query))
+        else:
+            source = 'proposals'
+            like = f"%{query}%"
+            conditions.insert(0, '(title LIKE ? OR description LIKE ? OR expected_benefit LIKE ? OR risks LIKE ?)')
+            params[0:0] = [like] * 4
+        return source, ' AND '.join(conditions), params
+    
+    def count_search_results(self, query, status=None, category=None, limit=SEARCH_COUNT_LIMIT):
+        """Количество предложений, найденных по тексту, но не больше limit
+        (None - точное количество без ограничения)"""
+        if not build_match_query(query):
+            return 0
+        source, where, params = self._search_conditions(query, status, category)
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        if limit is None:
+            cursor.execute(f'SELECT COUNT(*) FROM {source} WHERE {where}', params)
+        else:
+            cursor.execute(f'SELECT COUNT(*) FROM (SELECT 1 FROM {source} WHERE {where} LIMIT ?)', params + [limit])
+        total = cursor.fetchone()[0]
+        conn.close()
+        return total
+    
+    def _estimate_frequencies(self, cursor, terms):
+        """Оценка числа предложений с каждой основой и общего числа предложений для bm25.
+        
+        Точно считается только редкая основа (меньше SEARCH_RANK_CANDIDATES совпадений);
+        для частой число совпадений оценивается по тому, какую долю диапазона id занимают
+        ее SEARCH_RANK_CANDIDATES самых новых совпадений.
+        """
+        total = cursor.execute('SELECT MAX(id) FROM proposals').fetchone()[0] or 0
+        frequencies = []
+        for term in terms:
+            cursor.execute(
+                'SELECT rowid FROM proposals_fts WHERE proposals_fts MATCH ? ORDER BY rowid DESC LIMIT ?',
+                (term_query(term), SEARCH_RANK_CANDIDATES)
+            )
+            rows = cursor.fetchall()
+            if len(rows) < SEARCH_RANK_CANDIDATES:
+                frequencies.append(len(rows))
+            else:
+                frequencies.append(min(total, len(rows) * total / (total - rows[-1][0] + 1)))
+        return frequencies, total
+    
+    def search_proposals(self, query, status=None, category=None, limit=200, offset=0):
+        """Поиск предложений по тексту: список пар (предложение, фрагмент с подсветкой).
+        
+        Первыми идут SEARCH_RANK_CANDIDATES самых новых совпадений в порядке релевантности,
+        за ними - остальные совпадения от новых к старым.
+        """
+        if not build_match_query(query):
+            return []
+        source, where, params = self._search_conditions(query, status, category)
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        if not self.fts_enabled:
+            cursor.execute(
+                f'SELECT {QUALIFIED_COLUMNS}, substr(description, 1, 80) FROM {source} WHERE {where} '
+                f'ORDER BY {PROPOSAL_ORDER} LIMIT ? OFFSET ?',
+                params + [limit, offset]
+            )
+            results = [(Proposal(*row[:-1]), row[-1]) for row in cursor.fetchall()]
+            conn.close()
+            return results
+        
+        # FTS5 отдает совпадения по убыванию rowid без сортировки и останавливается на LIMIT.
+        # bm25() из FTS5 не используется: чтобы узнать, в скольких предложениях есть слово,
+        # он перебирает все совпадения (десятки миллисекунд на частом слове), поэтому
+        # кандидаты оцениваются по своему тексту (search.bm25_scores)
+        cursor.execute(
+            f'SELECT {QUALIFIED_COLUMNS} FROM proposals_fts JOIN proposals ON proposals.id = proposals_fts.rowid '
+            f'WHERE {where} ORDER BY proposals_fts.rowid DESC LIMIT ?',
+            params + [SEARCH_RANK_CANDIDATES]
+        )
+        found = {row[0]: Proposal(*row) for row in cursor.fetchall()}
+        terms = match_terms(query)
+        frequencies = total = None
+        if len(terms) > 1:
+            frequencies, total = self._estimate_frequencies(cursor, terms)
+        scores = bm25_scores(
+            [(proposal.id,) + _search_texts(proposal) for proposal in found.values()],
+            terms, FTS_WEIGHTS, frequencies, total
+        )
+        ranked = sorted(scores, key=lambda proposal_id: (-scores[proposal_id], -proposal_id))
+        ids = ranked[offset:offset + limit]
+        if len(ids) < limit and len(found) == SEARCH_RANK_CANDIDATES:
+            # Страница дальше кандидатов: остальные совпадения от новых к старым
+            cursor.execute(
+                f'SELECT proposals_fts.rowid FROM {source} WHERE {where} AND proposals_fts.rowid < ? '
+                f'ORDER BY proposals_fts.rowid DESC LIMIT ? OFFSET ?',
+                params + [min(found), limit - len(ids), max(0, offset - len(ranked))]
+            )
+            tail = [row[0] for row in cursor.fetchall()]
+            ids += tail
+            for start in range(0, len(tail), 500):
+                chunk = tail[start:start + 500]
+                cursor.execute(
+                    f'SELECT {PROPOSAL_COLUMNS} FROM proposals WHERE id IN ({", ".join("?" * len(chunk))})', chunk
+                )
+                found.update((row[0], Proposal(*row)) for row in cursor.fetchall())
+        conn.close()
+        
+        # Совпадения выделяются скобками «», т.к. Treeview не умеет подсвечивать часть текста
+        return [
+            (found[proposal_id], snippet(_search_texts(found[proposal_id]), terms))
+            for proposal_id in ids if proposal_id in found
+        ]
+
+
+class PagedCursor:
+    """Базовый источник данных для виртуального списка: строки читаются страницами,
+    в памяти держится несколько последних страниц"""
+    PAGE_SIZE = 200
+    MAX_CACHED_PAGES = 8
+    
+    def __init__(self, db):
+        self.db = db
+        self._total = None
+        self._pages = OrderedDict()
+    
+    def count(self):
+        """Общее количество строк (кэшируется до пересоздания курсора)"""
+        if self._total is None:
+            self._total = self._count()
+        return self._total
+    
+    def rows(self, offset, limit):
+        """Предложения в окне [offset, offset + limit)"""
+        result = []
+        end = min(offset + limit, self.count())
+        position = offset
+        while position < end:
+            page_index, start = divmod(position, self.PAGE_SIZE)
+            page = self._page(page_index)
+            if start >= len(page):
+                break
+            chunk = page[start:start + end - position]
+            result.extend(chunk)
+            position += len(chunk)
+        return result
+    
+    def _page(self, index):
+        if index in self._pages:
+            self._pages.move_to_end(index)
+            return self._pages[index]
+        
+        page = self._load_page(index)
+        self._pages[index] = page
+        while len(self._pages) > self.MAX_CACHED_PAGES:
+            self._evict(self._pages.popitem(last=False)[1])
+        return page
+    
+    def reset(self):
+        """Сброс загруженных страниц и количества строк (перечитываются при обращении)"""
+        for page in self._pages.values():
+            self._evict(page)
+        self._pages.clear()
+        self._total = None
+    
+    def patch(self, changes):
+        """Применение изменений предложений ({id: reorder} из Database.get_changes).
+        
+        Если хотя бы одно изменение может сдвинуть строки, страницы сбрасываются;
+        иначе загруженные строки измененных предложений заменяются на месте
+        (незагруженные прочитаются при обращении уже измененными).
+        """
+        if any(changes.values()):
+            self.reset()
+            return
+        loaded = [proposal.id for page in self._pages.values() for proposal in page if proposal.id in changes]
+        if not loaded:
+            return
+        current = self.db.get_proposals_by_ids(loaded)
+        for page in self._pages.values():
+            for index, proposal in enumerate(page):
+                if proposal.id in current:
+                    page[index] = current[proposal.id]
+    
+    def _count(self):
+        raise NotImplementedError
+    
+    def _load_page(self, index):
+        raise NotImplementedError
+    
+    def _evict(self, page):
+        pass
+
+
+class ProposalCursor(PagedCursor):
+    """Список предложений в обычном порядке; страницы читаются по ключу сортировки (keyset)"""
+    
+    def __init__(self, db, status=None, category=None):
+        super().__init__(db)
+        self.status = status
+        self.category = category
+        # Ключ, после которого начинается страница (None - начало списка)
+        self._page_keys = {0: None}
+    
+    def reset(self):
+        super().reset()
+        self._page_keys = {0: None}
+    
+    def _count(self):
+        return self.db.count_proposals(self.status, self.category)
+    
+    def _load_page(self, index):
+        key = self._page_key(index)
+        if index > 0 and key is None:
+            return []
+        page = self.db.get_proposals_page(self.status, self.category, after=key, limit=self.PAGE_SIZE)
+        if page:
+            last = page[-1]
+            self._page_keys[index + 1] = (last.priority, last.created_date_text, last.id)
+        return page
+    
+    def _page_key(self, index):
+        if index not in self._page_keys:
+            # Прыжок к далекой странице: ключ последней строки предыдущей страницы берем по смещению
+            self._page_keys[index] = self.db.get_page_key(index * self.PAGE_SIZE - 1, self.status, self.category)
+        return self._page_keys[index]
+
+
+class SearchCursor(PagedCursor):
+    """Результаты полнотекстового поиска в порядке релевантности"""
+    
+    def __init__(self, db, query, status=None, category=None):
+        super().__init__(db)
+        self.query = query
+        self.status = status
+        self.category = category
+        # Фрагменты текста с найденными словами (id предложения -> snippet)
+        self.snippets = {}
+    
+    def _count(self):
+        return self.db.count_search_results(self.query, self.status, self.category)
+    
+    def _load_page(self, index):
+        found = self.db.search_proposals(
+            self.query, self.status, self.category,
+            limit=self.PAGE_SIZE, offset=index * self.PAGE_SIZE
+        )
+        page = []
+        for proposal, snippet in found:
+            self.snippets[proposal.id] = snippet
+            page.append(proposal)
+        return page
+    
+    def _evict(self, page):
+        for proposal in page:
+            self.snippets.pop(proposal.id, None)
@@ -0,0 +1,218 @@
+"""Поиск повторяющихся и почти совпадающих предложений (MinHash и LSH).
+
+Текст предложения (название и описание) разбивается на шинглы - пары соседних
+основ слов (search.stem), так что разные формы одних слов и перестановка фраз
+мало влияют на сходство. Сходство двух предложений - коэффициент Жаккара их
+множеств шинглов.
+
+Чтобы не сравнивать новое предложение с каждым из существующих, для каждого
+хранятся ключи корзин LSH (таблица proposal_lsh): MinHash-подпись из NUM_BANDS * BAND_ROWS
+значений делится на NUM_BANDS полос, ключ корзины - хэш полосы. Предложения с
+хотя бы одной общей корзиной - кандидаты; вероятность попасть в кандидаты при
+сходстве s равна 1 - (1 - s^BAND_ROWS)^NUM_BANDS (0.91 при 0.6, 0.99 при 0.7, 0.24 при 0.3).
+Поиск кандидатов - NUM_BANDS чтений по индексу, сходство кандидатов затем
+проверяется точно по тексту.
+
+Ключи пересчитываются не триггером (в SQL подпись не посчитать), а по очереди
+proposal_lsh_pending, которую заполняют триггеры: Database.sync_duplicate_index
+досчитывает ее перед каждым поиском.
+"""
+import random
+import zlib
+from functools import lru_cache
+from search import stem, TOKEN_RE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NUM_BANDS = 10
+BAND_ROWS = 3
+NUM_HASHES = NUM_BANDS * BAND_ROWS
+
+# Начиная с какого сходства предложения считаются повторами
+SIMILARITY_THRESHOLD = 0.6
+# Сколько кандидатов (с наибольшим числом общих корзин) проверять по тексту
+MAX_CANDIDATES = 50
+
+MASK32 = 2**32 - 1
+MASK64 = 2**64 - 1
+
+# Хэш-функции MinHash: h(x) = старшие 32 бита (a * x + b) mod 2^64, a нечетное.
+# Коэффициенты фиксированы: ключи в базе должны совпадать между запусками.
+_generator = random.Random(20240545)
+HASH_A = [_generator.getrandbits(64) | 1 for _ in range(NUM_HASHES)]
+HASH_B = [_generator.getrandbits(64) for _ in range(NUM_HASHES)]
+
+# Шингл из хэшей двух соседних слов и ключ полосы из значений подписи
+PAIR_MULTIPLIER = 0x9E3779B1
+BAND_MULTIPLIER = 0x100000001B3
+
+
+@lru_cache(maxsize=200000)
+def _word_hash(token):
+    return zlib.crc32(stem(token).encode('utf-8'))
+
+
+def word_hashes(title, description):
+    """Хэши основ слов текста по порядку"""
+    return [_word_hash(token) for token in TOKEN_RE.findall(f"{title} {description}")]
+
+
+def _pairs(words):
+    if len(words) < 2:
+        return set(words)
+    return {(first * PAIR_MULTIPLIER + second) & MASK32 for first, second in zip(words, words[1:])}
+
+
+def shingles(title, description):
+    """Множество шинглов текста: хэши пар соседних основ (одной основы - для текста из одного слова)"""
+    return _pairs(word_hashes(title, description))
+
+
+def similarity(first, second):
+    """Коэффициент Жаккара двух множеств шинглов"""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def signature(shingle_set):
+    """MinHash-подпись множества шинглов: NUM_HASHES минимумов"""
+    return [
+        min(((a * x + b) & MASK64) >> 32 for x in shingle_set)
+        for a, b in zip(HASH_A, HASH_B)
+    ]
+
+
+def band_keys(minhashes):
+    """Ключи корзин LSH по подписи: по одному на полосу, со знаком (INTEGER SQLite)"""
+    keys = []
+    for band in range(NUM_BANDS):
+        key = band
+        for value in minhashes[band * BAND_ROWS:(band + 1) * BAND_ROWS]:
+            key = ((key ^ value) * BAND_MULTIPLIER) & MASK64
+        keys.append(key - 2**64 if key >= 2**63 else key)
+    return keys
+
+
+def bucket_rows(texts):
+    """Строки proposal_lsh (ключ корзины, id) для списка (id, название, описание)"""
+    items = [(proposal_id, word_hashes(title, description)) for proposal_id, title, description in texts]
+    items = [(proposal_id, words) for proposal_id, words in items if words]
+    if not items:
+        return []
+    if np is None:
+        return [(key, proposal_id) for proposal_id, words in items for key in band_keys(signature(_pairs(words)))]
+
+    # Те же вычисления, что в _pairs, signature и band_keys, сразу для всех текстов.
+    # Слова всех текстов идут подряд; шингл в позиции j - пара слов j и j + 1. В последнюю
+    # позицию текста (пара с первым словом следующего) ставится его же первый шингл
+    # (или единственное слово): повтор не меняет минимумы подписи.
+    # Умножение uint64 переполняется по модулю 2^64 - как & MASK64 в Python.
+    ids = [proposal_id for proposal_id, _ in items]
+    lengths = np.fromiter((len(words) for _, words in items), np.int64, len(items))
+    values = np.fromiter((word for _, words in items for word in words), np.uint64, int(lengths.sum()))
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    pairs = np.empty_like(values)
+    pairs[:-1] = (values[:-1] * np.uint64(PAIR_MULTIPLIER) + values[1:]) & np.uint64(MASK32)
+    pairs[ends - 1] = np.where(lengths > 1, pairs[starts], values[ends - 1])
+
+    a = np.array(HASH_A, dtype=np.uint64)[:, None]
+    b = np.array(HASH_B, dtype=np.uint64)[:, None]
+    minhashes = np.minimum.reduceat((a * pairs + b) >> np.uint64(32), starts, axis=1)
+
+    rows = []
+    for band in range(NUM_BANDS):
+        keys = np.full(len(items), band, dtype=np.uint64)
+        for value in minhashes[band * BAND_ROWS:(band + 1) * BAND_ROWS]:
+            keys = (keys ^ value) * np.uint64(BAND_MULTIPLIER)
+        rows.extend(zip(keys.view(np.int64).tolist(), ids))
+    return rows
+
+
+def find_similar(db, title, description, exclude_id=None, threshold=SIMILARITY_THRESHOLD, limit=5):
+    """Предложения, похожие на текст: список (предложение, сходство) по убыванию сходства.
+
+    exclude_id - id самого предложения при проверке отредактированного.
+    """
+    shingle_set = shingles(title, description)
+    if not shingle_set:
+        return []
+    db.sync_duplicate_index()
+    candidates = db.find_duplicate_candidates(band_keys(signature(shingle_set)), exclude_id, MAX_CANDIDATES)
+    matches = []
+    for proposal in db.get_proposals_by_ids(candidates).values():
+        score = similarity(shingle_set, shingles(proposal.title, proposal.description))
+        if score >= threshold:
+            matches.append((proposal, score))
+    matches.sort(key=lambda match: (-match[1], match[0].id))
+    return matches[:limit]
+
+
+class _Components:
+    """Объединение предложений в группы (система непересекающихся множеств)"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        root = item
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while item != root:
+            self.parent[item], item = root, self.parent.get(item, item)
+        return root
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # Корень группы - наименьший id; он тоже заносится в parent, чтобы попасть в groups
+            first, second = min(first, second), max(first, second)
+            self.parent[first] = first
+            self.parent[second] = first
+
+    def groups(self):
+        groups = {}
+        for item in list(self.parent):
+            groups.setdefault(self.find(item), []).append(item)
+        return groups
+
+
+def find_clusters(db, threshold=SIMILARITY_THRESHOLD, progress=None, batch_size=5000):
+    """Все группы повторяющихся предложений: список отсортированных списков id
+    (в группе не меньше двух), самые большие группы - первыми.
+
+    Внутри корзины LSH каждое предложение сравнивается с первым (наименьший id), а не
+    попарно со всеми: иначе корзина из тысяч одинаковых шаблонных текстов дала бы
+    миллионы сравнений. Похожие между собой, но не на первое предложения объединяются
+    через другие корзины и общих соседей.
+    progress(проверено пар, всего пар) вызывается после каждой пачки проверок.
+    """
+    db.sync_duplicate_index()
+    pairs = set()
+    for ids in db.iter_duplicate_buckets():
+        anchor = ids[0]
+        pairs.update((anchor, other) for other in ids[1:])
+    pairs = sorted(pairs)
+
+    components = _Components()
+    checked = 0
+    while checked < len(pairs):
+        batch = pairs[checked:checked + batch_size]
+        batch = [(first, second) for first, second in batch if components.find(first) != components.find(second)]
+        texts = db.get_proposal_texts({proposal_id for pair in batch for proposal_id in pair})
+        shingle_sets = {proposal_id: shingles(*text) for proposal_id, text in texts.items()}
+        for first, second in batch:
+            if first in shingle_sets and second in shingle_sets and \
+                    similarity(shingle_sets[first], shingle_sets[second]) >= threshold:
+                components.union(first, second)
+        checked = min(checked + batch_size, len(pairs))
+        if progress is not None:
+            progress(checked, len(pairs))
+
+    clusters = [sorted(group) for group in components.groups().values() if len(group) > 1]
+    clusters.sort(key=lambda group: (-len(group), group[0]))
+    return clusters
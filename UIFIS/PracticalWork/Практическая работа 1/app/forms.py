@@ -1,15 +1,70 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from models import Proposal, Category, Status
+from database import ProposalCursor, SearchCursor, ConflictError
+from startup_cache import load_first_page, save_first_page
+
+# Названия полей предложения для сообщения о конфликте изменений
+FIELD_TITLES = {
+    'title': "название", 'description': "описание", 'category': "категория", 'status': "статус",
+    'author': "автор", 'department': "отдел", 'priority': "приоритет",
+    'expected_benefit': "ожидаемая польза", 'estimated_cost': "стоимость",
+    'implementation_time': "срок реализации", 'risks': "риски",
+}
 
 class MainForm(tk.Frame):
     """Главная форма - список предложений"""
+    SEARCH_DELAY_MS = 250
+    
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
-        self.db = controller.db
+        # База еще не открыта: первый кадр показывается без нее (см. show_skeleton и start)
+        self.db = None
+        self.cursor = None
+        self.filters = None
+        self.offset = 0
+        # Значения строк, которые сейчас есть в таблице (iid -> values)
+        self.row_values = {}
+        self.search_job = None
         self.setup_ui()
+        self.show_skeleton()
+    
+    def show_skeleton(self):
+        """Первый кадр до открытия базы: первая страница списка, сохраненная при прошлом
+        закрытии, или строки-заглушки; кнопки недоступны до загрузки данных"""
+        for button in self.data_buttons:
+            button.config(state=tk.DISABLED)
+        cached = load_first_page(self.controller.db_name)
+        if cached:
+            rows, stats = cached
+            for values in rows:
+                iid = str(values[0])
+                self.tree.insert("", tk.END, iid=iid, values=values)
+                self.row_values[iid] = values
+            self.stats_label.config(text=stats)
+        else:
+            self.tree.tag_configure("skeleton", foreground="#b0b0b0")
+            for _ in range(self.visible_rows()):
+                self.tree.insert("", tk.END, values=("", "░" * 24, "░" * 12, "░" * 8, "░" * 10), tags=("skeleton",))
+            self.stats_label.config(text="Загрузка предложений...")
+    
+    def start(self):
+        """Первая загрузка данных из открытой базы и подписка на изменения"""
+        self.db = self.controller.db
+        for button in self.data_buttons:
+            button.config(state=tk.NORMAL)
         self.load_proposals()
+        self.controller.changes.subscribe(self.on_changes)
+    
+    def save_first_page(self):
+        """Сохранение первой страницы списка без фильтров для следующего запуска"""
+        if self.db is None:
+            return
+        # Без текста совпадения: он есть только у результатов поиска
+        rows = [self.format_row(proposal)[:-1] + ("",)
+                for proposal in ProposalCursor(self.db).rows(0, self.visible_rows())]
+        save_first_page(self.controller.db_name, rows, self.stats_label.cget("text"))
     
     def setup_ui(self):
         # Заголовок
@@ -77,12 +132,22 @@ class MainForm(tk.Frame):
         self.category_filter.set("Все")
         self.category_filter.bind("<<ComboboxSelected>>", lambda e: self.load_proposals())
         
+        # Поиск по мере ввода
+        search_frame = tk.Frame(self)
+        search_frame.pack(pady=5, fill=tk.X, padx=20)
+        
+        tk.Label(search_frame, text="🔍 Поиск:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(search_frame, textvariable=self.search_var, width=60)
+        self.search_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        
         # Таблица предложений
         table_frame = tk.Frame(self)
         table_frame.pack(pady=10, padx=20, fill=tk.BOTH, expand=True)
         
         # Создаем Treeview
-        columns = ("id", "title", "category", "status", "author", "priority", "cost", "date")
+        columns = ("id", "title", "category", "status", "author", "priority", "cost", "date", "match")
         self.tree = ttk.Treeview(
             table_frame,
             columns=columns,
@@ -99,6 +164,7 @@ class MainForm(tk.Frame):
         self.tree.heading("priority", text="Приоритет")
         self.tree.heading("cost", text="Стоимость")
         self.tree.heading("date", text="Дата")
+        self.tree.heading("match", text="Совпадение")
         
         self.tree.column("id", width=50)
         self.tree.column("title", width=250)
@@ -108,13 +174,24 @@ class MainForm(tk.Frame):
         self.tree.column("priority", width=80)
         self.tree.column("cost", width=100)
         self.tree.column("date", width=120)
+        self.tree.column("match", width=300)
+        self.tree["displaycolumns"] = columns[:-1]
         
-        # Полоса прокрутки
-        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Полоса прокрутки управляет окном строк, а не самим Treeview:
+        # в таблице хранятся только видимые строки
+        self.scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.on_scroll)
         
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.tree.bind("<Up>", self.on_key_up)
+        self.tree.bind("<Down>", self.on_key_down)
+        self.tree.bind("<Prior>", lambda e: self.scroll_rows(-self.visible_rows()))
+        self.tree.bind("<Next>", lambda e: self.scroll_rows(self.visible_rows()))
+        self.tree.bind("<Configure>", lambda e: self.render_window())
         
         # Привязка двойного клика
         self.tree.bind("<Double-1>", self.on_item_double_click)
@@ -158,43 +235,159 @@ class MainForm(tk.Frame):
             fg="gray"
         )
         self.stats_label.pack(pady=5)
+        
+        # Кнопки, которым нужна открытая база
+        self.data_buttons = button_frame.winfo_children() + action_frame.winfo_children()
     
     def load_proposals(self):
         """Загрузка предложений в таблицу"""
-        # Очищаем таблицу
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Получаем все предложения
-        proposals = self.db.get_all_proposals()
-        
-        # Применяем фильтры
-        filtered_proposals = proposals
-        if self.status_filter.get() != "Все":
-            filtered_proposals = [p for p in filtered_proposals if p.status.value == self.status_filter.get()]
-        if self.category_filter.get() != "Все":
-            filtered_proposals = [p for p in filtered_proposals if p.category.value == self.category_filter.get()]
-        
-        # Добавляем в таблицу
-        for proposal in filtered_proposals:
-            priority_text = {1: "Высокий", 2: "Средний", 3: "Низкий"}.get(proposal.priority, "Не указан")
-            self.tree.insert("", tk.END, values=(
-                proposal.id,
-                proposal.title,
-                proposal.category.value,
-                proposal.status.value,
-                proposal.author,
-                priority_text,
-                f"{proposal.estimated_cost:,.0f} руб." if proposal.estimated_cost else "Не указана",
-                proposal.created_date.strftime("%d.%m.%Y")
-            ))
-        
-        # Обновляем статистику
+        if self.db is None:
+            return
+        status = self.status_filter.get()
+        category = self.category_filter.get()
+        query = self.search_var.get().strip()
+        filters = (None if status == "Все" else status, None if category == "Все" else category, query)
+        
+        # При смене фильтра возвращаемся к началу списка, при обновлении остаемся на месте
+        if filters != self.filters:
+            self.filters = filters
+            self.offset = 0
+        
+        columns = self.tree["columns"]
+        if query:
+            self.cursor = SearchCursor(self.db, query, *filters[:2])
+            self.tree["displaycolumns"] = ("id", "title", "match", "category", "status", "cost")
+        else:
+            self.cursor = ProposalCursor(self.db, *filters[:2])
+            self.tree["displaycolumns"] = columns[:-1]
+        self.render_window()
+        self.update_stats()
+    
+    def update_stats(self):
+        """Обновление строки статистики (из сводной таблицы, без обхода предложений)"""
         stats = self.db.get_statistics()
         self.stats_label.config(
             text=f"Всего предложений: {stats['total']} | Общая стоимость: {stats['total_cost']:,.0f} руб."
         )
     
+    def on_changes(self, changes):
+        """Изменения предложений в этом или другом окне или процессе: перерисовываются
+        только изменившиеся строки видимого окна и статистика"""
+        if changes is None or self.cursor is None:
+            self.load_proposals()
+            return
+        self.cursor.patch(changes)
+        self.render_window()
+        self.update_stats()
+    
+    def schedule_search(self):
+        """Отложенный поиск: запрос выполняется после паузы в наборе текста"""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(self.SEARCH_DELAY_MS, self.run_search)
+    
+    def run_search(self):
+        self.search_job = None
+        self.load_proposals()
+    
+    def visible_rows(self):
+        """Количество строк, помещающихся в таблицу"""
+        height = self.tree.winfo_height()
+        if height <= 1:
+            return int(self.tree.cget("height"))
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # Одна строка уходит на заголовок таблицы
+        return max(1, height // row_height - 1)
+    
+    def render_window(self):
+        """Отрисовка видимого окна строк с обновлением только изменившихся элементов"""
+        if self.cursor is None:
+            return
+        
+        total = self.cursor.count()
+        visible = self.visible_rows()
+        self.offset = max(0, min(self.offset, total - visible))
+        proposals = self.cursor.rows(self.offset, visible)
+        
+        wanted = {str(proposal.id) for proposal in proposals}
+        stale = [iid for iid in self.tree.get_children() if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                self.row_values.pop(iid, None)
+        
+        for index, proposal in enumerate(proposals):
+            iid = str(proposal.id)
+            values = self.format_row(proposal)
+            if iid not in self.row_values:
+                self.tree.insert("", index, iid=iid, values=values)
+            else:
+                if self.row_values[iid] != values:
+                    self.tree.item(iid, values=values)
+                if self.tree.index(iid) != index:
+                    self.tree.move(iid, "", index)
+            self.row_values[iid] = values
+        
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + len(proposals)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+    
+    def format_row(self, proposal):
+        """Значения строки таблицы для предложения"""
+        priority_text = {1: "Высокий", 2: "Средний", 3: "Низкий"}.get(proposal.priority, "Не указан")
+        return (
+            proposal.id,
+            proposal.title,
+            proposal.category.value,
+            proposal.status.value,
+            proposal.author,
+            priority_text,
+            f"{proposal.estimated_cost:,.0f} руб." if proposal.estimated_cost else "Не указана",
+            proposal.created_date.strftime("%d.%m.%Y"),
+            getattr(self.cursor, "snippets", {}).get(proposal.id, "")
+        )
+    
+    def scroll_rows(self, delta):
+        """Сдвиг окна на delta строк"""
+        self.offset += delta
+        self.render_window()
+        return "break"
+    
+    def on_scroll(self, action, amount, unit=None):
+        """Обработка команд полосы прокрутки"""
+        if self.cursor is None:
+            return
+        if action == tk.MOVETO:
+            self.offset = int(float(amount) * self.cursor.count())
+            self.render_window()
+        elif unit == tk.PAGES:
+            self.scroll_rows(int(amount) * self.visible_rows())
+        else:
+            self.scroll_rows(int(amount))
+    
+    def on_mouse_wheel(self, event):
+        """Прокрутка колесом мыши (Windows/macOS)"""
+        return self.scroll_rows(-3 if event.delta > 0 else 3)
+    
+    def on_key_up(self, event):
+        """Стрелка вверх на первой видимой строке сдвигает окно"""
+        children = self.tree.get_children()
+        if children and self.tree.focus() == children[0] and self.offset > 0:
+            self.scroll_rows(-1)
+            self.tree.selection_set(self.tree.get_children()[0])
+            self.tree.focus(self.tree.get_children()[0])
+            return "break"
+    
+    def on_key_down(self, event):
+        """Стрелка вниз на последней видимой строке сдвигает окно"""
+        children = self.tree.get_children()
+        if children and self.tree.focus() == children[-1]:
+            self.scroll_rows(1)
+            self.tree.selection_set(self.tree.get_children()[-1])
+            self.tree.focus(self.tree.get_children()[-1])
+            return "break"
+    
     def get_selected_proposal_id(self):
         """Получение ID выбранного предложения"""
         selection = self.tree.selection()
@@ -219,20 +412,46 @@ class MainForm(tk.Frame):
         else:
             messagebox.showwarning("Внимание", "Выберите предложение для редактирования")
     
+    def get_selected_proposal(self):
+        """Выбранное предложение в том виде, в каком оно показано в списке (с версией строки)"""
+        selection = self.tree.selection()
+        if selection and self.cursor is not None:
+            rows = self.cursor.rows(self.offset + self.tree.index(selection[0]), 1)
+            if rows and str(rows[0].id) == selection[0]:
+                return rows[0]
+        return None
+    
     def delete_proposal(self):
-        """Удаление выбранного предложения"""
-        proposal_id = self.get_selected_proposal_id()
-        if proposal_id:
+        """Удаление выбранного предложения; если его тем временем изменил кто-то другой,
+        удаление подтверждается еще раз"""
+        proposal = self.get_selected_proposal()
+        if proposal:
             if messagebox.askyesno("Подтверждение", "Вы уверены, что хотите удалить это предложение?"):
-                self.db.delete_proposal(proposal_id)
-                self.load_proposals()
+                while True:
+                    try:
+                        self.db.delete_proposal(proposal.id, proposal.version)
+                        break
+                    except ConflictError as e:
+                        changed = [title for field, title in FIELD_TITLES.items()
+                                   if getattr(e.current, field) != getattr(proposal, field)]
+                        if not messagebox.askyesno(
+                            "Конфликт изменений",
+                            "Предложение изменил другой пользователь"
+                            + (f" (изменено: {', '.join(changed)})" if changed else "") + ".\n\n"
+                            "Все равно удалить?"
+                        ):
+                            self.controller.changes.poll()
+                            return
+                        proposal = e.current
+                self.controller.changes.poll()
                 messagebox.showinfo("Успех", "Предложение успешно удалено")
         else:
             messagebox.showwarning("Внимание", "Выберите предложение для удаления")
     
     def on_item_double_click(self, event):
         """Обработка двойного клика по предложению"""
-        self.view_proposal()
+        if self.db is not None:
+            self.view_proposal()
 
 class AddProposalForm(tk.Toplevel):
     """Форма добавления/редактирования предложения"""
@@ -390,6 +609,10 @@ class AddProposalForm(tk.Toplevel):
     def load_proposal_data(self):
         """Загрузка данных предложения в форму"""
         if self.proposal:
+            for entry in (self.title_entry, self.author_entry, self.department_entry, self.cost_entry, self.time_entry):
+                entry.delete(0, tk.END)
+            for text in (self.description_text, self.benefit_text, self.risks_text):
+                text.delete("1.0", tk.END)
             self.title_entry.insert(0, self.proposal.title)
             self.category_combo.set(self.proposal.category.value)
             self.description_text.insert("1.0", self.proposal.description)
@@ -447,22 +670,80 @@ class AddProposalForm(tk.Toplevel):
             except ValueError:
                 proposal.estimated_cost = 0.0
             
+            if not self.confirm_not_duplicate(proposal):
+                return
+            
             # Сохранение в БД
             if self.edit_mode and self.proposal_id:
                 proposal.id = self.proposal_id
                 proposal.created_date = self.proposal.created_date
-                self.db.update_proposal(proposal)
+                proposal.version = self.proposal.version
+                if not self.update_with_check(proposal):
+                    return
                 messagebox.showinfo("Успех", "Предложение успешно обновлено")
             else:
                 self.db.add_proposal(proposal)
                 messagebox.showinfo("Успех", "Предложение успешно добавлено")
             
-            # Обновление главной формы и закрытие
-            self.controller.main_form.load_proposals()
+            # Рассылка изменения открытым окнам (без ожидания периодической проверки) и закрытие
+            self.controller.changes.poll()
             self.destroy()
             
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сохранить предложение: {str(e)}")
+    
+    def confirm_not_duplicate(self, proposal):
+        """Предупреждение о похожих уже поданных предложениях (у отредактированного -
+        только если изменен текст). Возвращает True, если сохранять."""
+        if self.edit_mode and (proposal.title, proposal.description) == (self.proposal.title, self.proposal.description):
+            return True
+        # Импорт при первом сохранении: поиск повторов тянет NumPy, не нужный при запуске
+        from duplicates import find_similar
+        
+        similar = find_similar(self.db, proposal.title, proposal.description,
+                               exclude_id=self.proposal_id if self.edit_mode else None)
+        if not similar:
+            return True
+        lines = [f"#{match.id} {match.title} ({match.status.value}, сходство {score:.0%})" for match, score in similar]
+        return messagebox.askyesno(
+            "Похожие предложения",
+            "Уже поданы похожие предложения:\n\n" + "\n".join(lines) + "\n\nВсе равно сохранить?",
+            parent=self
+        )
+    
+    def update_with_check(self, proposal):
+        """Сохранение изменений; если предложение тем временем изменил кто-то другой,
+        пользователь выбирает, чья версия останется. Возвращает True, если сохранено."""
+        while True:
+            try:
+                self.db.update_proposal(proposal)
+                return True
+            except ConflictError as e:
+                current = e.current
+                if current is None:
+                    messagebox.showerror("Конфликт изменений", "Предложение удалено другим пользователем", parent=self)
+                    self.controller.changes.poll()
+                    self.destroy()
+                    return False
+                
+                changed = [title for field, title in FIELD_TITLES.items()
+                           if getattr(current, field) != getattr(self.proposal, field)]
+                answer = messagebox.askyesnocancel(
+                    "Конфликт изменений",
+                    "Пока вы редактировали предложение, его изменил другой пользователь"
+                    + (f" (изменено: {', '.join(changed)})" if changed else "") + ".\n\n"
+                    "Да - сохранить ваш вариант поверх чужих изменений\n"
+                    "Нет - загрузить текущий вариант (ваши правки будут потеряны)\n"
+                    "Отмена - продолжить редактирование",
+                    parent=self
+                )
+                if answer is None:
+                    return False
+                self.proposal = current
+                if not answer:
+                    self.load_proposal_data()
+                    return False
+                proposal.version = current.version
 
 class DetailsForm(tk.Toplevel):
     """Форма просмотра деталей предложения"""
@@ -482,6 +763,29 @@ class DetailsForm(tk.Toplevel):
         self.geometry("600x600")
         self.resizable(False, False)
         self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        controller.changes.subscribe(self.on_changes)
+    
+    def on_changes(self, changes):
+        """Перерисовка окна, если показанное предложение изменили; закрытие, если удалили"""
+        if changes is not None and self.proposal_id not in changes:
+            return
+        proposal = self.db.get_proposal_by_id(self.proposal_id)
+        if proposal is None:
+            self.close()
+            messagebox.showinfo("Внимание", f"Предложение #{self.proposal_id} удалено")
+            return
+        if proposal.version == self.proposal.version:
+            return
+        self.proposal = proposal
+        for child in self.winfo_children():
+            child.destroy()
+        self.setup_ui()
+    
+    def close(self):
+        """Закрытие окна с отменой подписки на изменения"""
+        self.controller.changes.unsubscribe(self.on_changes)
+        self.destroy()
     
     def setup_ui(self):
         main_frame = tk.Frame(self)
@@ -571,7 +875,7 @@ class DetailsForm(tk.Toplevel):
         tk.Button(
             button_frame,
             text="❌ Закрыть",
-            command=self.destroy,
+            command=self.close,
             bg="gray",
             fg="white",
             font=("Arial", 10)
@@ -580,7 +884,7 @@ class DetailsForm(tk.Toplevel):
     def edit_proposal(self):
         """Переход к редактированию предложения"""
         self.controller.show_add_form(self.proposal_id, edit=True)
-        self.destroy()
+        self.close()
     
     def print_proposal(self):
         """Печать предложения"""
@@ -602,15 +906,22 @@ class DetailsForm(tk.Toplevel):
 
 class ReportForm(tk.Toplevel):
     """Форма формирования отчетов"""
+    POLL_INTERVAL_MS = 300
+    
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
         self.db = controller.db
         
+        self.poll_job = None
+        
         self.title("📊 Формирование отчетов")
-        self.geometry("500x600")
+        self.geometry("640x860")
         self.resizable(False, False)
         self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh_jobs()
+        controller.changes.subscribe(self.on_changes)
     
     def setup_ui(self):
         main_frame = tk.Frame(self)
@@ -625,22 +936,15 @@ class ReportForm(tk.Toplevel):
         title_label.pack(pady=(0, 20))
         
         # Статистика
-        stats = self.db.get_statistics()
-        
         stats_frame = tk.LabelFrame(main_frame, text="Текущая статистика", padx=10, pady=10)
         stats_frame.pack(fill=tk.X, pady=(0, 20))
         
-        tk.Label(
-            stats_frame,
-            text=f"Всего предложений: {stats['total']}",
-            font=("Arial", 10)
-        ).pack(anchor="w", pady=2)
+        self.total_label = tk.Label(stats_frame, font=("Arial", 10))
+        self.total_label.pack(anchor="w", pady=2)
         
-        tk.Label(
-            stats_frame,
-            text=f"Общая стоимость: {stats['total_cost']:,.0f} руб.",
-            font=("Arial", 10)
-        ).pack(anchor="w", pady=2)
+        self.cost_label = tk.Label(stats_frame, font=("Arial", 10))
+        self.cost_label.pack(anchor="w", pady=2)
+        self.update_stats()
         
         # Варианты отчетов
         report_frame = tk.LabelFrame(main_frame, text="Тип отчета", padx=10, pady=10)
@@ -680,27 +984,32 @@ class ReportForm(tk.Toplevel):
             font=("Arial", 10)
         ).pack(anchor="w", pady=5)
         
+        tk.Radiobutton(
+            report_frame,
+            text="Аналитика (динамика, перцентили стоимости, сроки)",
+            variable=self.report_type,
+            value="analytics",
+            font=("Arial", 10)
+        ).pack(anchor="w", pady=5)
+        
         # Формат отчета
         format_frame = tk.LabelFrame(main_frame, text="Формат отчета", padx=10, pady=10)
         format_frame.pack(fill=tk.X, pady=(0, 20))
         
         self.format_type = tk.StringVar(value="pdf")
         
-        tk.Radiobutton(
-            format_frame,
-            text="PDF документ",
-            variable=self.format_type,
-            value="pdf",
-            font=("Arial", 10)
-        ).pack(anchor="w", pady=5)
-        
-        tk.Radiobutton(
-            format_frame,
-            text="Текстовый файл",
-            variable=self.format_type,
-            value="txt",
-            font=("Arial", 10)
-        ).pack(anchor="w", pady=5)
+        # Форматы в одну строку, чтобы окно не росло с добавлением новых
+        for text, value in (
+            ("PDF документ", "pdf"), ("Текстовый файл", "txt"),
+            ("CSV", "csv"), ("Excel", "xlsx"), ("HTML", "html")
+        ):
+            tk.Radiobutton(
+                format_frame,
+                text=text,
+                variable=self.format_type,
+                value=value,
+                font=("Arial", 10)
+            ).pack(side=tk.LEFT, padx=(0, 10), pady=5)
         
         # Кнопки
         button_frame = tk.Frame(main_frame)
@@ -719,35 +1028,95 @@ class ReportForm(tk.Toplevel):
         tk.Button(
             button_frame,
             text="❌ Закрыть",
-            command=self.destroy,
+            command=self.close,
             bg="gray",
             fg="white",
             font=("Arial", 10),
             width=15
         ).pack(side=tk.LEFT, padx=5)
+        
+        # Панель заданий: отчеты формируются в фоне, окно при этом не блокируется
+        jobs_frame = tk.LabelFrame(main_frame, text="Задания", padx=10, pady=10)
+        jobs_frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        
+        columns = ("id", "report", "format", "state", "rows", "pages", "file")
+        self.jobs_tree = ttk.Treeview(jobs_frame, columns=columns, show="headings", height=6)
+        for column, text, width in (
+            ("id", "№", 30), ("report", "Отчет", 110), ("format", "Формат", 55),
+            ("state", "Состояние", 90), ("rows", "Строк", 60), ("pages", "Страниц", 60),
+            ("file", "Файл", 160)
+        ):
+            self.jobs_tree.heading(column, text=text)
+            self.jobs_tree.column(column, width=width)
+        self.jobs_tree.pack(fill=tk.BOTH, expand=True)
+        
+        tk.Button(
+            jobs_frame,
+            text="⛔ Отменить задание",
+            command=self.cancel_job,
+            bg="#f44336",
+            fg="white",
+            font=("Arial", 9)
+        ).pack(pady=(5, 0))
+    
+    def update_stats(self):
+        """Обновление текущей статистики"""
+        stats = self.db.get_statistics()
+        self.total_label.config(text=f"Всего предложений: {stats['total']}")
+        self.cost_label.config(text=f"Общая стоимость: {stats['total_cost']:,.0f} руб.")
+    
+    def on_changes(self, changes):
+        self.update_stats()
     
     def generate_report(self):
-        """Генерация отчета"""
+        """Постановка отчета в очередь фоновой генерации"""
         try:
-            from report_generator import ReportGenerator
-            generator = ReportGenerator(self.db)
-            
-            report_type = self.report_type.get()
-            format_type = self.format_type.get()
-            
-            if report_type == "full":
-                file_path = generator.generate_full_report(format_type)
-            elif report_type == "status":
-                file_path = generator.generate_status_report(format_type)
-            elif report_type == "category":
-                file_path = generator.generate_category_report(format_type)
-            elif report_type == "financial":
-                file_path = generator.generate_financial_report(format_type)
-            else:
-                file_path = generator.generate_full_report(format_type)
-            
-            messagebox.showinfo("Успех", f"Отчет сохранен:\n{file_path}")
-            self.destroy()
-            
+            queue = self.controller.get_report_queue()
+            queue.submit(self.report_type.get(), self.format_type.get())
+            self.update_jobs()
         except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось сформировать отчет: {str(e)}")
\ No newline at end of file
+            messagebox.showerror("Ошибка", f"Не удалось сформировать отчет: {str(e)}")
+    
+    def cancel_job(self):
+        """Отмена выбранного задания"""
+        selection = self.jobs_tree.selection()
+        if not selection:
+            messagebox.showwarning("Внимание", "Выберите задание для отмены", parent=self)
+            return
+        self.controller.get_report_queue().cancel(int(selection[0]))
+        self.update_jobs()
+    
+    def refresh_jobs(self):
+        """Периодическое обновление списка заданий (один цикл after на окно)"""
+        self.update_jobs()
+        self.poll_job = self.after(self.POLL_INTERVAL_MS, self.refresh_jobs)
+    
+    def update_jobs(self):
+        """Обновление списка заданий и сообщения о завершенных"""
+        from report_jobs import REPORT_TITLES, STATE_TITLES, DONE, FAILED
+        
+        queue = self.controller.report_queue
+        if queue is not None:
+            for job in queue.poll():
+                if job.state == DONE:
+                    messagebox.showinfo("Успех", f"Отчет сохранен:\n{job.result}", parent=self)
+                elif job.state == FAILED:
+                    messagebox.showerror("Ошибка", f"Не удалось сформировать отчет: {job.error}", parent=self)
+            
+            for job in queue.jobs():
+                values = (
+                    job.id, REPORT_TITLES[job.report_type], job.format_type,
+                    STATE_TITLES[job.state], job.rows, job.pages, job.result or job.error or ""
+                )
+                iid = str(job.id)
+                if self.jobs_tree.exists(iid):
+                    self.jobs_tree.item(iid, values=values)
+                else:
+                    self.jobs_tree.insert("", tk.END, iid=iid, values=values)
+    
+    def close(self):
+        """Закрытие окна (задания продолжают выполняться в фоне)"""
+        if self.poll_job is not None:
+            self.after_cancel(self.poll_job)
+        self.controller.changes.unsubscribe(self.on_changes)
+        self.destroy()
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""Нагрузочный тест HTTP-сервиса предложений (api_server.py).
+
+Клиенты держат соединения keep-alive и без пауз отправляют запросы на чтение
+вперемешку: предложение по id, страницы списка (с фильтром и без) и статистику.
+Несколько клиентских процессов нужны, чтобы упираться в сервер, а не в клиента.
+
+Примеры:
+    python load_test.py --url http://127.0.0.1:8080 --connections 64 --duration 10
+    python load_test.py --spawn --rows 100000 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from multiprocessing import Pool
+from urllib.parse import urlsplit, quote
+from models import Status
+
+# Доли запросов разных видов: (вес, шаблон пути)
+REQUEST_MIX = [
+    (5, 'by_id'),
+    (2, '/proposals?limit=50'),
+    (2, 'by_status'),
+    (1, '/statistics'),
+]
+
+
+def request_paths(max_id, seed):
+    """Бесконечная последовательность путей запросов в пропорциях REQUEST_MIX"""
+    generator = random.Random(seed)
+    statuses = [quote(status.value) for status in Status]
+    kinds = [kind for weight, kind in REQUEST_MIX for _ in range(weight)]
+    while True:
+        kind = generator.choice(kinds)
+        if kind == 'by_id':
+            yield f'/proposals/{generator.randint(1, max_id)}'
+        elif kind == 'by_status':
+            yield f'/proposals?status={generator.choice(statuses)}&limit=50'
+        else:
+            yield kind
+
+
+async def fetch(reader, writer, host, path):
+    """Один GET по открытому соединению; возвращает (код ответа, тело)"""
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode('utf-8'))
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def client(host, port, paths, deadline, latencies, codes):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in paths:
+            if time.perf_counter() >= deadline:
+                break
+            started = time.perf_counter()
+            try:
+                status, body = await fetch(reader, writer, host, path)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                codes['connection error'] += 1
+                break
+            latencies.append(time.perf_counter() - started)
+            codes[status] += 1
+    finally:
+        writer.close()
+
+
+def run_clients(task):
+    """Клиентский процесс: connections соединений до истечения duration секунд"""
+    host, port, connections, duration, max_id, seed = task
+
+    async def main():
+        latencies = []
+        codes = Counter()
+        deadline = time.perf_counter() + duration
+        clients = [
+            client(host, port, request_paths(max_id, seed * 1000 + i), deadline, latencies, codes)
+            for i in range(connections)
+        ]
+        await asyncio.gather(*clients)
+        return latencies, codes
+
+    return asyncio.run(main())
+
+
+def get_json(host, port, path):
+    async def main():
+        reader, writer = await asyncio.open_connection(host, port)
+        status, body = await fetch(reader, writer, host, path)
+        writer.close()
+        return json.loads(body)
+    return asyncio.run(main())
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Сервер не запустился на {host}:{port}")
+
+
+def load_test(host, port, connections, processes, duration):
+    total = get_json(host, port, '/statistics')['total']
+    max_id = max(total, 1)
+    per_process = [connections // processes + (i < connections % processes) for i in range(processes)]
+    tasks = [(host, port, count, duration, max_id, i) for i, count in enumerate(per_process) if count]
+
+    started = time.perf_counter()
+    with Pool(len(tasks)) as pool:
+        results = pool.map(run_clients, tasks)
+    seconds = time.perf_counter() - started
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    codes = sum((result[1] for result in results), Counter())
+    print(f"{connections} соединений в {len(tasks)} процессах, {duration} с, предложений в базе: {total}")
+    if not latencies:
+        print("Ни один запрос не выполнен")
+        return 1
+    print(f"  запросов: {len(latencies)}, {len(latencies) / seconds:,.0f} в секунду")
+    print(f"  задержка: p50 {percentile(latencies, 50) * 1000:.1f} мс, p90 {percentile(latencies, 90) * 1000:.1f} мс, "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} мс, max {latencies[-1] * 1000:.1f} мс")
+    print("  ответы: " + ', '.join(f"{code}: {count}" for code, count in sorted(codes.items(), key=str)))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест HTTP-сервиса предложений")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="адрес сервиса")
+    parser.add_argument("--connections", type=int, default=64, help="одновременных соединений")
+    parser.add_argument("--processes", type=int, default=min(4, os.cpu_count() or 1), help="клиентских процессов")
+    parser.add_argument("--duration", type=float, default=10, help="длительность, секунд")
+    parser.add_argument("--spawn", action="store_true",
+                        help="запустить сервер самостоятельно на временной базе из --rows предложений")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--threads", type=int, default=8, help="потоков базы у запускаемого сервера")
+    args = parser.parse_args(argv)
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    if not args.spawn:
+        return load_test(host, port, args.connections, args.processes, args.duration)
+
+    from benchmark import create_database
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_name = os.path.join(directory, "load.db")
+        create_database(db_name, args.rows)
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_server.py"),
+             "--db", db_name, "--host", host, "--port", str(port), "--threads", str(args.threads)],
+            cwd=directory
+        )
+        try:
+            wait_for_port(host, port)
+            return load_test(host, port, args.connections, args.processes, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
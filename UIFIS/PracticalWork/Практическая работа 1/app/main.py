@@ -1,21 +1,68 @@
+import argparse
+import time
 import tkinter as tk
 from tkinter import messagebox
+from changes import ChangeFeed
 from database import Database
 from forms import MainForm, AddProposalForm, DetailsForm, ReportForm
 
 class Application:
-    def __init__(self, root):
+    # Как часто проверять изменения, сделанные в других окнах и процессах
+    CHANGES_POLL_MS = 1000
+    
+    def __init__(self, root, db_name='proposals.db', startup_probe=False):
         self.root = root
         self.root.title("Система управления предложениями по расширению ИС")
         self.root.geometry("1000x700")
         
-        self.db = Database()
+        self.db_name = db_name
+        # База (с миграциями и проверкой схемы) открывается после первой отрисовки окна
+        self.db = None
+        # Очередь фоновых отчетов создается при первом обращении
+        self.report_queue = None
+        # Уведомления окон об изменениях предложений
+        self.changes = None
+        # Замер запуска для benchmark.py startup: вывести время кадров и выйти
+        self.startup_probe = startup_probe
         
         self.main_form = MainForm(root, self)
         self.main_form.pack(fill=tk.BOTH, expand=True)
+        self.main_form.bind("<Map>", self.on_first_map)
         
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
+    def on_first_map(self, event):
+        """Окно показано: сначала дорисовывается первый кадр, затем открывается база"""
+        self.main_form.unbind("<Map>")
+        self.root.update_idletasks()
+        if self.startup_probe:
+            print(f"first_frame {time.time()}", flush=True)
+        self.root.after(0, self.open_database)
+    
+    def open_database(self):
+        """Открытие базы и первая загрузка списка"""
+        try:
+            self.db = Database(self.db_name)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть базу данных: {str(e)}")
+            self.root.destroy()
+            return
+        self.changes = ChangeFeed(self.db)
+        self.main_form.start()
+        self.poll_changes()
+        
+        if self.startup_probe:
+            self.root.update_idletasks()
+            print(f"data_loaded {time.time()}", flush=True)
+            self.main_form.save_first_page()
+            self.root.destroy()
+    
+    def poll_changes(self):
+        """Периодическая рассылка изменений открытым окнам"""
+        # Следующая проверка планируется заранее, чтобы ошибка чтения не остановила опрос
+        self.root.after(self.CHANGES_POLL_MS, self.poll_changes)
+        self.changes.poll()
+    
     def show_add_form(self, proposal_id=None, edit=False):
         """Показать форму добавления/редактирования предложения"""
         AddProposalForm(self.root, self, proposal_id, edit)
@@ -28,15 +75,35 @@ class Application:
         """Показать форму формирования отчетов"""
         ReportForm(self.root, self)
     
+    def get_report_queue(self):
+        """Очередь фоновой генерации отчетов"""
+        if self.report_queue is None:
+            from report_jobs import ReportJobQueue
+            self.report_queue = ReportJobQueue(self.db.db_name)
+        return self.report_queue
+    
     def on_closing(self):
         """Обработка закрытия приложения"""
-        if messagebox.askokcancel("Выход", "Вы уверены, что хотите выйти?"):
+        message = "Вы уверены, что хотите выйти?"
+        if self.report_queue is not None and self.report_queue.active_count():
+            message = "Незавершенные отчеты будут отменены. " + message
+        if messagebox.askokcancel("Выход", message):
+            if self.report_queue is not None:
+                self.report_queue.shutdown()
+            # Первая страница списка покажется при следующем запуске до открытия базы
+            self.main_form.save_first_page()
             self.root.destroy()
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Система управления предложениями по расширению ИС")
+    parser.add_argument("--db", default="proposals.db", help="путь к файлу базы данных")
+    parser.add_argument("--startup-probe", action="store_true",
+                        help="вывести время первого кадра и загрузки данных и выйти (для benchmark.py startup)")
+    args = parser.parse_args(argv)
+
     root = tk.Tk()
-    app = Application(root)
+    app = Application(root, args.db, args.startup_probe)
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,319 @@
+"""Служебные команды для базы предложений.
+
+Примеры:
+    python maintenance.py check-stats
+    python maintenance.py check-stats --repair --db proposals.db
+    python maintenance.py import proposals.csv --defer-indexes
+    python maintenance.py export backup.jsonl
+    python maintenance.py export-pdf dossier --bundle dossier.pdf
+    python maintenance.py stats-as-of 2025-06-30
+    python maintenance.py compact-history --before 2025-01-01
+    python maintenance.py migrate --vacuum
+    python maintenance.py rank --top 20 --weight cost=0.4 --explain 15
+    python maintenance.py duplicates --threshold 0.7 --limit 50
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from bulk_io import FORMATS, import_proposals, export_proposals
+from database import Database
+from duplicates import SIMILARITY_THRESHOLD, find_clusters
+from migrations import SCHEMA_VERSION, storage_usage, query_plans
+from models import Status
+from scoring import ScoringEngine, DEFAULT_WEIGHTS, ACTIVE_STATUSES
+
+
+def check_stats(db, args):
+    """Сверка сводной статистики с пересчетом с нуля"""
+    differences = db.check_statistics(repair=args.repair)
+    if not differences:
+        print("Статистика согласована")
+        return 0
+
+    print("Найдены расхождения:")
+    for name, cached, actual in differences:
+        print(f"  {name}: в сводной таблице {cached}, фактически {actual}")
+    if args.repair:
+        print("Сводная таблица пересобрана")
+        return 0
+    return 1
+
+
+def import_file(db, args):
+    """Массовый импорт предложений из файла"""
+    try:
+        result = import_proposals(
+            db, args.path, args.format, args.batch_size,
+            strict=args.strict, defer_indexes=args.defer_indexes
+        )
+    except ValueError as e:
+        print(f"Импорт прерван: {e}")
+        return 1
+
+    print(result)
+    for line, message in result.errors:
+        print(f"  строка {line}: {message}")
+    if result.skipped > len(result.errors):
+        print(f"  ... и еще {result.skipped - len(result.errors)} ошибок")
+
+    # Сразу, а не при первой проверке на повторы в окне добавления предложения
+    started = time.perf_counter()
+    indexed = db.sync_duplicate_index()
+    if indexed:
+        print(f"Индекс повторов дополнен {indexed} предложениями за {time.perf_counter() - started:.1f} с")
+    return 0
+
+
+def export_file(db, args):
+    """Потоковый экспорт предложений в файл"""
+    started = time.perf_counter()
+    count = export_proposals(db, args.path, args.format, args.batch_size)
+    seconds = time.perf_counter() - started
+    rate = count / seconds if seconds else 0
+    print(f"Выгружено {count} строк за {seconds:.2f} с ({rate:,.0f} строк/с) в {args.path}")
+    return 0
+
+
+def export_pdf(db, args):
+    """Пакетный экспорт карточек предложений в PDF"""
+    # Импорт здесь: остальные команды не зависят от ReportLab
+    from batch_export import export_proposal_pdfs
+
+    try:
+        result = export_proposal_pdfs(db, args.directory, args.workers, args.force, args.bundle)
+    except RuntimeError as e:
+        print(f"Ошибка: {e}")
+        return 1
+    print(result)
+    return 0
+
+
+def parse_moment(text):
+    """Дата или дата со временем; для даты без времени берется конец дня"""
+    if len(text) == 10:
+        text += " 23:59:59"
+    datetime.fromisoformat(text)
+    return text
+
+
+def stats_as_of(db, args):
+    """Статистика по журналу изменений на заданный момент"""
+    started = time.perf_counter()
+    stats = db.get_statistics_as_of(args.moment)
+    seconds = time.perf_counter() - started
+
+    print(f"Статистика на {args.moment} (рассчитана за {seconds:.2f} с):")
+    print(f"  Всего предложений: {stats['total']}")
+    print(f"  Общая стоимость (без отклоненных): {stats['total_cost']:,.0f} руб.")
+    for title, key in (("По статусам", 'status_stats'), ("По категориям", 'category_stats'),
+                       ("По приоритетам", 'priority_stats')):
+        print(f"  {title}:")
+        for value, count in sorted(stats[key].items(), key=lambda item: str(item[0])):
+            print(f"    {value}: {count}")
+    return 0
+
+
+def compact_history(db, args):
+    """Сжатие журнала изменений старше заданной даты"""
+    started = time.perf_counter()
+    removed = db.compact_history(args.before, keep_transitions=not args.full)
+    print(f"Удалено записей журнала: {removed} за {time.perf_counter() - started:.2f} с")
+    return 0
+
+
+def print_schema_report(db_name):
+    """Размер базы по объектам и планы основных запросов"""
+    usage = storage_usage(db_name)
+    print(f"  Версия схемы: {usage['version']} (текущая {SCHEMA_VERSION})")
+    print(f"  Размер файла: {usage['file_bytes'] / 2**20:.1f} МБ, "
+          f"из них свободно {usage['free_bytes'] / 2**20:.1f} МБ")
+    for name, size in usage['objects']:
+        if size >= 2**20:
+            print(f"    {name:<36} {size / 2**20:9.1f} МБ")
+    plans = query_plans(db_name)
+    if not plans:
+        print("  Таблицы предложений еще нет")
+        return
+    print("  Запросы:")
+    for title, seconds, plan in plans:
+        print(f"    {title}: {seconds * 1000:.1f} мс")
+        for step in plan:
+            print(f"      {step}")
+
+
+def migrate_database(args):
+    """Применение миграций схемы с отчетом о размере и запросах до и после"""
+    print("До миграции:")
+    print_schema_report(args.db)
+
+    def progress(copied, total):
+        print(f"  скопировано {copied} из {total} строк")
+
+    version = storage_usage(args.db)['version']
+    started = time.perf_counter()
+    Database(args.db, migration_progress=progress)
+    if version < SCHEMA_VERSION:
+        print(f"Схема обновлена с версии {version} до {SCHEMA_VERSION} за {time.perf_counter() - started:.2f} с")
+    else:
+        print("Схема уже актуальна")
+
+    if args.vacuum:
+        started = time.perf_counter()
+        conn = sqlite3.connect(args.db)
+        conn.execute('VACUUM')
+        conn.close()
+        print(f"Файл базы сжат за {time.perf_counter() - started:.2f} с")
+
+    print("После миграции:")
+    print_schema_report(args.db)
+    return 0
+
+
+def parse_weight(text):
+    """Вес показателя оценки в виде имя=число"""
+    name, _, value = text.partition('=')
+    if name not in DEFAULT_WEIGHTS:
+        raise argparse.ArgumentTypeError(f"неизвестный показатель {name} (доступны: {', '.join(DEFAULT_WEIGHTS)})")
+    try:
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"вес должен быть числом: {text}")
+
+
+def rank_proposals(db, args):
+    """Рейтинг предложений по взвешенной оценке"""
+    try:
+        engine = ScoringEngine(db, weights=dict(args.weight or []))
+    except ValueError as e:
+        print(f"Ошибка: {e}")
+        return 1
+
+    started = time.perf_counter()
+    engine.refresh()
+    loaded = time.perf_counter() - started
+    started = time.perf_counter()
+    top = engine.top(args.top, list(Status) if args.all_statuses else ACTIVE_STATUSES)
+    ranked = time.perf_counter() - started
+
+    print("Веса: " + ', '.join(f"{name}={value:g}" for name, value in engine.weights.items()))
+    print(f"Лучшие {len(top)} предложений из {len(engine.columns['id'])} "
+          f"(чтение {loaded:.2f} с, оценка и отбор {ranked * 1000:.0f} мс):")
+    proposals = db.get_proposals_by_ids(proposal_id for proposal_id, _ in top)
+    for place, (proposal_id, score) in enumerate(top, 1):
+        proposal = proposals.get(proposal_id)
+        title = proposal.title if proposal else "(удалено)"
+        print(f"  {place:>3}. #{proposal_id:<8} {score:6.2f}  {title[:60]}")
+
+    for proposal_id in args.explain or []:
+        parts = engine.explain(proposal_id)
+        if parts is None:
+            print(f"Предложение #{proposal_id} не найдено")
+            continue
+        print(f"Оценка #{proposal_id}: {sum(points for _, _, points in parts):.2f}")
+        for name, value, points in parts:
+            print(f"  {name:<9} {value:5.2f} -> {points:6.2f}")
+    return 0
+
+
+def duplicate_clusters(db, args):
+    """Отчет о группах повторяющихся и почти совпадающих предложений"""
+    def progress(done, total):
+        print(f"  индекс повторов: {done} из {total}")
+
+    started = time.perf_counter()
+    db.sync_duplicate_index(progress=progress)
+    clusters = find_clusters(db, args.threshold)
+    seconds = time.perf_counter() - started
+    if not clusters:
+        print(f"Повторов не найдено ({seconds:.1f} с)")
+        return 0
+
+    print(f"Групп повторов: {len(clusters)}, предложений в них: {sum(map(len, clusters))} "
+          f"(сходство от {args.threshold:.0%}, {seconds:.1f} с)")
+    shown = clusters[:args.limit]
+    proposals = db.get_proposals_by_ids(proposal_id for cluster in shown for proposal_id in cluster)
+    for number, cluster in enumerate(shown, 1):
+        print(f"Группа {number} ({len(cluster)}):")
+        for proposal_id in cluster:
+            proposal = proposals.get(proposal_id)
+            if proposal:
+                print(f"  #{proposal_id:<8} {proposal.status.value:<12} {proposal.title[:60]}")
+    if len(clusters) > len(shown):
+        print(f"... и еще {len(clusters) - len(shown)} групп")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обслуживание базы предложений")
+    parser.add_argument("--db", default="proposals.db", help="путь к файлу базы данных")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = commands.add_parser("check-stats", help="проверить сводную статистику")
+    stats_parser.add_argument("--repair", action="store_true", help="пересобрать при расхождении")
+    stats_parser.set_defaults(handler=check_stats)
+
+    import_parser = commands.add_parser("import", help="импортировать предложения из CSV/JSONL")
+    import_parser.add_argument("path", help="файл с предложениями")
+    import_parser.add_argument("--format", choices=FORMATS, help="формат (по умолчанию - по расширению)")
+    import_parser.add_argument("--batch-size", type=int, default=10000, help="строк в одной пачке executemany")
+    import_parser.add_argument("--strict", action="store_true", help="прервать импорт на первой ошибке")
+    import_parser.add_argument("--defer-indexes", action="store_true",
+                               help="перестроить поиск и статистику один раз в конце (для больших файлов)")
+    import_parser.set_defaults(handler=import_file)
+
+    export_parser = commands.add_parser("export", help="выгрузить предложения в CSV/JSONL")
+    export_parser.add_argument("path", help="файл для выгрузки")
+    export_parser.add_argument("--format", choices=FORMATS, help="формат (по умолчанию - по расширению)")
+    export_parser.add_argument("--batch-size", type=int, default=10000, help="строк, читаемых за один запрос")
+    export_parser.set_defaults(handler=export_file)
+
+    pdf_parser = commands.add_parser("export-pdf", help="выгрузить карточки предложений в PDF")
+    pdf_parser.add_argument("directory", help="каталог для PDF-файлов")
+    pdf_parser.add_argument("--bundle", help="также собрать все карточки в один PDF с закладками")
+    pdf_parser.add_argument("--workers", type=int, help="число процессов (по умолчанию - по числу ядер)")
+    pdf_parser.add_argument("--force", action="store_true", help="перегенерировать и неизмененные карточки")
+    pdf_parser.set_defaults(handler=export_pdf)
+
+    as_of_parser = commands.add_parser("stats-as-of", help="статистика на заданную дату по журналу изменений")
+    as_of_parser.add_argument("moment", type=parse_moment, help="ГГГГ-ММ-ДД или 'ГГГГ-ММ-ДД ЧЧ:ММ:СС'")
+    as_of_parser.set_defaults(handler=stats_as_of)
+
+    compact_parser = commands.add_parser("compact-history", help="сжать журнал изменений старше даты")
+    compact_parser.add_argument("--before", type=parse_moment, required=True,
+                                help="граница хранения: состояние на эту дату и позже восстанавливается точно")
+    compact_parser.add_argument("--full", action="store_true",
+                                help="не сохранять переходы статусов (сроки переходов до границы будут потеряны)")
+    compact_parser.set_defaults(handler=compact_history)
+
+    migrate_parser = commands.add_parser("migrate", help="обновить схему базы и показать размер и планы запросов")
+    migrate_parser.add_argument("--vacuum", action="store_true", help="после миграции вернуть свободное место (VACUUM)")
+    migrate_parser.set_defaults(handler=migrate_database)
+
+    rank_parser = commands.add_parser("rank", help="рейтинг предложений по взвешенной оценке")
+    rank_parser.add_argument("--top", type=int, default=20, help="сколько лучших предложений показать")
+    rank_parser.add_argument("--weight", type=parse_weight, action="append",
+                             help="вес показателя, например cost=0.4 (можно указать несколько раз)")
+    rank_parser.add_argument("--all-statuses", action="store_true",
+                             help="учитывать также отклоненные и завершенные предложения")
+    rank_parser.add_argument("--explain", type=int, action="append", metavar="ID",
+                             help="показать вклад показателей в оценку предложения")
+    rank_parser.set_defaults(handler=rank_proposals)
+
+    duplicates_parser = commands.add_parser("duplicates", help="найти группы повторяющихся предложений")
+    duplicates_parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD,
+                                   help="минимальное сходство текстов (0..1)")
+    duplicates_parser.add_argument("--limit", type=int, default=20, help="сколько групп показать")
+    duplicates_parser.set_defaults(handler=duplicate_clusters)
+
+    args = parser.parse_args(argv)
+    if args.handler is migrate_database:
+        # Отчет "до миграции" снимается с базы, которую еще не открывал Database
+        return migrate_database(args)
+    db = Database(args.db)
+    return args.handler(db, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""Версионные миграции схемы базы предложений.
+
+Номер версии схемы хранится в PRAGMA user_version. Недостающие миграции
+применяются по порядку при открытии базы (Database.init_database); команда
+`python maintenance.py migrate` дополнительно показывает размер базы и планы
+основных запросов до и после миграции.
+
+Миграция, которой нужно перестроить большую таблицу, делает это без долгой
+блокировки: строки копируются в новую таблицу короткими транзакциями, а
+изменения, сделанные за это время другими подключениями, переносят триггеры.
+Запись блокируется только на переключение таблиц в конце.
+"""
+import os
+import sqlite3
+import time
+from models import Status, CATEGORY_CODES, STATUS_CODES
+
+# Сколько строк копировать в одной транзакции при перестройке таблицы
+BATCH_SIZE = 50000
+
+
+def encode_sql(expression, codes):
+    """SQL-выражение: код перечисления по хранимому значению (NULL для неизвестного)"""
+    cases = ' '.join(f"WHEN '{member.value}' THEN {code}" for member, code in codes.items())
+    return f"CASE {expression} {cases} END"
+
+
+def decode_sql(expression, codes):
+    """SQL-выражение: значение перечисления по коду"""
+    cases = ' '.join(f"WHEN {code} THEN '{member.value}'" for member, code in codes.items())
+    return f"CASE {expression} {cases} END"
+
+
+def epoch_sql(expression):
+    """SQL-выражение: секунды от 1970-01-01 для даты 'ГГГГ-ММ-ДД ЧЧ:ММ:СС'.
+
+    Дата, как и раньше, считается местной и без часового пояса: обратное
+    преобразование (strftime с 'unixepoch') дает исходную строку.
+    """
+    return f"CAST(strftime('%s', {expression}) AS INTEGER)"
+
+
+def create_proposals(db, cursor):
+    """Версия 1: исходная таблица с текстовыми категорией, статусом и датой"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS proposals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            category TEXT NOT NULL,
+            status TEXT NOT NULL,
+            author TEXT NOT NULL,
+            department TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            created_date TEXT NOT NULL,
+            expected_benefit TEXT,
+            estimated_cost REAL,
+            implementation_time TEXT,
+            risks TEXT
+        )
+    ''')
+
+
+# Версия 2: категория и статус хранятся кодами, дата создания - секундами (created_at).
+# Прежние столбцы category, status и created_date остаются виртуальными вычисляемыми
+# столбцами: места в таблице они не занимают, а запросы на чтение работают без изменений.
+RECODED_TABLE = f'''
+    CREATE TABLE IF NOT EXISTS proposals_recoded (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT NOT NULL,
+        category_code INTEGER NOT NULL,
+        status_code INTEGER NOT NULL,
+        author TEXT NOT NULL,
+        department TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        created_at INTEGER NOT NULL,
+        expected_benefit TEXT,
+        estimated_cost REAL,
+        implementation_time TEXT,
+        risks TEXT,
+        category TEXT GENERATED ALWAYS AS ({decode_sql('category_code', CATEGORY_CODES)}) VIRTUAL,
+        status TEXT GENERATED ALWAYS AS ({decode_sql('status_code', STATUS_CODES)}) VIRTUAL,
+        created_date TEXT GENERATED ALWAYS AS (strftime('%Y-%m-%d %H:%M:%S', created_at, 'unixepoch')) VIRTUAL
+    )
+'''
+
+RECODED_COLUMNS = (
+    'id, title, description, category_code, status_code, author, department, priority, '
+    'created_at, expected_benefit, estimated_cost, implementation_time, risks'
+)
+
+
+def _recoded_values(row=''):
+    """Значения строки старой таблицы (row - 'new.' в триггере) в порядке RECODED_COLUMNS"""
+    return (
+        f"{row}id, {row}title, {row}description, "
+        f"{encode_sql(row + 'category', CATEGORY_CODES)}, {encode_sql(row + 'status', STATUS_CODES)}, "
+        f"{row}author, {row}department, {row}priority, {epoch_sql(row + 'created_date')}, "
+        f"{row}expected_benefit, {row}estimated_cost, {row}implementation_time, {row}risks"
+    )
+
+
+# Пока идет копирование, изменения старой таблицы повторяются в новой
+RECODE_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposals_recode_insert AFTER INSERT ON proposals BEGIN
+        INSERT OR REPLACE INTO proposals_recoded ({RECODED_COLUMNS}) VALUES ({_recoded_values('new.')});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS proposals_recode_update AFTER UPDATE ON proposals BEGIN
+        INSERT OR REPLACE INTO proposals_recoded ({RECODED_COLUMNS}) VALUES ({_recoded_values('new.')});
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS proposals_recode_delete AFTER DELETE ON proposals BEGIN
+        DELETE FROM proposals_recoded WHERE id = old.id;
+    END
+    ''',
+]
+
+
+def copy_recoded(cursor, batch_size, progress=None):
+    """Копирование proposals в новую таблицу пачками по batch_size строк.
+
+    Каждая пачка - отдельная транзакция, поэтому другие подключения могут писать
+    в базу между пачками. Прерванное копирование при следующем запуске начинается
+    заново (уже скопированные строки перезаписываются).
+    """
+    cursor.execute(f'''
+        SELECT id FROM proposals
+        WHERE {encode_sql('category', CATEGORY_CODES)} IS NULL
+           OR {encode_sql('status', STATUS_CODES)} IS NULL
+           OR {epoch_sql('created_date')} IS NULL
+        LIMIT 10
+    ''')
+    invalid = [str(row[0]) for row in cursor.fetchall()]
+    if invalid:
+        raise ValueError(
+            "Миграция невозможна: у предложений с id " + ', '.join(invalid)
+            + " неизвестная категория, статус или дата создания"
+        )
+
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute(RECODED_TABLE)
+    for statement in RECODE_TRIGGERS:
+        cursor.execute(statement)
+    cursor.execute('COMMIT')
+
+    cursor.execute('SELECT COUNT(*) FROM proposals')
+    total = cursor.fetchone()[0]
+    if total and progress is not None:
+        progress(0, total)
+    copied = 0
+    last_id = 0
+    while True:
+        cursor.execute('BEGIN IMMEDIATE')
+        # Граница пачки - id строки номер batch_size после last_id (None - строки кончаются)
+        cursor.execute('SELECT id FROM proposals WHERE id > ? ORDER BY id LIMIT 1 OFFSET ?', (last_id, batch_size - 1))
+        row = cursor.fetchone()
+        condition, params = ('id > ? AND id <= ?', (last_id, row[0])) if row else ('id > ?', (last_id,))
+        cursor.execute(
+            f'INSERT OR REPLACE INTO proposals_recoded ({RECODED_COLUMNS}) '
+            f'SELECT {_recoded_values()} FROM proposals WHERE {condition}',
+            params
+        )
+        copied += cursor.rowcount
+        cursor.execute('COMMIT')
+        if progress is not None:
+            progress(copied, total)
+        if row is None:
+            break
+        last_id = row[0]
+
+
+def switch_to_recoded(db, cursor):
+    """Замена старой таблицы скопированной.
+
+    Вместе со старой таблицей удаляются ее триггеры (включая триггеры копирования);
+    триггеры поиска, статистики, журнала и версии данных создаются заново для новой.
+    Счетчик AUTOINCREMENT переносится, чтобы id удаленных предложений не повторялись.
+    """
+    cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name IN ('proposals', 'proposals_recoded')")
+    sequence = cursor.fetchone()[0]
+    cursor.execute('DROP TABLE proposals')
+    cursor.execute('ALTER TABLE proposals_recoded RENAME TO proposals')
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'proposals'")
+    cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('proposals', ?)", (sequence,))
+    db.init_schema(cursor)
+
+
+def add_proposal_indexes(db, cursor):
+    """Версия 3: индексы под порядок списка (приоритет, дата по убыванию, id) -
+    общий и с фильтром по статусу или категории"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_proposals_order ON proposals (priority, created_at DESC, id)')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_proposals_status ON proposals (status_code, priority, created_at DESC, id)'
+    )
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_proposals_category ON proposals (category_code, priority, created_at DESC, id)'
+    )
+
+
+def add_row_versions(db, cursor):
+    """Версия 4: номер версии строки для обновления с проверкой (Database.update_proposal).
+    Столбец со значением по умолчанию добавляется без перезаписи таблицы."""
+    cursor.execute('ALTER TABLE proposals ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+
+
+def rebuild_search_index(db, cursor):
+    """Версия 5: префиксные индексы поиска до 6 букв. Основы слов обычно длиннее 4 букв,
+    и без такого индекса запрос по основе собирает списки всех слов с этим началом
+    целиком, даже если нужна только первая страница"""
+    cursor.execute('DROP TABLE IF EXISTS proposals_fts')
+    db.init_search(cursor)
+
+
+# (версия, описание, перенос данных отдельными транзакциями или None, изменение схемы).
+# Изменение схемы и новый номер версии записываются в одной транзакции.
+MIGRATIONS = [
+    (1, "таблица предложений", None, create_proposals),
+    (2, "коды категорий и статусов, дата создания в секундах", copy_recoded, switch_to_recoded),
+    (3, "индексы списка и фильтров", None, add_proposal_indexes),
+    (4, "версии строк предложений", None, add_row_versions),
+    (5, "префиксные индексы поиска", None, rebuild_search_index),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(cursor):
+    cursor.execute('PRAGMA user_version')
+    return cursor.fetchone()[0]
+
+
+def migrate(db, batch_size=BATCH_SIZE, progress=None):
+    """Применение недостающих миграций к базе db.db_name.
+
+    progress(скопировано, всего) вызывается при перестройке таблиц: с нулем перед
+    копированием и после каждой пачки.
+    Возвращает список примененных версий.
+    """
+    conn = sqlite3.connect(db.db_name)
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    applied = []
+    try:
+        version = get_schema_version(cursor)
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"База создана более новой версией программы (схема {version}, поддерживается {SCHEMA_VERSION})"
+            )
+        for number, description, backfill, apply in MIGRATIONS:
+            if number <= version:
+                continue
+            if backfill is not None:
+                backfill(cursor, batch_size, progress)
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                apply(db, cursor)
+                cursor.execute(f'PRAGMA user_version = {number}')
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+            applied.append(number)
+    finally:
+        conn.close()
+    return applied
+
+
+def storage_usage(db_name):
+    """Размер базы: словарь с версией схемы, размером файла, числом свободных страниц
+    и списком (объект, байт) по убыванию размера (если SQLite собран с dbstat)"""
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    usage = {'version': get_schema_version(cursor), 'file_bytes': os.path.getsize(db_name)}
+    cursor.execute('PRAGMA page_size')
+    page_size = cursor.fetchone()[0]
+    cursor.execute('PRAGMA freelist_count')
+    usage['free_bytes'] = cursor.fetchone()[0] * page_size
+    try:
+        cursor.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC')
+        usage['objects'] = cursor.fetchall()
+    except sqlite3.OperationalError:
+        usage['objects'] = []
+    conn.close()
+    return usage
+
+
+def _report_queries(cursor):
+    """Основные запросы списка предложений в виде, в котором их выполняет программа
+    на текущей схеме: (название, SQL, параметры). В новой базе без таблицы
+    предложений запросов нет."""
+    cursor.execute('PRAGMA table_info(proposals)')
+    columns = [row[1] for row in cursor.fetchall()]
+    if not columns:
+        return []
+    recoded = 'status_code' in columns
+    if recoded:
+        status = ('status_code', STATUS_CODES[Status.NEW])
+        created, created_key = 'created_at', epoch_sql('?')
+        trend = "strftime('%Y-%m', created_at, 'unixepoch')"
+    else:
+        status = ('status', Status.NEW.value)
+        created, created_key = 'created_date', '?'
+        trend = "strftime('%Y-%m', created_date)"
+    order = f'priority, {created} DESC, id'
+
+    # Ключ строки из середины списка - для запроса страницы по ключу (keyset)
+    cursor.execute('SELECT COUNT(*) FROM proposals')
+    cursor.execute(
+        f'SELECT priority, created_date, id FROM proposals ORDER BY {order} LIMIT 1 OFFSET ?',
+        (cursor.fetchone()[0] // 2,)
+    )
+    key = cursor.fetchone() or (1, '1970-01-01 00:00:00', 0)
+    after = (
+        f'priority >= ? AND (priority > ? OR {created} < {created_key} '
+        f'OR ({created} = {created_key} AND id > ?))'
+    )
+    return [
+        ("Первая страница списка", f'SELECT * FROM proposals ORDER BY {order} LIMIT 200', ()),
+        ("Страница из середины списка", f'SELECT * FROM proposals WHERE {after} ORDER BY {order} LIMIT 200',
+         (key[0], key[0], key[1], key[1], key[2])),
+        ("Фильтр по статусу: количество", f'SELECT COUNT(*) FROM proposals WHERE {status[0]} = ?', (status[1],)),
+        ("Фильтр по статусу: первая страница",
+         f'SELECT * FROM proposals WHERE {status[0]} = ? ORDER BY {order} LIMIT 200', (status[1],)),
+        ("Динамика по месяцам", f'SELECT {trend} AS bucket, COUNT(*) FROM proposals GROUP BY bucket', ()),
+    ]
+
+
+def query_plans(db_name):
+    """Планы и время выполнения основных запросов: список (название, секунды, [шаги плана])"""
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    result = []
+    for title, sql, params in _report_queries(cursor):
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        plan = [row[3] for row in cursor.fetchall()]
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        result.append((title, time.perf_counter() - started, plan))
+    conn.close()
+    return result
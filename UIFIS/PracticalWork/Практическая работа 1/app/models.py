@@ -1,6 +1,6 @@
-from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
+from sys import intern
 
 class Category(Enum):
     """Категории предложений"""
@@ -19,26 +19,138 @@ class Status(Enum):
     REJECTED = "Отклонено"
     COMPLETED = "Завершено"
 
-@dataclass
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Таблицы поиска перечислений по хранимому значению (быстрее, чем вызов Category(value))
+CATEGORY_BY_VALUE = {category.value: category for category in Category}
+STATUS_BY_VALUE = {status.value: status for status in Status}
+
+# Коды перечислений в таблице proposals. Коды уже записаны в базы, поэтому
+# существующие значения менять нельзя - новые элементы получают новые коды
+CATEGORY_CODES = {
+    Category.FUNCTIONALITY: 1,
+    Category.PERFORMANCE: 2,
+    Category.SECURITY: 3,
+    Category.INTEGRATION: 4,
+    Category.UI_UX: 5,
+    Category.OTHER: 6,
+}
+STATUS_CODES = {
+    Status.NEW: 1,
+    Status.IN_PROGRESS: 2,
+    Status.APPROVED: 3,
+    Status.REJECTED: 4,
+    Status.COMPLETED: 5,
+}
+
+PROPOSAL_FIELDS = (
+    'id', 'title', 'description', 'category', 'status', 'author', 'department', 'priority',
+    'created_date', 'expected_benefit', 'estimated_cost', 'implementation_time', 'risks'
+)
+
 class Proposal:
-    """Модель предложения"""
-    id: int = None
-    title: str = ""
-    description: str = ""
-    category: Category = Category.OTHER
-    status: Status = Status.NEW
-    author: str = ""
-    department: str = ""
-    priority: int = 3  # 1-высокий, 2-средний, 3-низкий
-    created_date: datetime = None
-    expected_benefit: str = ""
-    estimated_cost: float = 0.0
-    implementation_time: str = ""
-    risks: str = ""
+    """Модель предложения.
+    
+    Экземпляры без __dict__ (__slots__). Категория, статус и дата создания
+    хранятся в том виде, в каком пришли (строки из БД или готовые объекты),
+    и преобразуются при первом обращении.
+    version - номер версии строки в БД (None у несохраненного предложения);
+    по нему update_proposal обнаруживает чужие изменения.
+    """
+    __slots__ = (
+        'id', 'title', 'description', '_category', '_status', 'author', 'department', 'priority',
+        '_created_date', 'expected_benefit', 'estimated_cost', 'implementation_time', 'risks', 'version'
+    )
+    
+    def __init__(self, id=None, title="", description="", category=Category.OTHER,
+                 status=Status.NEW, author="", department="", priority=3,  # 1-высокий, 2-средний, 3-низкий
+                 created_date=None, expected_benefit="", estimated_cost=0.0,
+                 implementation_time="", risks="", version=None):
+        self.id = id
+        self.title = title
+        self.description = description
+        self._category = category
+        self._status = status
+        self.author = author
+        self.department = department
+        self.priority = priority
+        self._created_date = created_date if created_date is not None else datetime.now()
+        self.expected_benefit = expected_benefit
+        self.estimated_cost = estimated_cost
+        self.implementation_time = implementation_time
+        self.risks = risks
+        self.version = version
+    
+    @classmethod
+    def from_row(cls, cursor, row):
+        """Фабрика строк sqlite3: столбцы выбираются в порядке PROPOSAL_FIELDS, затем version.
+        
+        Строки категории и статуса сразу заменяются общими объектами перечислений
+        (поиск в словаре дешевле, чем хранить в каждом объекте свою копию строки).
+        Неизвестные значения остаются строками и дадут ошибку при обращении.
+        Часто повторяющиеся значения (автор, отдел, срок) интернируются.
+        """
+        (id, title, description, category, status, author, department, priority,
+         created_date, expected_benefit, estimated_cost, implementation_time, risks, version) = row
+        return cls(
+            id, title, description, CATEGORY_BY_VALUE.get(category, category),
+            STATUS_BY_VALUE.get(status, status), author and intern(author),
+            department and intern(department), priority, created_date, expected_benefit,
+            estimated_cost, implementation_time and intern(implementation_time), risks, version
+        )
+    
+    @property
+    def category(self):
+        category = self._category
+        if category.__class__ is str:
+            category = self._category = CATEGORY_BY_VALUE.get(category) or Category(category)
+        return category
+    
+    @category.setter
+    def category(self, value):
+        self._category = value
+    
+    @property
+    def status(self):
+        status = self._status
+        if status.__class__ is str:
+            status = self._status = STATUS_BY_VALUE.get(status) or Status(status)
+        return status
+    
+    @status.setter
+    def status(self, value):
+        self._status = value
+    
+    @property
+    def created_date(self):
+        created_date = self._created_date
+        if created_date.__class__ is str:
+            # fromisoformat разбирает формат DATE_FORMAT гораздо быстрее strptime
+            created_date = self._created_date = datetime.fromisoformat(created_date)
+        return created_date
+    
+    @created_date.setter
+    def created_date(self, value):
+        self._created_date = value
+    
+    @property
+    def created_date_text(self):
+        """Дата создания в формате хранения БД (без разбора, если она еще строка)"""
+        created_date = self._created_date
+        if created_date.__class__ is str:
+            return created_date
+        return created_date.strftime(DATE_FORMAT)
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in PROPOSAL_FIELDS)
+    
+    __hash__ = None
     
-    def __post_init__(self):
-        if self.created_date is None:
-            self.created_date = datetime.now()
+    def __repr__(self):
+        fields = ', '.join(f"{field}={getattr(self, field)!r}" for field in PROPOSAL_FIELDS)
+        return f"Proposal({fields})"
     
     def to_dict(self):
         """Преобразование в словарь"""
@@ -51,28 +163,30 @@ class Proposal:
             'author': self.author,
             'department': self.department,
             'priority': self.priority,
-            'created_date': self.created_date.strftime('%Y-%m-%d %H:%M:%S'),
+            'created_date': self.created_date_text,
             'expected_benefit': self.expected_benefit,
             'estimated_cost': self.estimated_cost,
             'implementation_time': self.implementation_time,
-            'risks': self.risks
+            'risks': self.risks,
+            'version': self.version
         }
     
     @classmethod
     def from_dict(cls, data):
-        """Создание из словаря"""
+        """Создание из словаря (категория, статус и дата преобразуются при обращении)"""
         return cls(
             id=data['id'],
             title=data['title'],
             description=data['description'],
-            category=Category(data['category']),
-            status=Status(data['status']),
+            category=data['category'],
+            status=data['status'],
             author=data['author'],
             department=data['department'],
             priority=data['priority'],
-            created_date=datetime.strptime(data['created_date'], '%Y-%m-%d %H:%M:%S'),
+            created_date=data['created_date'],
             expected_benefit=data['expected_benefit'],
             estimated_cost=data['estimated_cost'],
             implementation_time=data['implementation_time'],
-            risks=data['risks']
-        )
\ No newline at end of file
+            risks=data['risks'],
+            version=data.get('version')
+        )
@@ -0,0 +1,134 @@
+"""Кэш готовых отчетов.
+
+Отчет определяется типом, форматом, версией данных базы и версией шаблона.
+Если с прошлого раза ничего из этого не изменилось, возвращается уже
+сформированный файл. Старые файлы удаляются по давности использования (LRU),
+когда их становится больше max_entries или они занимают больше max_bytes.
+
+Кэшем одновременно пользуются окно программы, процессы фоновых отчетов и
+HTTP-сервис, поэтому индекс хранится в SQLite-файле рядом с отчетами: каждое
+чтение с изменением выполняется одной транзакцией записи (BEGIN IMMEDIATE),
+и параллельные процессы не теряют записи друг друга.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from database import BUSY_TIMEOUT
+
+INDEX_NAME = 'cache_index.db'
+# Индекс прежнего формата; его записи переносятся в SQLite при первом открытии
+LEGACY_INDEX_NAME = 'cache_index.json'
+
+# Отчет, использованный за последние столько секунд, не удаляется при очистке:
+# его файл, возможно, как раз отдается клиенту
+EVICT_GRACE_SECONDS = 300
+
+INDEX_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS reports (
+        key TEXT PRIMARY KEY,
+        file TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        used REAL NOT NULL
+    )
+'''
+
+
+def report_key(report_type, format_type, data_version, template_version):
+    """Ключ кэша: хэш от всех параметров, влияющих на содержимое отчета"""
+    data = json.dumps([report_type, format_type, list(data_version), template_version])
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    """Индекс сформированных отчетов в каталоге directory.
+
+    Удаляются только файлы, которые были добавлены в кэш.
+    """
+
+    def __init__(self, directory, max_entries=20, max_bytes=200 * 2**20):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self._transaction(self._import_legacy_index)
+
+    def _transaction(self, work):
+        """Выполнение work(cursor) в одной транзакции записи индекса"""
+        conn = sqlite3.connect(self.index_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                result = work(cursor)
+                cursor.execute('COMMIT')
+                return result
+            finally:
+                if conn.in_transaction:
+                    cursor.execute('ROLLBACK')
+        finally:
+            conn.close()
+
+    def _import_legacy_index(self, cursor):
+        cursor.execute(INDEX_SCHEMA)
+        legacy_path = os.path.join(self.directory, LEGACY_INDEX_NAME)
+        try:
+            with open(legacy_path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        cursor.executemany(
+            'INSERT OR IGNORE INTO reports (key, file, size, used) VALUES (?, ?, ?, ?)',
+            [(key, entry['file'], entry['size'], entry['used']) for key, entry in entries.items()]
+        )
+        os.remove(legacy_path)
+
+    def get(self, key):
+        """Путь к готовому отчету или None; отметка использования обновляется"""
+        def work(cursor):
+            row = cursor.execute('SELECT file FROM reports WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            path = os.path.join(self.directory, row[0])
+            if not os.path.exists(path):
+                # Файл удалили вручную - запись больше не действительна
+                cursor.execute('DELETE FROM reports WHERE key = ?', (key,))
+                return None
+            cursor.execute('UPDATE reports SET used = ? WHERE key = ?', (time.time(), key))
+            return path
+
+        return self._transaction(work)
+
+    def put(self, key, path):
+        """Добавление сформированного отчета в кэш с последующей очисткой"""
+        def work(cursor):
+            cursor.execute(
+                'INSERT OR REPLACE INTO reports (key, file, size, used) VALUES (?, ?, ?, ?)',
+                (key, os.path.basename(path), os.path.getsize(path), time.time())
+            )
+            self._evict(cursor, keep=key)
+
+        self._transaction(work)
+
+    def _evict(self, cursor, keep=None):
+        """Удаление давно не использованных отчетов сверх ограничений"""
+        entries = cursor.execute('SELECT key, file, size, used FROM reports ORDER BY used').fetchall()
+        count = len(entries)
+        total = sum(entry[2] for entry in entries)
+        recent = time.time() - EVICT_GRACE_SECONDS
+        for key, file, size, used in entries:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            if key == keep or used > recent:
+                continue
+            path = os.path.join(self.directory, file)
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                # Файл открыт другим процессом (в Windows его нельзя удалить) - удалим в следующий раз
+                continue
+            count -= 1
+            total -= size
+            cursor.execute('DELETE FROM reports WHERE key = ?', (key,))
@@ -1,5 +1,6 @@
 from datetime import datetime
 import os
+from functools import lru_cache
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -7,98 +8,216 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
+from reportlab.graphics.shapes import Drawing
+from reportlab.graphics.charts.barcharts import VerticalBarChart
 from models import Status, Category
+from report_cache import ReportCache, report_key
+from report_writers import create_writer
 
-class ReportGenerator:
-    def __init__(self, database):
-        self.db = database
-        self.reports_dir = "reports"
-        os.makedirs(self.reports_dir, exist_ok=True)
-        
-        # Регистрируем шрифты с поддержкой кириллицы
-        self._register_fonts()
+# Версия шаблона карточки предложения: при изменении верстки generate_proposal_pdf
+# ее нужно увеличить, чтобы пакетный экспорт перегенерировал все файлы
+PROPOSAL_TEMPLATE_VERSION = 1
+# Версия шаблонов сводных отчетов: при изменении их верстки ее нужно увеличить,
+# иначе кэш будет возвращать отчеты, сформированные по старому шаблону
+REPORT_TEMPLATE_VERSION = 1
+
+# Шрифты и стили общие для всех экземпляров ReportGenerator в процессе:
+# TTF-файлы разбираются один раз, а стили абзацев создаются при первом запросе
+_default_font = None
+_style_cache = {}
+
+
+def register_fonts():
+    """Однократная (на процесс) регистрация шрифтов с поддержкой кириллицы.
     
-    def _register_fonts(self):
-        """Регистрация шрифтов с поддержкой кириллицы"""
-        try:
-            # Сначала попробуем зарегистрировать Arial с разными вариантами
-            fonts_registered = False
-            
-            # Проверяем локальную папку fonts
-            fonts_dir = "fonts"
-            if os.path.exists(fonts_dir):
-                arial_path = os.path.join(fonts_dir, "arial.ttf")
-                arialbd_path = os.path.join(fonts_dir, "arialbd.ttf")
-                
-                if os.path.exists(arial_path):
-                    pdfmetrics.registerFont(TTFont('Arial', arial_path))
-                    if os.path.exists(arialbd_path):
-                        pdfmetrics.registerFont(TTFont('Arial-Bold', arialbd_path))
-                    else:
-                        # Если нет жирного, используем обычный для обоих
-                        pdfmetrics.registerFont(TTFont('Arial-Bold', arial_path))
-                    self.default_font = 'Arial'
-                    fonts_registered = True
-                    print("Шрифты зарегистрированы из локальной папки 'fonts'")
-            
-            # Стандартные пути Windows
-            if not fonts_registered:
-                windows_paths = [
-                    "C:/Windows/Fonts/arial.ttf",
-                    "C:/Windows/Fonts/arialbd.ttf",
-                    "C:/Windows/Fonts/times.ttf",
-                    "C:/Windows/Fonts/timesbd.ttf"
-                ]
-                
-                for font_path in windows_paths:
-                    if os.path.exists(font_path):
-                        pdfmetrics.registerFont(TTFont('Arial', font_path))
-                        # Для жирного используем тот же файл если нет отдельного
-                        pdfmetrics.registerFont(TTFont('Arial-Bold', font_path))
-                        self.default_font = 'Arial'
-                        fonts_registered = True
-                        print("Шрифты зарегистрированы из системной папки Windows")
-                        break
+    Возвращает имя шрифта по умолчанию.
+    """
+    global _default_font
+    if _default_font is None:
+        _default_font = _find_and_register_fonts()
+    return _default_font
+
+
+def _find_and_register_fonts():
+    """Поиск и регистрация шрифтов с поддержкой кириллицы"""
+    try:
+        # Сначала попробуем зарегистрировать Arial с разными вариантами
+        fonts_registered = False
+        
+        # Проверяем локальную папку fonts
+        fonts_dir = "fonts"
+        if os.path.exists(fonts_dir):
+            arial_path = os.path.join(fonts_dir, "arial.ttf")
+            arialbd_path = os.path.join(fonts_dir, "arialbd.ttf")
             
-            # Если ничего не нашли, используем Helvetica
-            if not fonts_registered:
-                self.default_font = 'Helvetica'
-                print("Внимание: Используется стандартный шрифт Helvetica (возможны проблемы с кириллицей)")
+            if os.path.exists(arial_path):
+                pdfmetrics.registerFont(TTFont('Arial', arial_path))
+                if os.path.exists(arialbd_path):
+                    pdfmetrics.registerFont(TTFont('Arial-Bold', arialbd_path))
+                else:
+                    # Если нет жирного, используем обычный для обоих
+                    pdfmetrics.registerFont(TTFont('Arial-Bold', arial_path))
+                default_font = 'Arial'
+                fonts_registered = True
+                print("Шрифты зарегистрированы из локальной папки 'fonts'")
+        
+        # Стандартные пути Windows
+        if not fonts_registered:
+            windows_paths = [
+                "C:/Windows/Fonts/arial.ttf",
+                "C:/Windows/Fonts/arialbd.ttf",
+                "C:/Windows/Fonts/times.ttf",
+                "C:/Windows/Fonts/timesbd.ttf"
+            ]
             
-        except Exception as e:
-            print(f"Ошибка регистрации шрифтов: {e}")
-            self.default_font = 'Helvetica'
+            for font_path in windows_paths:
+                if os.path.exists(font_path):
+                    pdfmetrics.registerFont(TTFont('Arial', font_path))
+                    # Для жирного используем тот же файл если нет отдельного
+                    pdfmetrics.registerFont(TTFont('Arial-Bold', font_path))
+                    default_font = 'Arial'
+                    fonts_registered = True
+                    print("Шрифты зарегистрированы из системной папки Windows")
+                    break
+        
+        # Если ничего не нашли, используем Helvetica
+        if not fonts_registered:
+            default_font = 'Helvetica'
+            print("Внимание: Используется стандартный шрифт Helvetica (возможны проблемы с кириллицей)")
+        
+    except Exception as e:
+        print(f"Ошибка регистрации шрифтов: {e}")
+        default_font = 'Helvetica'
     
-    def _get_paragraph_style(self, style_name, parent_style, **kwargs):
-        """Создание стиля параграфа с нужным шрифтом"""
+    return default_font
+
+
+@lru_cache(maxsize=None)
+def sample_styles():
+    """Стандартная таблица стилей ReportLab (создается один раз)"""
+    return getSampleStyleSheet()
+
+
+def paragraph_style(style_name, parent_style, **kwargs):
+    """Стиль абзаца с шрифтом по умолчанию; одинаковые запросы возвращают один объект"""
+    default_font = register_fonts()
+    key = (style_name, id(parent_style), default_font, tuple(sorted(kwargs.items())))
+    style = _style_cache.get(key)
+    if style is None:
         # Для жирного шрифта используем правильное имя
-        font_name = kwargs.get('fontName', self.default_font)
+        font_name = kwargs.get('fontName', default_font)
         if 'bold' in style_name.lower() or ('fontName' in kwargs and 'bold' in kwargs['fontName'].lower()):
-            font_name = f"{self.default_font}-Bold"
+            font_name = f"{default_font}-Bold"
         
-        style = ParagraphStyle(
+        style = _style_cache[key] = ParagraphStyle(
             style_name,
             parent=parent_style,
             fontName=font_name,
             **{k: v for k, v in kwargs.items() if k != 'fontName'}
         )
-        return style
+    return style
+
+
+class StreamingStory(list):
+    """Список flowable-объектов для doc.build, который дочитывает элементы
+    из генератора по мере верстки.
+    
+    ReportLab обрабатывает story с начала и удаляет сверстанные элементы;
+    перед каждым шагом он вызывает len(), и в этот момент список пополняется
+    до LOOKAHEAD элементов. В памяти одновременно находятся лишь несколько
+    фрагментов таблицы.
+    """
+    LOOKAHEAD = 3
+    
+    def __init__(self, items, source):
+        super().__init__(items)
+        self._source = iter(source)
+    
+    def __len__(self):
+        while self._source is not None and list.__len__(self) < self.LOOKAHEAD:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return list.__len__(self)
+
+
+class ReportGenerator:
+    # Как часто (в строках) сообщать о прогрессе обработки
+    PROGRESS_STEP = 500
+    # Строк в одном фрагменте таблицы предложений полного отчета (четное - для чередования фона)
+    TABLE_CHUNK_ROWS = 100
+    
+    def __init__(self, database, progress=None):
+        self.db = database
+        self.reports_dir = "reports"
+        os.makedirs(self.reports_dir, exist_ok=True)
+        
+        # progress(kind, value) вызывается с kind='rows' (обработано строк)
+        # и kind='pages' (сверстано страниц); исключение из него прерывает отчет
+        self.progress = progress
+        self.last_filepath = None
+        self._table_style = None
+        # Готовые отчеты возвращаются из кэша, пока данные в базе не изменились
+        self.use_cache = True
+        
+        # Шрифты с поддержкой кириллицы регистрируются один раз на процесс
+        self.default_font = register_fonts()
+    
+    def _get_paragraph_style(self, style_name, parent_style, **kwargs):
+        """Создание стиля параграфа с нужным шрифтом"""
+        return paragraph_style(style_name, parent_style, **kwargs)
     
     def _get_filepath(self, report_name, format_type):
         """Получение пути к файлу отчета"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         # Убираем русские символы из имени файла для избежания проблем
         safe_name = ''.join(c if c.isalnum() or c in ' _-' else '_' for c in report_name)
-        filename = f"{safe_name}_{timestamp}.{format_type}"
-        return os.path.join(self.reports_dir, filename)
+        filepath = os.path.join(self.reports_dir, f"{safe_name}_{timestamp}.{format_type}")
+        # Отчеты из кэша не должны перезаписываться новым отчетом, сформированным в ту же секунду
+        suffix = 1
+        while os.path.exists(filepath):
+            suffix += 1
+            filepath = os.path.join(self.reports_dir, f"{safe_name}_{timestamp}_{suffix}.{format_type}")
+        self.last_filepath = filepath
+        return self.last_filepath
+    
+    def _cached(self, report_type, format_type, build):
+        """Отчет из кэша по версии данных; при промахе - build() и сохранение в кэш"""
+        if not self.use_cache:
+            return build()
+        
+        cache = ReportCache(self.reports_dir)
+        key = report_key(report_type, format_type, self.db.get_data_version(), REPORT_TEMPLATE_VERSION)
+        filepath = cache.get(key)
+        if filepath is not None:
+            return filepath
+        
+        filepath = build()
+        cache.put(key, filepath)
+        return filepath
+    
+    def _report_progress(self, kind, value):
+        """Передача прогресса подписчику (если он задан)"""
+        if self.progress is not None:
+            self.progress(kind, value)
+    
+    def _on_page(self, canvas, doc):
+        """Обработчик ReportLab, вызываемый при верстке каждой страницы"""
+        self._report_progress('pages', doc.page)
+    
+    def _build(self, doc, story):
+        """Верстка документа с уведомлением о каждой странице"""
+        doc.build(story, onFirstPage=self._on_page, onLaterPages=self._on_page)
     
-    def generate_proposal_pdf(self, proposal):
+    def generate_proposal_pdf(self, proposal, filename=None):
         """Генерация PDF для конкретного предложения"""
-        filename = self._get_filepath(f"proposal_{proposal.id}", "pdf")
+        if filename is None:
+            filename = self._get_filepath(f"proposal_{proposal.id}", "pdf")
         
         doc = SimpleDocTemplate(filename, pagesize=A4)
         story = []
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         
         # Настраиваем стили с русскими шрифтами
         title_style = self._get_paragraph_style(
@@ -173,25 +292,34 @@ class ReportGenerator:
         story.append(Spacer(1, 30))
         story.append(Paragraph(f"Сформировано: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}", normal_style))
         
-        doc.build(story)
+        self._build(doc, story)
         return filename
     
     def generate_full_report(self, format_type='pdf'):
         """Полный отчет по всем предложениям"""
-        proposals = self.db.get_all_proposals()
+        return self._cached('full', format_type, lambda: self._build_full_report(format_type))
+    
+    def _build_full_report(self, format_type):
+        # Предложения читаются из базы порциями по мере верстки, а не списком целиком
+        proposals = self.db.iter_proposals()
         stats = self.db.get_statistics()
         
         if format_type == 'pdf':
             return self._generate_full_pdf_report(proposals, stats, "full_report")
-        else:
+        elif format_type == 'txt':
             return self._generate_full_text_report(proposals, stats, "full_report")
+        else:
+            return self._generate_with_writer(
+                "full_report", format_type, "Полный отчет по предложениям расширения ИС",
+                lambda writer: self._write_full_report(writer, proposals, stats)
+            )
     
     def _generate_full_pdf_report(self, proposals, stats, report_name):
         """Генерация полного PDF отчета"""
         filename = self._get_filepath(report_name, "pdf")
         doc = SimpleDocTemplate(filename, pagesize=A4)
         story = []
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         
         # Создаем стили с русскими шрифтами
         title_style = self._get_paragraph_style(
@@ -295,23 +423,55 @@ class ReportGenerator:
         story.append(Paragraph("СПИСОК ВСЕХ ПРЕДЛОЖЕНИЙ:", heading2_style))
         story.append(Spacer(1, 10))
         
-        if proposals:
-            headers = ["ID", "Название", "Категория", "Статус", "Автор", "Стоимость", "Дата"]
-            data = [headers]
-            
-            for proposal in proposals:
-                data.append([
-                    str(proposal.id),
-                    proposal.title[:30] + "..." if len(proposal.title) > 30 else proposal.title,
-                    proposal.category.value[:20],
-                    proposal.status.value[:15],
-                    proposal.author[:15],
-                    f"{proposal.estimated_cost:,.0f} руб." if proposal.estimated_cost else "-",
-                    proposal.created_date.strftime("%d.%m.%Y")
-                ])
-            
-            table = Table(data, colWidths=[30, 180, 90, 80, 70, 80, 60])
-            table.setStyle(TableStyle([
+        # Таблица верстается фрагментами фиксированного размера с повторяющимся заголовком:
+        # фрагменты создаются по мере чтения из базы и отбрасываются после верстки
+        story = StreamingStory(story, self._full_report_tail(proposals, normal_style))
+        
+        self._build(doc, story)
+        return filename
+    
+    def _full_report_tail(self, proposals, normal_style):
+        """Фрагменты таблицы предложений и подпись полного отчета"""
+        headers = ["ID", "Название", "Категория", "Статус", "Автор", "Стоимость", "Дата"]
+        rows = []
+        count = 0
+        
+        for proposal in proposals:
+            rows.append([
+                str(proposal.id),
+                proposal.title[:30] + "..." if len(proposal.title) > 30 else proposal.title,
+                proposal.category.value[:20],
+                proposal.status.value[:15],
+                proposal.author[:15],
+                f"{proposal.estimated_cost:,.0f} руб." if proposal.estimated_cost else "-",
+                proposal.created_date.strftime("%d.%m.%Y")
+            ])
+            count += 1
+            if len(rows) == self.TABLE_CHUNK_ROWS:
+                yield self._proposals_table(headers, rows)
+                rows = []
+                self._report_progress('rows', count)
+        
+        if rows:
+            yield self._proposals_table(headers, rows)
+        elif not count:
+            yield Paragraph("Нет данных для отображения", normal_style)
+        self._report_progress('rows', count)
+        
+        yield Spacer(1, 20)
+        yield Paragraph(f"Отчет сформирован автоматически системой управления предложениями", 
+                        self._get_paragraph_style('Footer', normal_style, fontSize=8, alignment=1))
+    
+    def _proposals_table(self, headers, rows):
+        """Фрагмент таблицы предложений с собственной строкой заголовка"""
+        table = Table([headers] + rows, colWidths=[30, 180, 90, 80, 70, 80, 60], repeatRows=1)
+        table.setStyle(self._proposals_table_style())
+        return table
+    
+    def _proposals_table_style(self):
+        """Стиль таблицы предложений (один объект на все фрагменты)"""
+        if self._table_style is None:
+            self._table_style = TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                 ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
@@ -326,18 +486,8 @@ class ReportGenerator:
                 ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
                 ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
                 ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-            ]))
-            
-            story.append(table)
-        else:
-            story.append(Paragraph("Нет данных для отображения", normal_style))
-        
-        story.append(Spacer(1, 20))
-        story.append(Paragraph(f"Отчет сформирован автоматически системой управления предложениями", 
-                              self._get_paragraph_style('Footer', normal_style, fontSize=8, alignment=1)))
-        
-        doc.build(story)
-        return filename
+            ])
+        return self._table_style
     
     def _generate_full_text_report(self, proposals, stats, report_name):
         """Генерация полного текстового отчета"""
@@ -376,7 +526,11 @@ class ReportGenerator:
             f.write("СПИСОК ПРЕДЛОЖЕНИЙ:\n")
             f.write("=" * 70 + "\n\n")
             
+            written = 0
             for i, proposal in enumerate(proposals, 1):
+                written = i
+                if i % self.PROGRESS_STEP == 0:
+                    self._report_progress('rows', i)
                 f.write(f"[{i}] ID: {proposal.id}\n")
                 f.write(f"    Название: {proposal.title}\n")
                 f.write(f"    Категория: {proposal.category.value}\n")
@@ -389,27 +543,123 @@ class ReportGenerator:
                     f.write(f"    Ожидаемая польза: {proposal.expected_benefit[:100]}...\n")
                 f.write("-" * 70 + "\n")
             
-            f.write(f"\nВсего записей: {len(proposals)}\n")
+            self._report_progress('rows', written)
+            f.write(f"\nВсего записей: {written}\n")
             f.write(f"Отчет сохранен в: {filename}\n")
         
         return filename
     
+    def _generate_with_writer(self, report_name, format_type, title, define):
+        """Отчет в потоковом формате (CSV, XLSX, HTML): define(writer) описывает содержимое"""
+        filename = self._get_filepath(report_name, format_type)
+        writer = create_writer(format_type, filename)
+        writer.begin(title, f"Дата формирования: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
+        try:
+            define(writer)
+        except BaseException:
+            # Файл закрывается, чтобы недописанный отчет можно было удалить
+            writer.close()
+            raise
+        writer.end()
+        return filename
+    
+    def _count_rows(self, rows):
+        """Передача строк дальше с уведомлением о прогрессе каждые PROGRESS_STEP строк"""
+        count = 0
+        for count, row in enumerate(rows, 1):
+            if count % self.PROGRESS_STEP == 0:
+                self._report_progress('rows', count)
+            yield row
+        self._report_progress('rows', count)
+    
+    def _write_full_report(self, writer, proposals, stats):
+        """Полный отчет: статистика и список всех предложений"""
+        total = stats['total']
+        writer.write_section("Статистика")
+        writer.write_rows(["Показатель", "Значение"], [
+            ["Всего предложений", total],
+            ["Общая стоимость, руб.", stats['total_cost']],
+        ])
+        
+        writer.write_section("Распределение по статусам")
+        writer.write_rows(["Статус", "Количество", "Доля, %"], [
+            [status, count, round(count / total * 100, 1) if total > 0 else 0]
+            for status, count in stats['status_stats'].items()
+        ])
+        
+        writer.write_section("Распределение по категориям")
+        writer.write_rows(["Категория", "Количество"], list(stats['category_stats'].items()))
+        
+        writer.write_section("Распределение по приоритетам")
+        priority_names = {1: "Высокий", 2: "Средний", 3: "Низкий"}
+        writer.write_rows(["Приоритет", "Количество"], [
+            [priority_names.get(priority, f"Неизвестно ({priority})"), count]
+            for priority, count in stats['priority_stats'].items()
+        ])
+        
+        # Список предложений пишется построчно по мере чтения из базы
+        writer.write_section("Список предложений")
+        writer.write_rows(
+            ["ID", "Название", "Категория", "Статус", "Автор", "Отдел", "Приоритет", "Дата",
+             "Стоимость, руб.", "Срок", "Описание", "Ожидаемая польза", "Риски"],
+            self._count_rows(
+                [p.id, p.title, p.category.value, p.status.value, p.author, p.department, p.priority,
+                 p.created_date_text, p.estimated_cost, p.implementation_time, p.description,
+                 p.expected_benefit, p.risks]
+                for p in proposals
+            )
+        )
+    
+    def _write_status_report(self, writer, stats):
+        """Отчет по статусам: количество, доля и сумма затрат"""
+        total = stats['total']
+        rows = []
+        total_cost = 0
+        for status in Status:
+            count = stats['status_stats'].get(status.value, 0)
+            status_cost = stats['cost_by_status'].get(status.value, 0)
+            total_cost += status_cost
+            rows.append([status.value, count, round(count / total * 100, 1) if total > 0 else 0, status_cost])
+        rows.append(["ВСЕГО:", total, 100.0, total_cost])
+        
+        writer.write_section("Общая статистика по статусам")
+        writer.write_rows(["Статус", "Количество", "Доля, %", "Сумма затрат, руб."], rows)
+    
+    def _write_financial_report(self, writer, summary):
+        """Финансовая сводка"""
+        writer.write_section("Финансовая сводка")
+        writer.write_rows(["Показатель", "Значение"], [
+            ["Общая стоимость всех предложений, руб.", summary['total_cost']],
+            ["Средняя стоимость предложения, руб.", summary['avg_cost']],
+            ["Максимальная стоимость, руб.", summary['max_cost']],
+            ["Минимальная стоимость, руб.", summary['min_cost']],
+            ["Количество предложений", summary['count']],
+        ])
+    
     def generate_status_report(self, format_type='pdf'):
         """Отчет по статусам с детализацией"""
-        proposals = self.db.get_all_proposals()
+        return self._cached('status', format_type, lambda: self._build_status_report(format_type))
+    
+    def _build_status_report(self, format_type):
+        # Количество и стоимость по статусам берутся из сводной таблицы статистики
         stats = self.db.get_statistics()
         
         if format_type == 'pdf':
-            return self._generate_status_pdf_report(proposals, stats, "status_report")
+            return self._generate_status_pdf_report(stats, "status_report")
+        elif format_type == 'txt':
+            return self._generate_status_text_report(stats, "status_report")
         else:
-            return self._generate_status_text_report(proposals, stats, "status_report")
+            return self._generate_with_writer(
+                "status_report", format_type, "Отчет по статусам предложений расширения ИС",
+                lambda writer: self._write_status_report(writer, stats)
+            )
     
-    def _generate_status_pdf_report(self, proposals, stats, report_name):
+    def _generate_status_pdf_report(self, stats, report_name):
         """PDF отчет по статусам"""
         filename = self._get_filepath(report_name, "pdf")
         doc = SimpleDocTemplate(filename, pagesize=A4)
         story = []
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         
         # Создаем стили
         title_style = self._get_paragraph_style(
@@ -438,14 +688,6 @@ class ReportGenerator:
         story.append(Paragraph(f"Дата формирования: {datetime.now().strftime('%d.%m.%Y %H:%M')}", normal_style))
         story.append(Spacer(1, 20))
         
-        # Группировка по статусам
-        proposals_by_status = {}
-        for proposal in proposals:
-            status = proposal.status.value
-            if status not in proposals_by_status:
-                proposals_by_status[status] = []
-            proposals_by_status[status].append(proposal)
-        
         # Общая статистика
         story.append(Paragraph("ОБЩАЯ СТАТИСТИКА:", heading2_style))
         
@@ -458,12 +700,7 @@ class ReportGenerator:
             count = stats['status_stats'].get(status_value, 0)
             percentage = (count / total * 100) if total > 0 else 0
             
-            # Подсчет стоимости для этого статуса
-            status_cost = 0
-            if status_value in proposals_by_status:
-                for proposal in proposals_by_status[status_value]:
-                    status_cost += proposal.estimated_cost
-            
+            status_cost = stats['cost_by_status'].get(status_value, 0)
             total_cost += status_cost
             
             status_data.append([
@@ -489,10 +726,10 @@ class ReportGenerator:
         story.append(table)
         story.append(Spacer(1, 20))
         
-        doc.build(story)
+        self._build(doc, story)
         return filename
     
-    def _generate_status_text_report(self, proposals, stats, report_name):
+    def _generate_status_text_report(self, stats, report_name):
         """Текстовый отчет по статусам"""
         filename = self._get_filepath(report_name, "txt")
         
@@ -515,7 +752,7 @@ class ReportGenerator:
                 count = stats['status_stats'].get(status_value, 0)
                 percentage = (count / total * 100) if total > 0 else 0
                 
-                status_cost = sum(p.estimated_cost for p in proposals if p.status.value == status_value)
+                status_cost = stats['cost_by_status'].get(status_value, 0)
                 total_cost += status_cost
                 f.write(f"{status_value:<25} {count:>6} {percentage:>7.1f}% {status_cost:>12,.0f} руб.\n")
             
@@ -530,19 +767,28 @@ class ReportGenerator:
     
     def generate_financial_report(self, format_type='pdf'):
         """Финансовый отчет"""
-        proposals = self.db.get_all_proposals()
+        return self._cached('financial', format_type, lambda: self._build_financial_report(format_type))
+    
+    def _build_financial_report(self, format_type):
+        # Все показатели считаются одним агрегирующим запросом, без загрузки предложений
+        summary = self.db.get_cost_summary()
         
         if format_type == 'pdf':
-            return self._generate_financial_pdf_report(proposals, "financial_report")
+            return self._generate_financial_pdf_report(summary, "financial_report")
+        elif format_type == 'txt':
+            return self._generate_financial_text_report(summary, "financial_report")
         else:
-            return self._generate_financial_text_report(proposals, "financial_report")
+            return self._generate_with_writer(
+                "financial_report", format_type, "Финансовый отчет по предложениям расширения ИС",
+                lambda writer: self._write_financial_report(writer, summary)
+            )
     
-    def _generate_financial_pdf_report(self, proposals, report_name):
+    def _generate_financial_pdf_report(self, summary, report_name):
         """PDF финансовый отчет"""
         filename = self._get_filepath(report_name, "pdf")
         doc = SimpleDocTemplate(filename, pagesize=A4)
         story = []
-        styles = getSampleStyleSheet()
+        styles = sample_styles()
         
         # Создаем стили
         title_style = self._get_paragraph_style(
@@ -571,21 +817,15 @@ class ReportGenerator:
         story.append(Paragraph(f"Дата формирования: {datetime.now().strftime('%d.%m.%Y %H:%M')}", normal_style))
         story.append(Spacer(1, 20))
         
-        # Общая финансовая сводка
-        total_cost = sum(p.estimated_cost for p in proposals)
-        avg_cost = total_cost / len(proposals) if proposals else 0
-        max_cost = max((p.estimated_cost for p in proposals), default=0)
-        min_cost = min((p.estimated_cost for p in proposals if p.estimated_cost > 0), default=0)
-        
         story.append(Paragraph("ФИНАНСОВАЯ СВОДКА:", heading2_style))
         
         summary_data = [
             ["Показатель", "Значение"],
-            ["Общая стоимость всех предложений", f"{total_cost:,.0f} руб."],
-            ["Средняя стоимость предложения", f"{avg_cost:,.0f} руб."],
-            ["Максимальная стоимость", f"{max_cost:,.0f} руб."],
-            ["Минимальная стоимость", f"{min_cost:,.0f} руб."],
-            ["Количество предложений", str(len(proposals))]
+            ["Общая стоимость всех предложений", f"{summary['total_cost']:,.0f} руб."],
+            ["Средняя стоимость предложения", f"{summary['avg_cost']:,.0f} руб."],
+            ["Максимальная стоимость", f"{summary['max_cost']:,.0f} руб."],
+            ["Минимальная стоимость", f"{summary['min_cost']:,.0f} руб."],
+            ["Количество предложений", str(summary['count'])]
         ]
         
         summary_table = Table(summary_data, colWidths=[250, 150])
@@ -598,10 +838,10 @@ class ReportGenerator:
         
         story.append(summary_table)
         
-        doc.build(story)
+        self._build(doc, story)
         return filename
     
-    def _generate_financial_text_report(self, proposals, report_name):
+    def _generate_financial_text_report(self, summary, report_name):
         """Текстовый финансовый отчет"""
         filename = self._get_filepath(report_name, "txt")
         
@@ -612,17 +852,153 @@ class ReportGenerator:
             f.write(f"Дата формирования: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}\n\n")
             
             # Финансовая сводка
-            total_cost = sum(p.estimated_cost for p in proposals)
-            avg_cost = total_cost / len(proposals) if proposals else 0
-            max_cost = max((p.estimated_cost for p in proposals), default=0)
-            min_cost = min((p.estimated_cost for p in proposals if p.estimated_cost > 0), default=0)
-            
             f.write("ФИНАНСОВАЯ СВОДКА:\n")
             f.write("-" * 50 + "\n")
-            f.write(f"Общая стоимость всех предложений: {total_cost:,.0f} руб.\n")
-            f.write(f"Средняя стоимость предложения:    {avg_cost:,.0f} руб.\n")
-            f.write(f"Максимальная стоимость:          {max_cost:,.0f} руб.\n")
-            f.write(f"Минимальная стоимость:           {min_cost:,.0f} руб.\n")
-            f.write(f"Количество предложений:          {len(proposals)}\n")
+            f.write(f"Общая стоимость всех предложений: {summary['total_cost']:,.0f} руб.\n")
+            f.write(f"Средняя стоимость предложения:    {summary['avg_cost']:,.0f} руб.\n")
+            f.write(f"Максимальная стоимость:          {summary['max_cost']:,.0f} руб.\n")
+            f.write(f"Минимальная стоимость:           {summary['min_cost']:,.0f} руб.\n")
+            f.write(f"Количество предложений:          {summary['count']}\n")
+        
+        return filename
+    
+    def generate_analytics_report(self, format_type='pdf', period='month'):
+        """Аналитический отчет: динамика подачи, перцентили стоимости и сроки переходов"""
+        return self._cached(f"analytics-{period}", format_type, lambda: self._build_analytics_report(format_type, period))
+    
+    def _build_analytics_report(self, format_type, period):
+        from analytics import compute_analytics
+        
+        result = compute_analytics(self.db, period)
+        if format_type == 'pdf':
+            return self._generate_analytics_pdf_report(result, "analytics_report")
+        else:
+            return self._generate_with_writer(
+                "analytics_report", format_type, "Аналитический отчет по предложениям расширения ИС",
+                lambda writer: self._write_analytics_report(writer, result)
+            )
+    
+    def _analytics_tables(self, result):
+        """Разделы аналитического отчета: (заголовок, колонки, строки)"""
+        from analytics import PERIOD_TITLES, PERCENTILES
+        
+        percentile_headers = [f"P{p}, руб." for p in PERCENTILES]
+        return [
+            (f"Подача предложений {PERIOD_TITLES[result.period]}",
+             ["Период", "Количество", "Стоимость, руб."], result.trend),
+            ("Перцентили стоимости по категориям",
+             ["Категория", "Количество", *percentile_headers], result.percentiles['category']),
+            ("Перцентили стоимости по отделам",
+             ["Отдел", "Количество", *percentile_headers], result.percentiles['department']),
+            ("Срок от подачи до перехода в статус, дней",
+             ["Статус", "Предложений", "Средний", "Максимальный"],
+             [(status, count, round(average, 1), round(maximum, 1))
+              for status, count, average, maximum in result.lead_times]),
+        ]
+    
+    def _write_analytics_report(self, writer, result):
+        """Аналитический отчет для потоковых форматов"""
+        for title, headers, rows in self._analytics_tables(result):
+            writer.write_section(title)
+            writer.write_rows(headers, rows)
+    
+    def _bar_chart(self, labels, series, width=480, height=180):
+        """Столбчатая диаграмма: labels - подписи по оси X, series - списки значений"""
+        drawing = Drawing(width, height)
+        chart = VerticalBarChart()
+        chart.x = 50
+        chart.y = 40
+        chart.width = width - 70
+        chart.height = height - 60
+        chart.data = [list(values) for values in series]
+        chart.categoryAxis.categoryNames = [str(label) for label in labels]
+        chart.categoryAxis.labels.fontName = self.default_font
+        chart.categoryAxis.labels.fontSize = 7
+        chart.categoryAxis.labels.angle = 30
+        chart.categoryAxis.labels.boxAnchor = 'ne'
+        chart.valueAxis.labels.fontName = self.default_font
+        chart.valueAxis.labels.fontSize = 7
+        chart.valueAxis.valueMin = 0
+        chart.barSpacing = 1
+        for i, color in enumerate((colors.steelblue, colors.orange, colors.firebrick)[:len(series)]):
+            chart.bars[i].fillColor = color
+        drawing.add(chart)
+        return drawing
+    
+    @staticmethod
+    def _format_number(value):
+        if isinstance(value, float):
+            return f"{value:,.0f}" if value.is_integer() else f"{value:,.1f}"
+        return str(value)
+    
+    def _generate_analytics_pdf_report(self, result, report_name):
+        """PDF аналитический отчет с диаграммами"""
+        from analytics import PERCENTILES
+        
+        filename = self._get_filepath(report_name, "pdf")
+        doc = SimpleDocTemplate(filename, pagesize=A4)
+        story = []
+        styles = sample_styles()
+        
+        title_style = self._get_paragraph_style(
+            'TitleStyle',
+            styles['Heading1'],
+            fontSize=16,
+            spaceAfter=20,
+            alignment=1
+        )
+        
+        heading2_style = self._get_paragraph_style(
+            'Heading2',
+            styles['Heading2'],
+            fontSize=12,
+            spaceAfter=10
+        )
+        
+        normal_style = self._get_paragraph_style(
+            'Normal',
+            styles['Normal'],
+            fontSize=10
+        )
+        
+        story.append(Paragraph("АНАЛИТИЧЕСКИЙ ОТЧЕТ ПО ПРЕДЛОЖЕНИЯМ", title_style))
+        story.append(Paragraph(f"Дата формирования: {datetime.now().strftime('%d.%m.%Y %H:%M')}", normal_style))
+        story.append(Spacer(1, 20))
+        
+        # На диаграммах - последние периоды и крупнейшие группы, в таблицах - все
+        chart_data = [
+            ([row[0] for row in result.trend[-24:]], [[row[1] for row in result.trend[-24:]]]),
+            ([row[0] for row in result.percentiles['category']],
+             [[row[2 + i] for row in result.percentiles['category']] for i in range(len(PERCENTILES))]),
+            ([row[0] for row in result.percentiles['department'][:12]],
+             [[row[2 + i] for row in result.percentiles['department'][:12]] for i in range(len(PERCENTILES))]),
+            ([row[0] for row in result.lead_times], [[row[2] for row in result.lead_times]]),
+        ]
+        
+        for (title, headers, rows), (labels, series) in zip(self._analytics_tables(result), chart_data):
+            story.append(Paragraph(f"{title.upper()}:", heading2_style))
+            if not rows:
+                story.append(Paragraph("Нет данных для отображения", normal_style))
+                continue
+            story.append(self._bar_chart(labels, series))
+            
+            table_data = [headers] + [
+                [self._format_number(value) for value in row]
+                for row in rows
+            ]
+            table = Table(table_data, repeatRows=1)
+            table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('FONTNAME', (0, 0), (-1, -1), self.default_font),
+                ('FONTSIZE', (0, 0), (-1, -1), 8),
+                ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+            ]))
+            story.append(table)
+            story.append(Spacer(1, 20))
         
-        return filename
\ No newline at end of file
+        story.append(Paragraph(f"Показатели рассчитаны за {result.seconds:.2f} с", normal_style))
+        self._build(doc, story)
+        return filename
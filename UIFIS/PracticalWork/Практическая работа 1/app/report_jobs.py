@@ -0,0 +1,182 @@
+"""Очередь фоновой генерации отчетов в пуле процессов.
+
+Верстка ReportLab нагружает процессор и держит GIL, поэтому отчеты строятся
+в отдельных процессах, а интерфейс только опрашивает очередь событий.
+"""
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from datetime import datetime
+
+REPORT_METHODS = {
+    'full': 'generate_full_report',
+    'status': 'generate_status_report',
+    'category': 'generate_category_report',
+    'financial': 'generate_financial_report',
+    'analytics': 'generate_analytics_report',
+}
+
+REPORT_TITLES = {
+    'full': 'Полный отчет',
+    'status': 'По статусам',
+    'category': 'По категориям',
+    'financial': 'Финансовый',
+    'analytics': 'Аналитика',
+}
+
+# Состояния задания
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+STATE_TITLES = {
+    QUEUED: 'В очереди',
+    RUNNING: 'Формируется',
+    DONE: 'Готов',
+    FAILED: 'Ошибка',
+    CANCELLED: 'Отменен',
+}
+
+
+class ReportCancelled(Exception):
+    """Формирование отчета отменено пользователем"""
+
+
+def run_report(job_id, db_name, report_type, format_type, events, cancelled):
+    """Построение отчета в рабочем процессе.
+
+    О ходе работы сообщает в очередь events кортежами (job_id, вид, значение).
+    Флаг отмены проверяется при каждом уведомлении о прогрессе.
+    """
+    # Импорты внутри функции: рабочий процесс загружает ReportLab только при необходимости
+    from database import Database
+    from report_generator import ReportGenerator
+
+    def progress(kind, value):
+        if cancelled.get(job_id):
+            raise ReportCancelled()
+        events.put((job_id, kind, value))
+
+    progress('started', os.getpid())
+    generator = ReportGenerator(Database(db_name), progress=progress)
+    try:
+        return getattr(generator, REPORT_METHODS[report_type])(format_type)
+    except ReportCancelled:
+        # Недостроенный файл не оставляем
+        if generator.last_filepath and os.path.exists(generator.last_filepath):
+            os.remove(generator.last_filepath)
+        raise
+
+
+class ReportJob:
+    """Задание на формирование отчета"""
+
+    def __init__(self, job_id, report_type, format_type):
+        self.id = job_id
+        self.report_type = report_type
+        self.format_type = format_type
+        self.state = QUEUED
+        self.rows = 0
+        self.pages = 0
+        self.result = None
+        self.error = None
+        self.future = None
+        self.submitted_at = datetime.now()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED, CANCELLED)
+
+
+class ReportJobQueue:
+    """Очередь заданий, выполняемых в пуле процессов.
+
+    Методы вызываются из потока интерфейса; poll() нужно вызывать периодически
+    (например, через Tk after), он переносит события из рабочих процессов
+    в состояние заданий.
+    """
+
+    def __init__(self, db_name, max_workers=None):
+        self.db_name = os.path.abspath(db_name)
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        self._manager = multiprocessing.Manager()
+        self._events = self._manager.Queue()
+        self._cancelled = self._manager.dict()
+        self._ids = itertools.count(1)
+        self._jobs = {}
+
+    def submit(self, report_type, format_type):
+        """Постановка отчета в очередь"""
+        if report_type not in REPORT_METHODS:
+            raise ValueError(f"Неизвестный тип отчета: {report_type}")
+        job = ReportJob(next(self._ids), report_type, format_type)
+        job.future = self._executor.submit(
+            run_report, job.id, self.db_name, report_type, format_type, self._events, self._cancelled
+        )
+        self._jobs[job.id] = job
+        return job
+
+    def cancel(self, job_id):
+        """Отмена задания: ожидающее снимается с очереди, выполняющееся прерывается
+        при следующем уведомлении о прогрессе"""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        if job.future.cancel():
+            job.state = CANCELLED
+            job.finished_at = datetime.now()
+        else:
+            self._cancelled[job_id] = True
+        return True
+
+    def jobs(self):
+        """Все задания в порядке постановки"""
+        return list(self._jobs.values())
+
+    def poll(self):
+        """Обработка накопившихся событий; возвращает задания, состояние которых изменилось"""
+        changed = set()
+        while not self._events.empty():
+            job_id, kind, value = self._events.get_nowait()
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                continue
+            if kind == 'started':
+                job.state = RUNNING
+            elif kind == 'rows':
+                job.rows = value
+            elif kind == 'pages':
+                job.pages = value
+            changed.add(job)
+
+        for job in self._jobs.values():
+            if job.finished or not job.future.done():
+                continue
+            try:
+                job.result = job.future.result()
+                job.state = DONE
+            except (ReportCancelled, CancelledError):
+                job.state = CANCELLED
+            except Exception as e:
+                job.error = str(e)
+                job.state = FAILED
+            job.finished_at = datetime.now()
+            self._cancelled.pop(job.id, None)
+            changed.add(job)
+        return sorted(changed, key=lambda job: job.id)
+
+    def active_count(self):
+        """Количество заданий в очереди и в работе"""
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def shutdown(self):
+        """Остановка пула: ожидающие задания снимаются, выполняющиеся прерываются"""
+        for job in self._jobs.values():
+            if not job.finished:
+                self.cancel(job.id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
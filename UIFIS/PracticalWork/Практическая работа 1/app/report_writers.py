@@ -0,0 +1,309 @@
+"""Потоковые форматы отчетов: текст, CSV, XLSX и HTML.
+
+Отчет описывается один раз через интерфейс ReportWriter:
+
+    writer.begin(title, subtitle)
+    writer.write_section("Раздел")
+    writer.write_rows(headers, rows)   # rows - любой итератор, например курсор БД
+    writer.end()
+
+Строки записываются в файл по мере чтения итератора, поэтому объем памяти
+не зависит от размера таблицы.
+"""
+import csv
+import html
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+
+class ReportWriter:
+    """Базовый класс формата отчета"""
+    extension = None
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+
+    def begin(self, title, subtitle=None):
+        """Начало документа: заголовок и (необязательно) подзаголовок"""
+        raise NotImplementedError
+
+    def write_section(self, title):
+        """Заголовок нового раздела"""
+        raise NotImplementedError
+
+    def write_rows(self, headers, rows):
+        """Таблица с заголовками; возвращает количество записанных строк"""
+        raise NotImplementedError
+
+    def end(self):
+        """Завершение и закрытие документа"""
+        raise NotImplementedError
+
+    def close(self):
+        """Закрытие файла без завершения документа (при ошибке или отмене)"""
+        raise NotImplementedError
+
+
+class TextReportWriter(ReportWriter):
+    """Текстовый файл с таблицами фиксированной ширины"""
+    extension = 'txt'
+
+    # Ширина первой колонки (подписи) и остальных колонок
+    LABEL_WIDTH = 32
+    COLUMN_WIDTH = 16
+
+    def begin(self, title, subtitle=None):
+        self.file = open(self.filepath, 'w', encoding='utf-8')
+        self.file.write("=" * 70 + "\n")
+        self.file.write(f"{title.upper()}\n")
+        self.file.write("=" * 70 + "\n\n")
+        if subtitle:
+            self.file.write(f"{subtitle}\n")
+
+    def write_section(self, title):
+        self.file.write(f"\n{title.upper()}:\n")
+
+    def write_rows(self, headers, rows):
+        widths = [self.LABEL_WIDTH] + [self.COLUMN_WIDTH] * (len(headers) - 1)
+        line = "-" * sum(widths)
+        self.file.write(line + "\n")
+        # Заголовки числовых колонок выравниваются вправо, как и значения
+        self.file.write(f"{str(headers[0]):<{widths[0]}}")
+        self.file.write(''.join(f"{str(header):>{width - 1}} " for header, width in zip(headers[1:], widths[1:])) + "\n")
+        self.file.write(line + "\n")
+        count = 0
+        for count, row in enumerate(rows, 1):
+            self.file.write(''.join(self._cell(value, width) for value, width in zip(row, widths)).rstrip() + "\n")
+        return count
+
+    @staticmethod
+    def _cell(value, width):
+        if value is None:
+            value = ''
+        if isinstance(value, float):
+            return f"{value:>{width - 1},.2f} "
+        if isinstance(value, int):
+            return f"{value:>{width - 1}} "
+        return f"{str(value):<{width}}"
+
+    def end(self):
+        self.file.close()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvReportWriter(ReportWriter):
+    """CSV: разделы отделяются пустой строкой, таблицы идут друг за другом"""
+    extension = 'csv'
+
+    def begin(self, title, subtitle=None):
+        # utf-8-sig: Excel распознает кодировку по BOM
+        self.file = open(self.filepath, 'w', encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([title])
+        if subtitle:
+            self.writer.writerow([subtitle])
+
+    def write_section(self, title):
+        self.writer.writerow([])
+        self.writer.writerow([title])
+
+    def write_rows(self, headers, rows):
+        self.writer.writerow(headers)
+        count = 0
+        for count, row in enumerate(rows, 1):
+            self.writer.writerow(row)
+        return count
+
+    def end(self):
+        self.file.close()
+
+    def close(self):
+        self.file.close()
+
+
+class HtmlReportWriter(ReportWriter):
+    """HTML-страница с таблицами; строки таблицы пишутся по одной"""
+    extension = 'html'
+
+    STYLE = (
+        "body{font-family:Arial,sans-serif;font-size:13px;margin:24px}"
+        "table{border-collapse:collapse;margin-bottom:16px}"
+        "th,td{border:1px solid #999;padding:4px 8px;vertical-align:top}"
+        "th{background:#ddd}tr:nth-child(even) td{background:#f4f4f4}"
+        "td.num{text-align:right}"
+    )
+
+    def begin(self, title, subtitle=None):
+        self.file = open(self.filepath, 'w', encoding='utf-8')
+        self.file.write(
+            f'<!DOCTYPE html>\n<html lang="ru"><head><meta charset="utf-8">'
+            f'<title>{html.escape(title)}</title><style>{self.STYLE}</style></head><body>\n'
+            f'<h1>{html.escape(title)}</h1>\n'
+        )
+        if subtitle:
+            self.file.write(f'<p>{html.escape(subtitle)}</p>\n')
+
+    def write_section(self, title):
+        self.file.write(f'<h2>{html.escape(title)}</h2>\n')
+
+    def write_rows(self, headers, rows):
+        write = self.file.write
+        write('<table><thead><tr>')
+        write(''.join(f'<th>{html.escape(str(header))}</th>' for header in headers))
+        write('</tr></thead><tbody>\n')
+        count = 0
+        for count, row in enumerate(rows, 1):
+            write('<tr>')
+            write(''.join(self._cell(value) for value in row))
+            write('</tr>\n')
+        write('</tbody></table>\n')
+        return count
+
+    @staticmethod
+    def _cell(value):
+        if value is None:
+            return '<td></td>'
+        if isinstance(value, (int, float)):
+            return f'<td class="num">{value}</td>'
+        return f'<td>{html.escape(str(value))}</td>'
+
+    def end(self):
+        self.file.write('</body></html>\n')
+        self.file.close()
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxReportWriter(ReportWriter):
+    """Книга Excel из одного листа, собираемая средствами zipfile.
+
+    Лист пишется потоком прямо в архив; строки хранятся как inline-строки,
+    поэтому таблица общих строк (которую пришлось бы держать в памяти) не нужна.
+    """
+    extension = 'xlsx'
+
+    # Сколько строк XML накапливать перед записью в сжатый поток
+    FLUSH_ROWS = 1000
+
+    SHEET_PATH = 'xl/worksheets/sheet1.xml'
+    NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+    XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    # Управляющие символы, недопустимые в XML
+    ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+    def begin(self, title, subtitle=None):
+        self.archive = zipfile.ZipFile(self.filepath, 'w', zipfile.ZIP_DEFLATED)
+        self.sheet = self.archive.open(self.SHEET_PATH, 'w', force_zip64=True)
+        self.buffer = []
+        self.row_number = 0
+        self._write(f'{self.XML_HEADER}<worksheet xmlns="{self.NS}"><sheetData>')
+        self._write_row([title], bold=True)
+        if subtitle:
+            self._write_row([subtitle])
+
+    def write_section(self, title):
+        # Пустая строка перед разделом
+        self.row_number += 1
+        self._write_row([title], bold=True)
+
+    def write_rows(self, headers, rows):
+        self._write_row(headers, bold=True)
+        count = 0
+        for count, row in enumerate(rows, 1):
+            self._write_row(row)
+            if len(self.buffer) >= self.FLUSH_ROWS:
+                self._flush()
+        return count
+
+    def _write_row(self, values, bold=False):
+        self.row_number += 1
+        style = ' s="1"' if bold else ''
+        cells = []
+        for value in values:
+            if value is None:
+                cells.append('<c/>')
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(f'<c{style}><v>{value}</v></c>')
+            else:
+                text = escape(self.ILLEGAL_CHARS.sub('', str(value)))
+                cells.append(f'<c t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>')
+        self._write(f'<row r="{self.row_number}">{"".join(cells)}</row>')
+
+    def _write(self, text):
+        self.buffer.append(text)
+
+    def _flush(self):
+        self.sheet.write(''.join(self.buffer).encode('utf-8'))
+        self.buffer = []
+
+    def end(self):
+        self._write('</sheetData></worksheet>')
+        self._flush()
+        self.sheet.close()
+
+        parts = {
+            '[Content_Types].xml': (
+                '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                '<Default Extension="xml" ContentType="application/xml"/>'
+                '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                '</Types>'
+            ),
+            '_rels/.rels': (
+                f'<Relationships xmlns="{self.PACKAGE_REL_NS}">'
+                f'<Relationship Id="rId1" Type="{self.REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+                '</Relationships>'
+            ),
+            'xl/workbook.xml': (
+                f'<workbook xmlns="{self.NS}" xmlns:r="{self.REL_NS}">'
+                '<sheets><sheet name="Отчет" sheetId="1" r:id="rId1"/></sheets></workbook>'
+            ),
+            'xl/_rels/workbook.xml.rels': (
+                f'<Relationships xmlns="{self.PACKAGE_REL_NS}">'
+                f'<Relationship Id="rId1" Type="{self.REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+                f'<Relationship Id="rId2" Type="{self.REL_NS}/styles" Target="styles.xml"/>'
+                '</Relationships>'
+            ),
+            # Два стиля ячеек: обычный и полужирный (для заголовков)
+            'xl/styles.xml': (
+                f'<styleSheet xmlns="{self.NS}">'
+                '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+                '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+                '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+                '<fill><patternFill patternType="gray125"/></fill></fills>'
+                '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+                '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+                '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+                '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+                '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+                '</styleSheet>'
+            ),
+        }
+        for name, content in parts.items():
+            self.archive.writestr(name, self.XML_HEADER + content)
+        self.archive.close()
+
+    def close(self):
+        self.sheet.close()
+        self.archive.close()
+
+
+WRITERS = {
+    writer.extension: writer
+    for writer in (TextReportWriter, CsvReportWriter, XlsxReportWriter, HtmlReportWriter)
+}
+
+
+def create_writer(format_type, filepath):
+    """Экземпляр writer для формата format_type"""
+    if format_type not in WRITERS:
+        raise ValueError(f"Неподдерживаемый формат отчета: {format_type}")
+    return WRITERS[format_type](filepath)
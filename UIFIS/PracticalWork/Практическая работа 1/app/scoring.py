@@ -0,0 +1,358 @@
+"""Оценка и ранжирование портфеля предложений.
+
+Оценка (0-100) - взвешенная сумма показателей, каждый из которых приведен к 0..1
+так, что больше - лучше:
+    priority  - приоритет: 1 (высокий) -> 1, 3 (низкий) -> 0
+    cost      - стоимость: дешевле - выше (логарифмическая шкала до самой дорогой в базе)
+    category  - ценность категории (CATEGORY_WEIGHTS)
+    age       - сколько предложение ждет: 0 у поданного сегодня, 1 - от AGE_HORIZON_DAYS
+    duration  - срок реализации ("3 месяца" -> 90 дней): короче - выше, нераспознанный - 0.5
+
+Поля оценки всех предложений держатся в памяти столбцами (при наличии NumPy - массивами,
+и оценка считается векторно). После записи в базу столбцы не перечитываются целиком:
+по уведомлениям proposal_changes (см. changes.py) перечитываются только измененные строки.
+Оценки кэшируются до изменения данных, весов или текущей даты.
+"""
+import heapq
+import math
+import re
+from bisect import bisect_left
+from datetime import date, datetime
+from models import Category, Status, CATEGORY_CODES, STATUS_CODES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_WEIGHTS = {
+    'priority': 0.35,
+    'cost': 0.2,
+    'category': 0.2,
+    'age': 0.1,
+    'duration': 0.15,
+}
+
+CATEGORY_WEIGHTS = {
+    Category.SECURITY: 1.0,
+    Category.PERFORMANCE: 0.8,
+    Category.FUNCTIONALITY: 0.7,
+    Category.INTEGRATION: 0.6,
+    Category.UI_UX: 0.5,
+    Category.OTHER: 0.3,
+}
+
+# Ранжируются только предложения, по которым еще предстоит решение или работа
+ACTIVE_STATUSES = (Status.NEW, Status.IN_PROGRESS, Status.APPROVED)
+
+AGE_HORIZON_DAYS = 365
+DURATION_HORIZON_DAYS = 730
+UNKNOWN_DURATION = 0.5
+
+# Если изменилась большая доля строк, столбцы дешевле перечитать целиком
+FULL_RELOAD_SHARE = 0.05
+
+# Единицы срока: начало слова -> дней
+DURATION_UNITS = (
+    ('дн', 1), ('ден', 1), ('сут', 1), ('нед', 7), ('мес', 30),
+    ('кварт', 91), ('год', 365), ('лет', 365),
+)
+WORD_NUMBERS = {
+    'пол': 0.5, 'полтора': 1.5, 'полторы': 1.5, 'один': 1, 'одна': 1, 'два': 2, 'две': 2,
+    'три': 3, 'четыре': 4, 'пять': 5, 'шесть': 6, 'семь': 7, 'восемь': 8, 'девять': 9, 'десять': 10,
+}
+NUMBER = r'\d+(?:[.,]\d+)?'
+RANGE_RE = re.compile(rf'({NUMBER})\s*[-–—]\s*({NUMBER})')
+DURATION_TOKEN_RE = re.compile(rf'{NUMBER}|[а-я]+')
+
+COLUMNS = ('id', 'priority', 'cost', 'category', 'status', 'created_at', 'duration')
+COLUMN_TYPES = ('int64', 'int64', 'float64', 'int64', 'int64', 'int64', 'float64')
+
+
+def _unit_days(word):
+    if word == 'г':
+        return 365
+    for prefix, days in DURATION_UNITS:
+        if word.startswith(prefix):
+            return days
+    return None
+
+
+def parse_duration(text):
+    """Срок реализации в днях: '3 месяца' -> 90, '2-3 недели' -> 17.5, 'полгода' -> 182.5.
+
+    Части срока складываются ('1 год 6 месяцев'); диапазон заменяется серединой.
+    Для нераспознанного срока возвращается nan.
+    """
+    if not text:
+        return math.nan
+    text = RANGE_RE.sub(
+        lambda match: str((float(match[1].replace(',', '.')) + float(match[2].replace(',', '.'))) / 2),
+        text.lower().replace('ё', 'е')
+    )
+    total = None
+    amount = None
+    for token in DURATION_TOKEN_RE.findall(text):
+        if token[0].isdigit():
+            amount = float(token.replace(',', '.'))
+            continue
+        if token in WORD_NUMBERS:
+            amount = WORD_NUMBERS[token]
+            continue
+        days = _unit_days(token)
+        if days is None and token.startswith('пол'):
+            # "полгода", "полмесяца"
+            days = _unit_days(token[3:])
+            if days is not None:
+                days /= 2
+        if days is not None:
+            total = (total or 0) + (1 if amount is None else amount) * days
+        amount = None
+    return math.nan if total is None else total
+
+
+def component_values(priority, cost, category_weight, created_at, duration, max_cost, now):
+    """Показатели одного предложения (0..1) в порядке DEFAULT_WEIGHTS"""
+    cost = max(cost, 0.0)
+    return (
+        min(max((3 - priority) / 2, 0.0), 1.0),
+        1 - math.log1p(cost) / math.log1p(max_cost) if max_cost > 0 else 1.0,
+        category_weight,
+        min(max((now - created_at) / 86400 / AGE_HORIZON_DAYS, 0.0), 1.0),
+        UNKNOWN_DURATION if math.isnan(duration) else 1 - min(max(duration / DURATION_HORIZON_DAYS, 0.0), 1.0),
+    )
+
+
+class ScoringEngine:
+    """Оценки всех предложений базы db с кэшем до изменения данных, весов или даты"""
+
+    def __init__(self, db, weights=None, category_weights=None):
+        self.db = db
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.category_weights = dict(CATEGORY_WEIGHTS)
+        self.configure(weights, category_weights)
+        # Номер уведомления об изменении, по которое прочитаны столбцы
+        self.change_id = None
+        self.columns = None
+        self._durations = {}
+        self._scores = None
+        self._scores_key = None
+        self._max_cost = 0.0
+
+    def configure(self, weights=None, category_weights=None):
+        """Изменение весов показателей и категорий (неуказанные остаются прежними)"""
+        for name, value in (weights or {}).items():
+            if name not in DEFAULT_WEIGHTS:
+                raise ValueError(f"Неизвестный показатель оценки: {name} (доступны: {', '.join(DEFAULT_WEIGHTS)})")
+            if value < 0:
+                raise ValueError(f"Вес показателя {name} не может быть отрицательным")
+            self.weights[name] = float(value)
+        if not any(self.weights.values()):
+            raise ValueError("Хотя бы один вес показателя должен быть больше нуля")
+        for category, value in (category_weights or {}).items():
+            self.category_weights[category] = float(value)
+
+    # ----- Столбцы -----
+
+    def refresh(self):
+        """Синхронизация столбцов с базой; True, если данные изменились"""
+        if self.columns is None:
+            self._load()
+            return True
+        change_id, changes = self.db.get_changes(self.change_id)
+        if changes == {}:
+            self.change_id = change_id
+            return False
+        if changes is None or len(changes) > len(self.columns['id']) * FULL_RELOAD_SHARE:
+            self._load()
+        else:
+            self._patch(changes)
+            self.change_id = change_id
+        return True
+
+    def _split(self, rows):
+        """Строки SCORING_COLUMNS -> столбцы COLUMNS (массивы NumPy или кортежи).
+
+        Срок разбирается один раз для каждой формулировки: различных формулировок немного.
+        """
+        columns = dict(zip(COLUMNS, zip(*rows))) if rows else {name: () for name in COLUMNS}
+        durations = self._durations
+        for text in set(columns['duration']) - durations.keys():
+            durations[text] = parse_duration(text)
+        columns['duration'] = map(durations.__getitem__, columns['duration'])
+        if np is None:
+            columns['duration'] = tuple(columns['duration'])
+            return columns
+        return {
+            name: np.fromiter(columns[name], dtype, len(rows))
+            for name, dtype in zip(COLUMNS, COLUMN_TYPES)
+        }
+
+    def _load(self):
+        # Номер уведомления берется до чтения: изменения во время чтения применятся при следующей синхронизации
+        self.change_id = self.db.get_last_change_id()
+        parts = [self._split(batch) for batch in self.db.iter_scoring_rows()] or [self._split([])]
+        if np is not None:
+            columns = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+            columns['alive'] = np.ones(len(columns['id']), bool)
+        else:
+            columns = {name: [value for part in parts for value in part[name]] for name in COLUMNS}
+            columns['alive'] = [True] * len(columns['id'])
+        self.columns = columns
+
+    def _patch(self, changes):
+        """Перечитывание измененных строк: изменение на месте, удаление - отметкой alive"""
+        columns = self.columns
+        ids = columns['id']
+        current = {row[0]: row for row in self.db.get_scoring_rows(changes)}
+        added = []
+        for proposal_id in changes:
+            position = bisect_left(ids, proposal_id)
+            if position == len(ids) or ids[position] != proposal_id:
+                if proposal_id in current:
+                    added.append(current[proposal_id])
+                continue
+            row = current.get(proposal_id)
+            columns['alive'][position] = row is not None
+            if row is not None:
+                values = self._split([row])
+                for name in COLUMNS[1:]:
+                    columns[name][position] = values[name][0]
+
+        if added:
+            added.sort()
+            new = self._split(added)
+            new['alive'] = [True] * len(added)
+            if np is not None:
+                for name in columns:
+                    columns[name] = np.concatenate([columns[name], np.asarray(new[name], columns[name].dtype)])
+            else:
+                for name in columns:
+                    columns[name].extend(new[name])
+            if len(ids) and added[0][0] < ids[-1]:
+                # id меньше уже прочитанных (не бывает при AUTOINCREMENT) - восстанавливаем порядок
+                self._sort_columns()
+
+    def _sort_columns(self):
+        columns = self.columns
+        if np is not None:
+            order = np.argsort(columns['id'], kind='stable')
+            for name in columns:
+                columns[name] = columns[name][order]
+        else:
+            order = sorted(range(len(columns['id'])), key=columns['id'].__getitem__)
+            for name in columns:
+                columns[name] = [columns[name][i] for i in order]
+
+    # ----- Оценки -----
+
+    def scores(self):
+        """Оценки всех прочитанных строк (удаленным соответствует -inf)"""
+        self.refresh()
+        today = date.today()
+        key = (
+            self.change_id, len(self.columns['id']), tuple(self.weights.items()),
+            tuple(sorted((category.name, value) for category, value in self.category_weights.items())), today
+        )
+        if key != self._scores_key:
+            self._scores = self._compute(self._epoch(today))
+            self._scores_key = key
+        return self._scores
+
+    @staticmethod
+    def _epoch(day):
+        """Начало дня в секундах в той же шкале, что и created_at (местное время без пояса)"""
+        return (datetime(day.year, day.month, day.day) - datetime(1970, 1, 1)).total_seconds()
+
+    def _category_table(self):
+        """Вес категории по ее коду"""
+        table = [0.0] * (max(CATEGORY_CODES.values()) + 1)
+        for category, code in CATEGORY_CODES.items():
+            table[code] = self.category_weights.get(category, 0.0)
+        return table
+
+    def _compute(self, now):
+        columns = self.columns
+        weights = [self.weights[name] for name in DEFAULT_WEIGHTS]
+        total_weight = sum(weights)
+        categories = self._category_table()
+
+        if np is None:
+            alive_costs = [cost for cost, alive in zip(columns['cost'], columns['alive']) if alive]
+            self._max_cost = max_cost = max(max(alive_costs, default=0.0), 0.0)
+            return [
+                100 * sum(w * value for w, value in zip(weights, component_values(
+                    priority, cost, categories[category], created_at, duration, max_cost, now
+                ))) / total_weight if alive else -math.inf
+                for priority, cost, category, created_at, duration, alive in zip(
+                    columns['priority'], columns['cost'], columns['category'],
+                    columns['created_at'], columns['duration'], columns['alive']
+                )
+            ]
+
+        alive = columns['alive']
+        cost = np.maximum(columns['cost'], 0.0)
+        self._max_cost = max_cost = float(cost[alive].max()) if alive.any() else 0.0
+        components = (
+            np.clip((3 - columns['priority']) / 2, 0.0, 1.0),
+            1 - np.log1p(cost) / np.log1p(max_cost) if max_cost > 0 else np.ones(len(cost)),
+            np.asarray(categories)[columns['category']],
+            np.clip((now - columns['created_at']) / 86400 / AGE_HORIZON_DAYS, 0.0, 1.0),
+            np.where(
+                np.isnan(columns['duration']), UNKNOWN_DURATION,
+                1 - np.clip(columns['duration'] / DURATION_HORIZON_DAYS, 0.0, 1.0)
+            ),
+        )
+        total = sum(weight * component for weight, component in zip(weights, components))
+        return np.where(alive, total * (100 / total_weight), -np.inf)
+
+    def top(self, k=10, statuses=ACTIVE_STATUSES):
+        """k лучших предложений с заданными статусами: список (id, оценка) по убыванию оценки.
+
+        Полная сортировка не нужна: с NumPy k-я оценка находится выбором (np.partition)
+        за линейное время, без NumPy лучшие k отбираются кучей. При равных оценках
+        выше предложение с меньшим id.
+        """
+        scores = self.scores()
+        codes = {STATUS_CODES[status] for status in statuses}
+        columns = self.columns
+        if k <= 0:
+            return []
+
+        if np is None:
+            candidates = (
+                (score, -proposal_id)
+                for proposal_id, score, status, alive in zip(columns['id'], scores, columns['status'], columns['alive'])
+                if alive and status in codes
+            )
+            return [(-negative_id, score) for score, negative_id in heapq.nlargest(k, candidates)]
+
+        candidates = np.flatnonzero(columns['alive'] & np.isin(columns['status'], list(codes)))
+        values = scores[candidates]
+        if k < len(candidates):
+            kth = np.partition(values, len(values) - k)[len(values) - k]
+            above = candidates[values > kth]
+            # Из равных k-й оценке берутся предложения с меньшими id (кандидаты упорядочены по id)
+            ties = candidates[values == kth][:k - len(above)]
+            candidates = np.concatenate([above, ties])
+        order = np.lexsort((columns['id'][candidates], -scores[candidates]))
+        chosen = candidates[order]
+        return [(int(proposal_id), float(score)) for proposal_id, score in zip(columns['id'][chosen], scores[chosen])]
+
+    def explain(self, proposal_id):
+        """Показатели и их вклад в оценку: список (показатель, значение 0..1, баллы) или None"""
+        self.scores()
+        columns = self.columns
+        position = bisect_left(columns['id'], proposal_id)
+        if position == len(columns['id']) or columns['id'][position] != proposal_id or not columns['alive'][position]:
+            return None
+        values = component_values(
+            columns['priority'][position], float(columns['cost'][position]),
+            self._category_table()[columns['category'][position]], columns['created_at'][position],
+            float(columns['duration'][position]), self._max_cost, self._epoch(date.today())
+        )
+        total_weight = sum(self.weights.values())
+        return [
+            (name, value, 100 * self.weights[name] * value / total_weight)
+            for name, value in zip(DEFAULT_WEIGHTS, values)
+        ]
@@ -0,0 +1,140 @@
+import math
+import re
+
+# Окончания русских слов (упрощенный стеммер в духе Snowball), от длинных к коротким
+RUSSIAN_ENDINGS = sorted([
+    # прилагательные и причастия
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой',
+    'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+    # глаголы
+    'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'уй', 'ил', 'ыл',
+    'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть',
+    'ишь', 'ю', 'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'н', 'ло', 'но', 'ет',
+    'ют', 'ны', 'ть', 'ешь', 'нно',
+    # существительные
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ье', 'еи', 'ии',
+    'ям', 'ам', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и',
+    'о', 'у', 'ы', 'ь', 'я',
+    # возвратные и превосходная степень
+    'ся', 'сь', 'ейш', 'ейше', 'ость', 'ост',
+], key=len, reverse=True)
+
+MIN_STEM_LENGTH = 3
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Параметры bm25 - те же, что у функции bm25() в FTS5
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Слов во фрагменте текста с совпадениями
+SNIPPET_WORDS = 10
+
+
+def stem(word):
+    """Основа слова: нижний регистр, ё -> е, отсечение одного окончания"""
+    word = word.lower().replace('ё', 'е')
+    if not re.search('[а-я]', word):
+        return word
+    # Возвратная частица отсекается отдельно: "обновляется" -> "обновляет" -> "обновля"
+    for suffix in ('ся', 'сь'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            word = word[:-len(suffix)]
+            break
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def build_match_query(text):
+    """Запрос FTS5 MATCH из пользовательского ввода.
+
+    Каждое слово превращается в префиксный запрос по основе, поэтому
+    "интеграции" находит "интеграция", "интеграцию" и т.д., а недописанное
+    слово находит продолжения - поиск работает по мере ввода.
+    """
+    return ' AND '.join(term_query(term) for term in match_terms(text))
+
+
+def term_query(term):
+    """Запрос FTS5 MATCH для одной основы"""
+    # Кавычки экранируют спецсимволы синтаксиса FTS5. Однобуквенное слово ищется целиком:
+    # префиксов из одной буквы нет в индексе, и такой запрос перебирал бы весь словарь
+    return f'"{term}"*' if len(term) > 1 else f'"{term}"'
+
+
+def match_terms(text):
+    """Основы слов пользовательского ввода в порядке ввода"""
+    return [stem(token) for token in TOKEN_RE.findall(text)]
+
+
+def terms_pattern(terms):
+    """Регулярное выражение для поиска основ в тексте в нижнем регистре: номер
+    сработавшей группы - номер основы в terms"""
+    return re.compile(r'\b(?:' + '|'.join(
+        f'({re.escape(term)})' + ('' if len(term) > 1 else r'(?!\w)') for term in terms
+    ) + ')')
+
+
+def bm25_scores(rows, terms, weights, frequencies=None, total=None):
+    """Оценки bm25 строк rows вида (id, текст столбца, ...) по основам terms: словарь id -> оценка,
+    чем больше, тем релевантнее.
+
+    Считается так же, как функцией bm25() в FTS5: частота слова - сумма совпадений по
+    столбцам с весами weights, длина документа - число слов во всех столбцах (по пробелам).
+    Средняя длина берется по самим rows. frequencies - в скольких из total документов
+    встречается каждая основа; без них все основы считаются одинаково редкими, что не меняет
+    порядок строк при запросе из одного слова.
+    """
+    pattern = terms_pattern(terms)
+    if frequencies is None:
+        idf = [1.0] * len(terms)
+    else:
+        idf = [max(math.log((total - found + 0.5) / (found + 0.5)), 1e-6) for found in frequencies]
+
+    lengths = []
+    counts = []
+    for row in rows:
+        text = '\0'.join(column or '' for column in row[1:]).lower()
+        lengths.append(text.count(' ') + len(row) - 1)
+        found = [0.0] * len(terms)
+        for weight, column in zip(weights, text.split('\0')):
+            for match in pattern.finditer(column):
+                found[match.lastindex - 1] += weight
+        counts.append(found)
+    average = sum(lengths) / len(lengths) if rows else 1
+
+    scores = {}
+    for row, length, found_in_row in zip(rows, lengths, counts):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (average or 1))
+        scores[row[0]] = sum(
+            weight * found * (BM25_K1 + 1) / (found + norm)
+            for weight, found in zip(idf, found_in_row)
+        )
+    return scores
+
+
+def snippet(columns, terms, start='«', end='»', ellipsis='…', size=SNIPPET_WORDS):
+    """Фрагмент текста с выделенными совпадениями, как у функции snippet() FTS5:
+    size слов столбца с наибольшим числом совпадений, начиная чуть раньше первого из них"""
+    pattern = terms_pattern(terms)
+    text = next((column for column in columns if column), '')
+    hits = 0
+    for column in columns:
+        found = len(pattern.findall((column or '').lower()))
+        if found > hits:
+            text, hits = column, found
+
+    words = list(TOKEN_RE.finditer(text))
+    matched = [pattern.match(word.group().lower()) is not None for word in words]
+    first = matched.index(True) if True in matched else 0
+    begin = max(0, min(first - 2, len(words) - size))
+    stop = min(len(words), begin + size)
+
+    parts = [ellipsis] if begin > 0 else []
+    position = words[begin].start() if begin > 0 else 0
+    for word, hit in zip(words[begin:stop], matched[begin:stop]):
+        parts.append(text[position:word.start()])
+        parts.append(f'{start}{word.group()}{end}' if hit else word.group())
+        position = word.end()
+    parts.append(ellipsis if stop < len(words) else text[position:])
+    return ''.join(parts)
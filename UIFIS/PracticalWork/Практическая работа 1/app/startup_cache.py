@@ -0,0 +1,35 @@
+"""Кэш первой страницы списка предложений для быстрого запуска.
+
+При закрытии программы первая страница списка (без фильтров) и строка статистики
+сохраняются в JSON-файл рядом с базой. При следующем запуске они показываются
+в первом же кадре, еще до открытия базы; затем их заменяют актуальные данные.
+Файл записывается атомарно; поврежденный или отсутствующий файл просто не используется.
+"""
+import json
+import os
+
+
+def cache_path(db_name):
+    return f"{db_name}.startup.json"
+
+
+def load_first_page(db_name):
+    """Сохраненные (строки таблицы, текст статистики) или None"""
+    try:
+        with open(cache_path(db_name), encoding='utf-8') as f:
+            data = json.load(f)
+        return [tuple(values) for values in data['rows']], data['stats']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_first_page(db_name, rows, stats):
+    """Сохранение строк первой страницы (кортежи значений таблицы) и текста статистики"""
+    path = cache_path(db_name)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'rows': [list(values) for values in rows], 'stats': stats}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Не удалось сохранить кэш первой страницы: {e}")
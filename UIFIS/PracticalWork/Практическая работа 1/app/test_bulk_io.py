@@ -0,0 +1,45 @@
+"""Проверки импорта предложений из JSON Lines.
+
+Запуск из каталога app:
+    python -m unittest test_bulk_io
+"""
+import json
+import os
+import tempfile
+import unittest
+from bulk_io import import_proposals
+from database import Database
+
+GOOD_RECORD = {
+    'title': "Электронный документооборот", 'description': "Перевести заявки в электронный вид",
+    'author': "Иванов И.И.", 'department': "ИТ-отдел",
+}
+
+
+class JsonLinesImportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directory.name, "test.db"))
+        self.path = os.path.join(self.directory.name, "import.jsonl")
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(GOOD_RECORD, ensure_ascii=False) + '\n')
+            f.write('{bad json\n')
+            f.write('[1, 2]\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_malformed_lines_are_skipped(self):
+        result = import_proposals(self.db, self.path)
+        self.assertEqual(result.imported, 1)
+        self.assertEqual(result.skipped, 2)
+        self.assertEqual([line for line, _ in result.errors], [2, 3])
+        self.assertIn("JSON-объектом", result.errors[1][1])
+
+    def test_strict_mode_stops_at_first_bad_line(self):
+        with self.assertRaisesRegex(ValueError, "^Строка 2:"):
+            import_proposals(self.db, self.path, strict=True)
+
+
+if __name__ == '__main__':
+    unittest.main()